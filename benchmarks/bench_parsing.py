@@ -0,0 +1,78 @@
+import re
+import timeit
+from datetime import date, datetime
+from decimal import Decimal
+
+from invoicegen.models.parsing import parse_date, parse_decimal
+
+"""
+Microbenchmark for the shared date and decimal parsers.
+
+Compares the per-call re.fullmatch + strptime path the validators used before against
+invoicegen.models.parsing, on the kind of values a month of job lines repeats.
+
+    python benchmarks/bench_parsing.py
+"""
+
+DATES = [f"{month}/{day}/2024" for month in range(9, 12) for day in range(1, 29)]
+AMOUNTS = ["65", "80.00", "$1,250.50", "1.5", "0.25", "120", "$45.00", "2"]
+ROUNDS = 200
+
+
+def legacy_date(value: str) -> date:
+    value = value.strip()
+    if not re.fullmatch(r"\d{1,2}/\d{1,2}/\d{4}", value):
+        raise ValueError(f"Invalid date format '{value}' (expected MM/DD/YYYY)")
+    try:
+        return datetime.strptime(value, "%m/%d/%Y").date()
+    except ValueError:
+        raise ValueError(f"Invalid calendar date '{value}' (MM/DD/YYYY)") from None
+
+
+def legacy_decimal(value: str) -> Decimal:
+    value = value.strip().replace("$", "").replace(",", "")
+    if not value:
+        raise ValueError("Rate is empty after removing symbols; provide a number")
+    if not re.fullmatch(r"^[0-9]+(\.[0-9]+)?$", value):
+        raise ValueError("Rate must be digits.decimals (e.g. 1.5, 65)")
+    dec = Decimal(value)
+    if not dec.is_finite():
+        raise ValueError("Rate must be a finite number")
+    if dec < 0:
+        raise ValueError(f"Rate must be at least 0: got {dec}")
+    return dec
+
+
+def report(name: str, legacy: float, shared: float, calls: int) -> None:
+    print(
+        f"{name:<8} legacy {calls / legacy:>12,.0f}/s   shared {calls / shared:>12,.0f}/s   "
+        f"x{legacy / shared:.1f}"
+    )
+
+
+def main() -> None:
+    dates = DATES * ROUNDS
+    amounts = AMOUNTS * ROUNDS * 4
+
+    report(
+        "dates",
+        min(timeit.repeat(lambda: [legacy_date(value) for value in dates], number=1, repeat=5)),
+        min(timeit.repeat(lambda: [parse_date(value) for value in dates], number=1, repeat=5)),
+        len(dates),
+    )
+    report(
+        "amounts",
+        min(
+            timeit.repeat(lambda: [legacy_decimal(value) for value in amounts], number=1, repeat=5)
+        ),
+        min(
+            timeit.repeat(
+                lambda: [parse_decimal(value, "Rate") for value in amounts], number=1, repeat=5
+            )
+        ),
+        len(amounts),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from synthetic import write_jobs_csv
+
+from invoicegen import __version__
+from invoicegen.config import load_client, load_config
+from invoicegen.core.grouping import GroupKey, batch_groups, create_invoice, project_name
+from invoicegen.io import read_joblines
+from invoicegen.models import Invoice, InvoiceHeader, InvoiceMeta, JobLineBatch
+from invoicegen.render import HTMLRenderer, render_pdfs
+from invoicegen.render.pdf import require_weasyprint
+
+"""
+Benchmarks of every stage from CSV to PDF, on synthetic job line files.
+
+Stages, each run on the output of the one before:
+- ingest: reading the CSV and constructing a JobLine per row, packed into a JobLineBatch,
+- group: grouping the lines per project and sorting each project by date,
+- totals: building every project's Invoice, which computes its totals,
+- html: rendering the first --html invoices with HTMLRenderer,
+- pdf: rendering the first --pdf invoices with WeasyPrint, skipped when it is not available.
+
+Every row count runs in a process of its own, so peak RSS belongs to that size alone. Each
+stage reports rows/sec, the peak RSS after it, and the memory blocks it left allocated. Sizes
+up to --trace-rows then run again under tracemalloc for each stage's allocation peak; the
+timed run is never traced. Results are written as JSON, and --compare prints the change in
+rows/sec of every stage against an earlier result file.
+
+    python benchmarks/bench_pipeline.py --rows 1k 100k 1M --out results.json
+    python benchmarks/bench_pipeline.py --rows 1k 100k 1M --compare results.json
+"""
+
+SAMPLES = Path(__file__).parents[1] / "samples"
+STAGES = ["ingest", "group", "totals", "html", "pdf"]
+DEFAULT_ROWS = ["1k", "10k", "100k"]
+COUNT_SUFFIXES = {"k": 1_000, "M": 1_000_000}
+KIB = 1024
+
+
+def parse_count(value: str) -> int:
+    """Row counts like 5000, 10k or 10M."""
+    factor = COUNT_SUFFIXES.get(value[-1:], 1)
+    number = value[:-1] if factor > 1 else value
+    try:
+        return int(number) * factor
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a row count: {value}") from None
+
+
+def peak_rss() -> int | None:
+    try:
+        import resource  # noqa: PLC0415
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * KIB
+
+
+@dataclass(slots=True)
+class StageResult:
+    stage: str
+    rows: int
+    seconds: float
+    peak_rss_bytes: int | None
+    # Memory blocks still allocated after the stage, compared to before it
+    retained_blocks: int
+    # Highest traced allocation during the stage, from the tracemalloc run
+    alloc_peak_bytes: int | None = None
+    skipped: str | None = None
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def to_json(self) -> dict[str, Any]:
+        return {**asdict(self), "rows_per_sec": self.rows_per_sec}
+
+
+class Pipeline:
+    """
+    The stages of one benchmark run, each returning the number of job lines it handled.
+
+    Parameters
+    ----------
+    csv_path : Path
+        Job line CSV.
+    html_invoices : int
+        Invoices rendered to HTML.
+    pdf_invoices : int
+        Invoices rendered to PDF.
+    work_dir : Path
+        Where rendered files and the template cache go.
+    """
+
+    def __init__(self, csv_path: Path, html_invoices: int, pdf_invoices: int, work_dir: Path):
+        self.csv_path = csv_path
+        self.html_invoices = html_invoices
+        self.pdf_invoices = pdf_invoices
+        self.work_dir = work_dir
+
+        self.config = load_config()
+        self.header = InvoiceHeader(
+            business=self.config.business_info,
+            client=load_client(SAMPLES / "client.yaml"),
+            meta=InvoiceMeta(number="DRAFT"),
+        )
+        self.batch = JobLineBatch()
+        self.groups: dict[GroupKey, list[int]] = {}
+        # Only the invoices the render stages need are kept
+        self.invoices: list[Invoice] = []
+
+    def ingest(self) -> int:
+        self.batch = JobLineBatch.from_joblines(read_joblines(self.csv_path))
+        return len(self.batch)
+
+    def group(self) -> int:
+        self.groups = batch_groups(self.batch, "project")
+        return len(self.batch)
+
+    def totals(self) -> int:
+        keep = max(self.html_invoices, self.pdf_invoices)
+        rows = 0
+        for number, (key, indices) in enumerate(self.groups.items(), start=1):
+            invoice = create_invoice(
+                self.batch.joblines(indices),
+                self.header,
+                f"BENCH-{number:06d}",
+                self.config,
+                project_name(key),
+            )
+            if len(self.invoices) < keep:
+                self.invoices.append(invoice)
+            rows += len(indices)
+        return rows
+
+    def html(self) -> int:
+        invoices = self.invoices[: self.html_invoices]
+        renderer = HTMLRenderer(cache_dir=self.work_dir / "jinja")
+        renderer.render_all(invoices, self.work_dir / "html")
+        return sum(len(invoice.lines) for invoice in invoices)
+
+    def pdf(self) -> int:
+        invoices = self.invoices[: self.pdf_invoices]
+        render_pdfs(invoices, self.work_dir / "pdf", jobs=1)
+        return sum(len(invoice.lines) for invoice in invoices)
+
+    def stage(self, name: str) -> Callable[[], int]:
+        stage: Callable[[], int] = getattr(self, name)
+        return stage
+
+    def skip_reason(self, name: str) -> str | None:
+        """Why a stage cannot run here, such as pdf without WeasyPrint, or None."""
+        if name == "pdf":
+            try:
+                require_weasyprint()
+            except RuntimeError as exc:
+                return str(exc)
+        return None
+
+
+def measure(name: str, stage: Callable[[], int], traced: bool) -> StageResult:
+    blocks = sys.getallocatedblocks()
+    if traced:
+        tracemalloc.reset_peak()
+
+    started = time.perf_counter()
+    rows = stage()
+    seconds = time.perf_counter() - started
+
+    result = StageResult(name, rows, seconds, peak_rss(), sys.getallocatedblocks() - blocks)
+    if traced:
+        result.alloc_peak_bytes = tracemalloc.get_traced_memory()[1]
+    return result
+
+
+def run_stages(
+    csv_path: Path, html_invoices: int, pdf_invoices: int, trace: bool
+) -> list[dict[str, Any]]:
+    """One timed run of every stage, then one traced run when asked for."""
+    with tempfile.TemporaryDirectory(prefix="invoicegen-bench-") as work:
+        pipeline = Pipeline(csv_path, html_invoices, pdf_invoices, Path(work) / "timed")
+        results = []
+        for name in STAGES:
+            reason = pipeline.skip_reason(name)
+            if reason is not None:
+                results.append(StageResult(name, 0, 0.0, peak_rss(), 0, skipped=reason))
+            else:
+                results.append(measure(name, pipeline.stage(name), traced=False))
+        del pipeline
+
+        if trace:
+            pipeline = Pipeline(csv_path, html_invoices, pdf_invoices, Path(work) / "traced")
+            tracemalloc.start()
+            try:
+                for result in results:
+                    if result.skipped is None:
+                        traced = measure(result.stage, pipeline.stage(result.stage), traced=True)
+                        result.alloc_peak_bytes = traced.alloc_peak_bytes
+            finally:
+                tracemalloc.stop()
+
+    return [result.to_json() for result in results]
+
+
+def run_size(rows: int, args: argparse.Namespace) -> dict[str, Any]:
+    csv_path = write_jobs_csv(Path(args.data_dir) / f"jobs-{rows}-{args.seed}.csv", rows, args.seed)
+    command = [
+        sys.executable,
+        __file__,
+        "--worker",
+        str(csv_path),
+        "--html",
+        str(args.html),
+        "--pdf",
+        str(args.pdf),
+    ]
+    if rows <= args.trace_rows:
+        command.append("--trace")
+
+    proc = subprocess.run(command, check=True, capture_output=True, text=True)
+    # Libraries may print notices of their own (WeasyPrint does when it cannot load), so the
+    # results are read from the last line only
+    stages = json.loads(proc.stdout.splitlines()[-1])
+    return {"rows": rows, "csv_bytes": csv_path.stat().st_size, "stages": stages}
+
+
+def git_commit() -> str | None:
+    try:
+        proc = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return proc.stdout.strip()
+
+
+def print_run(run: dict[str, Any]) -> None:
+    for stage in run["stages"]:
+        if stage["skipped"] is not None:
+            print(f"{run['rows']:>10,} {stage['stage']:<7} skipped: {stage['skipped']}")
+            continue
+        rss = stage["peak_rss_bytes"] or 0
+        alloc = stage["alloc_peak_bytes"]
+        alloc_text = "" if alloc is None else f"   alloc peak {alloc / KIB**2:>8.1f} MiB"
+        print(
+            f"{run['rows']:>10,} {stage['stage']:<7} {stage['rows_per_sec']:>12,.0f} rows/s"
+            f"   {stage['seconds']:>8.3f} s   RSS {rss / KIB**2:>8.1f} MiB{alloc_text}"
+        )
+
+
+def compare(results: dict[str, Any], baseline_path: str) -> None:
+    baseline = json.loads(Path(baseline_path).read_text())
+    before = {
+        (run["rows"], stage["stage"]): stage["rows_per_sec"]
+        for run in baseline["runs"]
+        for stage in run["stages"]
+    }
+    print(f"\nrows/sec against {baseline_path} ({baseline['meta'].get('commit')})")
+    for run in results["runs"]:
+        for stage in run["stages"]:
+            old = before.get((run["rows"], stage["stage"]))
+            new = stage["rows_per_sec"]
+            if not old or not new:
+                continue
+            print(
+                f"{run['rows']:>10,} {stage['stage']:<7} {old:>12,.0f} -> {new:>12,.0f}"
+                f"   x{new / old:.2f}"
+            )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark invoicegen from CSV to PDF.")
+    parser.add_argument(
+        "--rows",
+        nargs="+",
+        type=parse_count,
+        default=[parse_count(value) for value in DEFAULT_ROWS],
+        help="Row counts to run, e.g. 1k 100k 10M (default 1k 10k 100k)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic files")
+    parser.add_argument(
+        "--data-dir",
+        default=Path(tempfile.gettempdir()) / "invoicegen-bench",
+        help="Where the synthetic CSVs are kept between runs",
+    )
+    parser.add_argument("--html", type=int, default=200, help="Invoices rendered to HTML")
+    parser.add_argument("--pdf", type=int, default=20, help="Invoices rendered to PDF")
+    parser.add_argument(
+        "--trace-rows",
+        type=parse_count,
+        default=parse_count("100k"),
+        help="Largest row count that also gets a tracemalloc run (default 100k)",
+    )
+    parser.add_argument("--out", help="JSON file for the results (default stdout)")
+    parser.add_argument("--compare", help="Earlier JSON results to compare against")
+    # Internal: run the stages of one file in this process and print them as JSON
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--trace", action="store_true", help=argparse.SUPPRESS)
+    return parser
+
+
+def main() -> None:
+    args = build_parser().parse_args()
+    if args.worker:
+        stages = run_stages(Path(args.worker), args.html, args.pdf, args.trace)
+        print(json.dumps(stages))
+        return
+
+    results: dict[str, Any] = {
+        "meta": {
+            "commit": git_commit(),
+            "invoicegen": __version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "created": datetime.now(UTC).isoformat(timespec="seconds"),
+        },
+        "runs": [],
+    }
+    for rows in sorted(args.rows):
+        run = run_size(rows, args)
+        results["runs"].append(run)
+        # The table goes to stderr, so stdout stays valid JSON without --out
+        with contextlib.redirect_stdout(sys.stderr):
+            print_run(run)
+
+    output = json.dumps(results, indent=2)
+    if args.out:
+        Path(args.out).write_text(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with contextlib.redirect_stdout(sys.stderr):
+            compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
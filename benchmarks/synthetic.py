@@ -0,0 +1,138 @@
+import argparse
+import csv
+import random
+from collections.abc import Iterator
+from datetime import date, timedelta
+from decimal import Decimal
+from itertools import accumulate
+from pathlib import Path
+
+"""
+Synthetic job line CSVs for the benchmarks.
+
+The files follow the README contract and look like a property manager's export:
+- about one address per 400 rows, where a few busy properties get most of the work,
+- one to eight units per address,
+- dates spread over half a year in export order, with a few entries logged late,
+- a small pool of job descriptions, mostly single quantities and round prices,
+- a Total column, and about a third of the lines paid.
+
+The same rows and seed always give the same file.
+
+    python benchmarks/synthetic.py 100000 jobs.csv
+"""
+
+HEADER = ["Date", "Address", "Unit", "Description", "Unit Price", "Quantity", "Total", "Paid"]
+START = date(2024, 6, 1)
+SPAN_DAYS = 182
+ROWS_PER_ADDRESS = 400
+MAX_ADDRESSES = 50_000
+# Share of lines entered after later ones, which makes their group need sorting
+LATE_SHARE = 0.05
+PAID_SHARE = 0.3
+
+STREETS = ["Elm", "Oak", "Maple", "Cedar", "Pine", "Hill", "Lake", "Elderwood", "Elizabeth"]
+SUFFIXES = ["St", "Ave", "Rd", "Ct", "Ln", "Way"]
+UNITS = ["A", "B", "C", "D", "Single", "Front", "Rear", *[str(number) for number in range(1, 25)]]
+DESCRIPTIONS = [
+    "Repair leaking toilet.",
+    "Change doorknob.",
+    "Paint bedroom.",
+    "Unclog sink.",
+    "Repair hole in wall.",
+    "Connect filter.",
+    "Replace smoke detector battery.",
+    "Clean bathroom and floor. Throw out trash.",
+    "Change sink faucet.",
+    "Replace light fixture.",
+    "Service furnace.",
+    "Fix garbage disposal.",
+    "Rekey front door.",
+    "Patch drywall, prime and paint.",
+    "Replace window screen.",
+    "Caulk bathtub.",
+]
+RATES = ["45", "65", "75", "80", "100", "120", "150", "250", "1,000.00", "$85.50"]
+QUANTITIES = ["1", "1", "1", "1", "2", "1.5", "0.5", "0.25", "3"]
+
+
+def address_pool(rows: int, rng: random.Random) -> list[tuple[str, list[str]]]:
+    count = min(max(rows // ROWS_PER_ADDRESS, 3), MAX_ADDRESSES)
+    pool = []
+    for number in range(count):
+        street = f"{100 + number} {rng.choice(STREETS)} {rng.choice(SUFFIXES)}"
+        pool.append((street, rng.sample(UNITS, rng.randint(1, 8))))
+    return pool
+
+
+def iter_rows(rows: int, seed: int = 0) -> Iterator[list[str]]:
+    """Yield the given number of records, without the header."""
+    rng = random.Random(seed)
+    pool = address_pool(rows, rng)
+    # Zipf-like weights: the first properties get most of the jobs
+    cum_weights = list(accumulate(1 / (rank + 1) for rank in range(len(pool))))
+
+    for index in range(rows):
+        day = index * SPAN_DAYS // max(rows, 1)
+        if rng.random() < LATE_SHARE:
+            day = max(day - rng.randint(1, 30), 0)
+        address, units = rng.choices(pool, cum_weights=cum_weights)[0]
+        rate = rng.choice(RATES)
+        qty = rng.choice(QUANTITIES)
+        total = Decimal(rate.replace("$", "").replace(",", "")) * Decimal(qty)
+        when = START + timedelta(days=day)
+        yield [
+            f"{when.month}/{when.day}/{when.year}",
+            address,
+            rng.choice(units),
+            rng.choice(DESCRIPTIONS),
+            rate,
+            qty,
+            f"{total:.2f}",
+            "TRUE" if rng.random() < PAID_SHARE else "FALSE",
+        ]
+
+
+def write_jobs_csv(path: str | Path, rows: int, seed: int = 0) -> Path:
+    """
+    Write a synthetic job line CSV, unless the same file was written before.
+
+    Parameters
+    ----------
+    path : str | Path
+        File to write.
+    rows : int
+        Job lines after the header.
+    seed : int
+        Random seed; the same rows and seed give the same file.
+
+    Returns
+    -------
+    Path
+        The file.
+    """
+    path = Path(path)
+    if path.exists():
+        return path
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(f"{path.name}.partial")
+    with partial.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(iter_rows(rows, seed))
+    partial.replace(path)
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Write a synthetic job line CSV.")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("path")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    write_jobs_csv(args.path, args.rows, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,29 @@
-from .models import (
-    Address,
-    BusinessInfo,
-    ClientInfo,
-    ContactInfo,
-    Invoice,
-    InvoiceHeader,
-    InvoiceMeta,
-    JobLine,
-    Payment,
-)
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    __version__: str
+
+    from .models import (
+        Address,
+        BusinessInfo,
+        ClientInfo,
+        ContactInfo,
+        Invoice,
+        InvoiceHeader,
+        InvoiceMeta,
+        JobLine,
+        Payment,
+    )
+
+"""
+Generate invoices from job data.
+
+The models are exported lazily: they are imported from invoicegen.models on first access,
+so `invoicegen --version` and other commands that do not need them skip loading pydantic.
+__version__ is read from the installed package's metadata on first access too, so that
+pyproject.toml holds the only copy and importing the package does not load importlib.metadata.
+"""
 
 __all__ = [
     "__version__",
@@ -22,4 +37,21 @@ __all__ = [
     "InvoiceMeta",
     "ContactInfo",
 ]
-__version__ = "0.0.1"
+
+
+def __getattr__(name: str) -> Any:
+    if name == "__version__":
+        from importlib.metadata import version  # noqa: PLC0415
+
+        value: Any = version(__name__)
+    elif name in __all__:
+        value = getattr(import_module(".models", __name__), name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # Cache it, so later lookups do not come through here again
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -1,16 +1,129 @@
 from __future__ import annotations
 
 import argparse
-from importlib.metadata import PackageNotFoundError, version
+import sys
+import warnings
+from typing import TYPE_CHECKING, Any
 
-PKG = "invoicegen"
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+    from invoicegen.config import InvoiceConfig
+    from invoicegen.core.pipeline import OutputKind
+    from invoicegen.io.payments import PaymentRow
+    from invoicegen.models import Invoice, InvoiceHeader, JobLine, JobLineBatch
+    from invoicegen.render import PDFReport
+    from invoicegen.stats import Stats
+
+# Where --incremental keeps its state by default: next to the input for validate, and in the
+# output directory for render, so removing the outputs also starts over
+VALIDATE_STATE_SUFFIX = ".invoicegen-state.json"
+RENDER_STATE_FILE = ".invoicegen-state.json"
+# Inputs holding validated job lines, read by io.columnar; checked here so that runs on CSV
+# files do not import pandas
+COLUMNAR_SUFFIXES = (".parquet", ".feather", ".arrow")
+# Combined invoice totals of a batch run, in its output directory unless --summary is given
+BATCH_SUMMARY_FILE = "summary.csv"
 
 
 def get_version() -> str:
-    try:
-        return version(PKG)
-    except PackageNotFoundError:
-        return "0.0.1+dev"
+    # Read from the package metadata only here, as importlib.metadata takes longer to import
+    # than the rest of the CLI
+    from invoicegen import __version__  # noqa: PLC0415
+
+    return __version__
+
+
+class VersionAction(argparse.Action):
+    # Like action="version", but the version is only read when --version is given
+    def __init__(self, option_strings: list[str], dest: str, **kwargs: Any) -> None:
+        super().__init__(option_strings, dest, nargs=0, default=argparse.SUPPRESS, **kwargs)
+
+    def __call__(self, parser: argparse.ArgumentParser, *args: object) -> None:
+        print(f"{parser.prog} {get_version()}")
+        parser.exit()
+
+
+def non_negative_int(value: str) -> int:
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must be at least 0, got {number}")
+    return number
+
+
+def warning_printer(show: Callable[..., None]) -> Callable[..., None]:
+    """A warnings.showwarning printing input notices, and passing other warnings to show."""
+
+    def show_warning(message: Warning | str, category: type[Warning], *args: Any) -> None:
+        from invoicegen.io import CSVWarning  # noqa: PLC0415
+
+        if issubclass(category, CSVWarning):
+            # Input notices are meant for the user, not a traceback-style source location
+            print(f"[invoicegen] warning: {message}", file=sys.stderr)
+        else:
+            show(message, category, *args)
+
+    return show_warning
+
+
+def add_incremental_arguments(parser: argparse.ArgumentParser, default_state: str) -> None:
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only redo the projects whose rows changed since the previous incremental run",
+    )
+    parser.add_argument(
+        "--state",
+        dest="state_file",
+        default=None,
+        help=f"State file of --incremental (default {default_state})",
+    )
+
+
+def add_invoice_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--in",
+        dest="in_file",
+        required=True,
+        help="Path to input file: a CSV, or job lines saved by validate --save-lines",
+    )
+    parser.add_argument(
+        "--client", dest="client_file", required=True, help="Path to client info YAML"
+    )
+
+
+def add_payments_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--payments",
+        dest="payments_file",
+        metavar="PATH",
+        default=None,
+        help="Apply the payments of a CSV (Date, Amount, and Invoice, Client or Project) to "
+        "the invoices before writing them, and list what could not be applied",
+    )
+
+
+def add_summary_argument(parser: argparse.ArgumentParser, required: bool = False) -> None:
+    parser.add_argument(
+        "--summary",
+        dest="summary_file",
+        metavar="PATH",
+        required=required,
+        default=None,
+        help="Write each invoice's number, project and totals to PATH "
+        "(.parquet, .feather, .arrow or .csv)",
+    )
+
+
+def add_pipeline_argument(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--pipeline",
+        action="store_true",
+        help="Read, validate, build and render at the same time, rendering each project once "
+        "its last row is validated; projects with invalid rows are skipped instead of "
+        "stopping the run",
+    )
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -18,23 +131,540 @@ def build_parser() -> argparse.ArgumentParser:
         prog="invoicegen",
         description="Generate invoices from job data.",
     )
-    parser.add_argument("--version", action="version", version=f"%(prog)s {get_version()}")
+    parser.add_argument(
+        "--version", action=VersionAction, help="show program's version number and exit"
+    )
 
     subparsers = parser.add_subparsers(dest="command", required=False)
 
-    validate_p = subparsers.add_parser("validate", help="Validate input data files.")
-    validate_p.add_argument("--in", dest="in_file", required=False, help="Path to input file")
+    # Options every subcommand takes
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print time, counts and peak memory growth per stage to stderr",
+    )
+    common.add_argument(
+        "--stats-json",
+        metavar="PATH",
+        default=None,
+        help="Write the --stats figures as JSON to PATH ('-' for stdout, which moves the "
+        "other output to stderr)",
+    )
+    common.add_argument(
+        "--profile",
+        choices=["cpu", "mem"],
+        default=None,
+        help="Profile the run with cProfile (cpu, writes a .prof file) or tracemalloc (mem, "
+        "writes an allocation report), next to the output",
+    )
+    common.add_argument(
+        "--profile-top",
+        type=non_negative_int,
+        default=25,
+        help="Functions or lines listed in the profile report (default 25)",
+    )
+
+    validate_p = subparsers.add_parser(
+        "validate", parents=[common], help="Validate input data files."
+    )
+    validate_p.add_argument("--in", dest="in_file", required=True, help="Path to input file")
+    validate_p.add_argument(
+        "--jobs",
+        type=non_negative_int,
+        default=1,
+        help="Worker processes for large files (0 = one per CPU, default 1)",
+    )
+    add_incremental_arguments(validate_p, f"<input>{VALIDATE_STATE_SUFFIX}")
+    validate_p.add_argument(
+        "--save-lines",
+        dest="lines_file",
+        metavar="PATH",
+        default=None,
+        help="When every row is valid, save the job lines to PATH (.parquet, .feather or "
+        ".arrow) for preview, render and summary to read instead of the CSV",
+    )
+
+    preview_p = subparsers.add_parser(
+        "preview", parents=[common], help="Render HTML preview (no PDF)."
+    )
+    add_invoice_arguments(preview_p)
+    add_payments_argument(preview_p)
+    preview_p.add_argument(
+        "--out", dest="out_dir", default="preview", help="Output directory (default preview)"
+    )
+    add_summary_argument(preview_p)
+    add_pipeline_argument(preview_p)
+    preview_p.add_argument(
+        "--jobs",
+        type=non_negative_int,
+        default=1,
+        help="Worker processes for validation and rendering with --pipeline "
+        "(0 = one per CPU, default 1)",
+    )
+
+    render_p = subparsers.add_parser("render", parents=[common], help="Render PDFs per unit.")
+    add_invoice_arguments(render_p)
+    add_payments_argument(render_p)
+    render_p.add_argument(
+        "--out", dest="out_dir", default="invoices", help="Output directory (default invoices)"
+    )
+    render_p.add_argument(
+        "--jobs",
+        type=non_negative_int,
+        default=0,
+        help="Worker processes for PDF rendering (0 = one per CPU, default 0)",
+    )
+    render_p.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        help="Render every PDF instead of reusing unchanged ones from the render cache",
+    )
+    add_incremental_arguments(render_p, f"<out>/{RENDER_STATE_FILE}")
+    add_summary_argument(render_p)
+    add_pipeline_argument(render_p)
 
-    preview_p = subparsers.add_parser("preview", help="Render HTML preview (no PDF).")
-    preview_p.add_argument("--in", dest="in_file", required=False, help="Path to input file")
+    summary_p = subparsers.add_parser(
+        "summary", parents=[common], help="Write invoice totals without rendering anything."
+    )
+    add_invoice_arguments(summary_p)
+    add_payments_argument(summary_p)
+    add_summary_argument(summary_p, required=True)
 
-    render_p = subparsers.add_parser("render", help="Render PDFs per unit.")
-    render_p.add_argument("--in", dest="in_file", required=False, help="Path to input file")
-    render_p.add_argument("--out", dest="out_dir", required=False, help="Output directory")
+    batch_p = subparsers.add_parser(
+        "batch", parents=[common], help="Render the invoices of many clients in one run."
+    )
+    batch_p.add_argument(
+        "--in",
+        dest="in_file",
+        required=True,
+        help="Directory of <client>.csv files, each with a <client>.yaml client info file, "
+        "or a YAML manifest listing the jobs and client files",
+    )
+    batch_p.add_argument(
+        "--out",
+        dest="out_dir",
+        default="invoices",
+        help="Output directory, with one folder per client (default invoices)",
+    )
+    batch_p.add_argument("--html", action="store_true", help="Write HTML previews instead of PDFs")
+    batch_p.add_argument(
+        "--jobs",
+        type=non_negative_int,
+        default=0,
+        help="Worker processes for PDF rendering, shared by every client "
+        "(0 = one per CPU, default 0)",
+    )
+    batch_p.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        help="Render every PDF instead of reusing unchanged ones from the render cache",
+    )
+    batch_p.add_argument(
+        "--summary",
+        dest="summary_file",
+        metavar="PATH",
+        default=None,
+        help="Write every client's invoice numbers, projects and totals to PATH (.parquet, "
+        f".feather, .arrow or .csv; default <out>/{BATCH_SUMMARY_FILE})",
+    )
 
     return parser
 
 
+def is_columnar(path: str) -> bool:
+    return path.lower().endswith(COLUMNAR_SUFFIXES)
+
+
+def run_validate(args: Any) -> int:
+    if args.incremental:
+        return run_validate_incremental(args)
+
+    from invoicegen.io.parallel import validate_file  # noqa: PLC0415
+
+    save = args.lines_file is not None
+    try:
+        report = validate_file(args.in_file, jobs=args.jobs, keep_lines=save)
+        if save and not report.errors:
+            from invoicegen.io.columnar import write_joblines  # noqa: PLC0415
+
+            write_joblines(report.lines, args.lines_file)
+    except (OSError, RuntimeError, ValueError) as exc:
+        print(f"[invoicegen] error: {exc}", file=sys.stderr)
+        return 2
+
+    for error in report.errors:
+        print(error)
+
+    invalid = len({error.source_row for error in report.errors})
+    print(f"[invoicegen] validate: {report.valid} valid, {invalid} invalid ({args.in_file})")
+    if save:
+        saved = "nothing saved" if report.errors else f"job lines -> {args.lines_file}"
+        print(f"[invoicegen] validate: {saved}")
+    return 1 if report.errors else 0
+
+
+def run_validate_incremental(args: Any) -> int:
+    from invoicegen.config import load_config  # noqa: PLC0415
+    from invoicegen.core.grouping import invoice_group_by  # noqa: PLC0415
+    from invoicegen.core.incremental import IncrementalRun, RunState  # noqa: PLC0415
+    from invoicegen.io import RowError  # noqa: PLC0415
+
+    if args.lines_file is not None:
+        print(
+            "[invoicegen] error: --save-lines needs every row, not --incremental", file=sys.stderr
+        )
+        return 2
+
+    state_path = args.state_file or f"{args.in_file}{VALIDATE_STATE_SUFFIX}"
+    errors: list[RowError] = []
+    try:
+        group_by = invoice_group_by(load_config())
+        run = IncrementalRun(args.in_file, RunState.load(state_path), group_by, "validate")
+        lines = run.validate(errors.append)
+        run.state(dict.fromkeys(run.valid_groups(errors))).save(state_path)
+    except (OSError, ValueError) as exc:
+        print(f"[invoicegen] error: {exc}", file=sys.stderr)
+        return 2
+
+    for error in errors:
+        print(error)
+
+    # Rows of unchanged projects passed validation in an earlier run
+    valid = run.unchanged_rows + len(lines)
+    invalid = len({error.source_row for error in errors})
+    print(f"[invoicegen] validate: {valid} valid, {invalid} invalid ({args.in_file})")
+    print(f"[invoicegen] incremental: {run.summary()}")
+    return 1 if errors else 0
+
+
+def print_errors(args: Any, errors: list[Any]) -> None:
+    for error in errors:
+        print(error)
+    print(f"[invoicegen] {args.command}: {len(errors)} errors, nothing rendered")
+
+
+def invoice_header(config: InvoiceConfig, args: Any) -> InvoiceHeader:
+    from invoicegen.config import load_client  # noqa: PLC0415
+    from invoicegen.models import InvoiceHeader, InvoiceMeta  # noqa: PLC0415
+
+    return InvoiceHeader(
+        business=config.business_info,
+        client=load_client(args.client_file),
+        # Replaced by each invoice's own number
+        meta=InvoiceMeta(number="DRAFT"),
+    )
+
+
+def load_invoices(args: Any) -> list[Invoice] | None:
+    """Validate the input files and build their invoices, or print the errors and return None."""
+    from invoicegen.config import load_config  # noqa: PLC0415
+    from invoicegen.core import build_invoices  # noqa: PLC0415
+    from invoicegen.io import RowError, read_joblines  # noqa: PLC0415
+
+    config = load_config()
+    if is_columnar(args.in_file):
+        from invoicegen.io.columnar import read_jobline_batch  # noqa: PLC0415
+
+        # Saved by validate --save-lines, so already valid
+        lines: list[JobLine] | JobLineBatch = read_jobline_batch(args.in_file)
+    else:
+        errors: list[RowError] = []
+        lines = list(read_joblines(args.in_file, on_error=errors.append))
+        if errors:
+            print_errors(args, errors)
+            return None
+
+    # Read before building, so invalid payments stop the run before numbers are drawn
+    payments = read_payment_rows(args)
+    if payments is None:
+        return None
+
+    invoices = build_invoices(lines, invoice_header(config, args), config)
+    apply_payments(args, invoices, payments)
+    return invoices
+
+
+def read_payment_rows(args: Any) -> list[PaymentRow] | None:
+    """The valid rows of --payments (none without it), or print the invalid ones and return None."""
+    if args.payments_file is None:
+        return []
+
+    from invoicegen.io import RowError  # noqa: PLC0415
+    from invoicegen.io.payments import read_payments  # noqa: PLC0415
+
+    errors: list[RowError] = []
+    rows = read_payments(args.payments_file, on_error=errors.append)
+    if errors:
+        print_errors(args, errors)
+        return None
+    return rows
+
+
+def apply_payments(args: Any, invoices: list[Invoice], rows: list[PaymentRow]) -> None:
+    """Apply the rows of --payments to the invoices and print what was not applied."""
+    if args.payments_file is None:
+        return
+
+    from invoicegen.core.payments import PaymentMatcher  # noqa: PLC0415
+
+    report = PaymentMatcher(invoices).apply(rows)
+    for item in report.unapplied:
+        print(item)
+    print(f"[invoicegen] payments: {report.summary()}")
+
+
+def write_summary(args: Any, invoices: list[Invoice]) -> None:
+    if args.summary_file is None:
+        return
+
+    from invoicegen.io.columnar import write_invoice_summaries  # noqa: PLC0415
+
+    write_invoice_summaries(invoices, args.summary_file)
+    print(f"[invoicegen] {args.command}: {len(invoices)} invoice totals -> {args.summary_file}")
+
+
+def run_preview(args: Any) -> int:
+    if args.pipeline:
+        return run_pipeline(args, "html", args.jobs)
+    if args.jobs != 1:
+        print("[invoicegen] error: --jobs only works with --pipeline", file=sys.stderr)
+        return 2
+
+    from invoicegen.render import HTMLRenderer  # noqa: PLC0415
+
+    try:
+        invoices = load_invoices(args)
+        if invoices is None:
+            return 1
+        renderer = HTMLRenderer()
+        renderer.render_all(invoices, args.out_dir)
+        write_summary(args, invoices)
+    except (OSError, RuntimeError, ValueError) as exc:
+        print(f"[invoicegen] error: {exc}", file=sys.stderr)
+        return 2
+
+    print(f"[invoicegen] preview: {renderer.timings.summary()} -> {args.out_dir}")
+    return 0
+
+
+def show_progress(done: int, total: int) -> None:
+    # Rewrite one line on a terminal, otherwise only log the end
+    if sys.stderr.isatty():
+        end = "\n" if done == total else ""
+        print(f"\r[invoicegen] render: {done}/{total} PDFs", end=end, file=sys.stderr)
+    elif done == total:
+        print(f"[invoicegen] render: {done}/{total} PDFs", file=sys.stderr)
+
+
+def run_render(args: Any) -> int:
+    if args.pipeline:
+        return run_pipeline(args, "pdf", args.jobs)
+    if args.incremental:
+        return run_render_incremental(args)
+
+    from invoicegen.config.models import CONFIG_DIR  # noqa: PLC0415
+    from invoicegen.render.cache import (  # noqa: PLC0415
+        RenderCache,
+        default_pdf_cache_dir,
+        render_cached,
+        render_fingerprint,
+    )
+    from invoicegen.render.pdf import logo_path, render_pdfs  # noqa: PLC0415
+
+    try:
+        invoices = load_invoices(args)
+        if invoices is None:
+            return 1
+        logo = logo_path(invoices[0].header.business, CONFIG_DIR) if invoices else None
+
+        cache = None
+        if args.use_cache:
+            cache = RenderCache(default_pdf_cache_dir(), render_fingerprint(logo=logo))
+
+        def render(pending: list[Invoice], out_dir: Path) -> PDFReport:
+            return render_pdfs(pending, out_dir, jobs=args.jobs, logo=logo, progress=show_progress)
+
+        report = render_cached(cache, invoices, args.out_dir, render)
+        write_summary(args, invoices)
+    except (OSError, RuntimeError, ValueError) as exc:
+        print(f"[invoicegen] error: {exc}", file=sys.stderr)
+        return 2
+
+    print(f"[invoicegen] render: {report.summary()} -> {args.out_dir}")
+    return 0
+
+
+def run_render_incremental(args: Any) -> int:
+    import hashlib  # noqa: PLC0415
+    from pathlib import Path  # noqa: PLC0415
+
+    from invoicegen.config import load_client, load_config  # noqa: PLC0415
+    from invoicegen.config.models import CONFIG_DIR  # noqa: PLC0415
+    from invoicegen.core.grouping import invoice_group_by  # noqa: PLC0415
+    from invoicegen.core.incremental import IncrementalRun, RunState  # noqa: PLC0415
+    from invoicegen.io import RowError  # noqa: PLC0415
+    from invoicegen.render.cache import (  # noqa: PLC0415
+        RenderCache,
+        default_pdf_cache_dir,
+        render_cached,
+        render_fingerprint,
+    )
+    from invoicegen.render.html import number_file_name  # noqa: PLC0415
+    from invoicegen.render.pdf import logo_path, render_pdfs  # noqa: PLC0415
+
+    if is_columnar(args.in_file):
+        print("[invoicegen] error: --incremental needs a CSV input", file=sys.stderr)
+        return 2
+    # Only the invoices of changed projects are built
+    for option, given in [
+        ("--summary", args.summary_file is not None),
+        ("--payments", args.payments_file is not None),
+    ]:
+        if given:
+            print(
+                f"[invoicegen] error: {option} needs every invoice, not --incremental",
+                file=sys.stderr,
+            )
+            return 2
+
+    out_dir = Path(args.out_dir)
+    state_path = args.state_file or out_dir / RENDER_STATE_FILE
+    try:
+        config = load_config()
+        logo = logo_path(config.business_info, CONFIG_DIR)
+        fingerprint = render_fingerprint(logo=logo)
+
+        # Everything besides the rows that ends up in the PDFs; the sequence start moves
+        # forward with every run, so it is left out
+        context = hashlib.sha256(fingerprint.encode())
+        context.update(config.model_dump_json(exclude={"sequence_start"}).encode())
+        context.update(load_client(args.client_file).model_dump_json().encode())
+
+        run = IncrementalRun(
+            args.in_file, RunState.load(state_path), invoice_group_by(config), context.hexdigest()
+        )
+        errors: list[RowError] = []
+        lines = run.validate(errors.append)
+        if errors:
+            print_errors(args, errors)
+            return 1
+
+        invoices = run.build(lines, invoice_header(config, args), config)
+        cache = RenderCache(default_pdf_cache_dir(), fingerprint) if args.use_cache else None
+
+        def render(pending: list[Invoice], out_dir: Path) -> PDFReport:
+            return render_pdfs(pending, out_dir, jobs=args.jobs, logo=logo, progress=show_progress)
+
+        report = render_cached(cache, list(invoices.values()), out_dir, render)
+
+        # PDFs of projects that are gone from the CSV
+        for group in run.removed.values():
+            if group.number is not None:
+                (out_dir / number_file_name(group.number, ".pdf")).unlink(missing_ok=True)
+
+        done = {key: invoice.header.meta.number for key, invoice in invoices.items()}
+        run.state(done).save(state_path)
+    except (OSError, RuntimeError, ValueError) as exc:
+        print(f"[invoicegen] error: {exc}", file=sys.stderr)
+        return 2
+
+    print(f"[invoicegen] render: {report.summary()} -> {args.out_dir}")
+    print(f"[invoicegen] incremental: {run.summary()}")
+    return 0
+
+
+def run_pipeline(args: Any, kind: OutputKind, jobs: int) -> int:
+    from pathlib import Path  # noqa: PLC0415
+
+    from invoicegen.config import load_config  # noqa: PLC0415
+    from invoicegen.config.models import CONFIG_DIR  # noqa: PLC0415
+    from invoicegen.core.pipeline import Pipeline  # noqa: PLC0415
+    from invoicegen.render.cache import (  # noqa: PLC0415
+        RenderCache,
+        default_pdf_cache_dir,
+        render_fingerprint,
+    )
+    from invoicegen.render.pdf import logo_path  # noqa: PLC0415
+
+    # The pipeline streams a CSV and keeps no invoices once they are rendered
+    for option, given in [
+        ("--incremental", getattr(args, "incremental", False)),
+        ("--summary", args.summary_file is not None),
+        ("--payments", args.payments_file is not None),
+        ("a saved job line input", is_columnar(args.in_file)),
+    ]:
+        if given:
+            print(f"[invoicegen] error: --pipeline does not work with {option}", file=sys.stderr)
+            return 2
+
+    try:
+        config = load_config()
+        logo = logo_path(config.business_info, CONFIG_DIR) if kind == "pdf" else None
+        cache = None
+        if kind == "pdf" and args.use_cache:
+            cache = RenderCache(default_pdf_cache_dir(), render_fingerprint(logo=logo))
+
+        header = invoice_header(config, args)
+        pipeline = Pipeline(
+            header, config, Path(args.out_dir), kind=kind, jobs=jobs, logo=logo, cache=cache
+        )
+        report = pipeline.run(args.in_file)
+    except (OSError, RuntimeError, ValueError) as exc:
+        print(f"[invoicegen] error: {exc}", file=sys.stderr)
+        return 2
+
+    for error in report.errors:
+        print(error)
+    print(f"[invoicegen] {args.command}: {report.summary()} -> {args.out_dir}")
+    return 1 if report.errors else 0
+
+
+def run_batch(args: Any) -> int:
+    from pathlib import Path  # noqa: PLC0415
+
+    from invoicegen.config import load_config  # noqa: PLC0415
+    from invoicegen.config.models import CONFIG_DIR  # noqa: PLC0415
+    from invoicegen.core.batch import Batch, find_inputs  # noqa: PLC0415
+    from invoicegen.render.cache import (  # noqa: PLC0415
+        RenderCache,
+        default_pdf_cache_dir,
+        render_fingerprint,
+    )
+    from invoicegen.render.pdf import logo_path  # noqa: PLC0415
+
+    kind: OutputKind = "html" if args.html else "pdf"
+    out_dir = Path(args.out_dir)
+    summary_path = args.summary_file or out_dir / BATCH_SUMMARY_FILE
+    try:
+        inputs = find_inputs(args.in_file)
+        config = load_config()
+        logo = logo_path(config.business_info, CONFIG_DIR) if kind == "pdf" else None
+        cache = None
+        if kind == "pdf" and args.use_cache:
+            cache = RenderCache(default_pdf_cache_dir(), render_fingerprint(logo=logo))
+
+        batch = Batch(config, out_dir, kind=kind, jobs=args.jobs, logo=logo, cache=cache)
+        report = batch.run(inputs)
+        report.write_summary(summary_path)
+    except (OSError, RuntimeError, ValueError) as exc:
+        print(f"[invoicegen] error: {exc}", file=sys.stderr)
+        return 2
+
+    for result in report.failed:
+        for error in result.errors:
+            print(f"{result.name}: {error}")
+        if result.failure is not None:
+            print(f"{result.name}: {result.failure}")
+        if not result.paths:
+            print(f"[invoicegen] batch: {result.name}: nothing rendered")
+    print(f"[invoicegen] batch: {report.summary()} -> {out_dir}")
+    print(f"[invoicegen] batch: invoice totals -> {summary_path}")
+    return 1 if report.failed else 0
+
+
 def main(argv: list[str] | None = None) -> int:
     parser = build_parser()
     args = parser.parse_args(argv)
@@ -43,9 +673,83 @@ def main(argv: list[str] | None = None) -> int:
         parser.print_help()
         return 0
 
+    with warnings.catch_warnings():
+        warnings.showwarning = warning_printer(warnings.showwarning)
+        if not (args.stats or args.stats_json or args.profile):
+            return run_command(args)
+        return run_with_stats(args)
+
+
+def run_with_stats(args: Any) -> int:
+    from contextlib import nullcontext, redirect_stdout  # noqa: PLC0415
+
+    from invoicegen import stats  # noqa: PLC0415
+
+    # With --stats-json -, stdout holds the JSON alone so it can be parsed
+    output = redirect_stdout(sys.stderr) if args.stats_json == "-" else nullcontext()
+    collected = stats.enable()
+    try:
+        with output:
+            if args.profile:
+                from invoicegen.profiling import profile_run  # noqa: PLC0415
+
+                return profile_run(
+                    args.profile, lambda: run_command(args), profile_base(args), args.profile_top
+                )
+            return run_command(args)
+    finally:
+        stats.disable()
+        report_stats(args, collected)
+
+
+def run_summary(args: Any) -> int:
+    try:
+        invoices = load_invoices(args)
+        if invoices is None:
+            return 1
+        write_summary(args, invoices)
+    except (OSError, RuntimeError, ValueError) as exc:
+        print(f"[invoicegen] error: {exc}", file=sys.stderr)
+        return 2
+    return 0
+
+
+def profile_base(args: Any) -> Path:
+    from pathlib import Path  # noqa: PLC0415
+
+    # Next to the output, or next to the input for commands that write none
+    out_dir = getattr(args, "out_dir", None)
+    directory = Path(out_dir) if out_dir else Path(args.in_file).parent
+    return directory / f"invoicegen-{args.command}"
+
+
+def run_command(args: Any) -> int:
+    if args.command == "validate":
+        return run_validate(args)
+    if args.command == "preview":
+        return run_preview(args)
+    if args.command == "render":
+        return run_render(args)
+    if args.command == "summary":
+        return run_summary(args)
+    if args.command == "batch":
+        return run_batch(args)
+
     print(f"[invoicegen] command={args.command} (skeleton)")
     return 0
 
 
+def report_stats(args: Any, collected: Stats) -> None:
+    import json  # noqa: PLC0415
+
+    if args.stats:
+        print(collected.summary(), file=sys.stderr)
+    if args.stats_json == "-":
+        print(json.dumps(collected.to_json(), indent=2))
+    elif args.stats_json:
+        with open(args.stats_json, "w", encoding="utf-8") as f:
+            json.dump(collected.to_json(), f, indent=2)
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
@@ -1,3 +1,3 @@
-from .models import InvoiceConfig, load_config
+from .models import InvoiceConfig, load_client, load_config, reload_config
 
-__all__ = ["InvoiceConfig", "load_config"]
+__all__ = ["InvoiceConfig", "load_client", "load_config", "reload_config"]
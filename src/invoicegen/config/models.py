@@ -1,11 +1,15 @@
 from decimal import Decimal
 from pathlib import Path
-from typing import Literal
+from typing import Any, Literal
 
 import yaml
 from pydantic import BaseModel, ConfigDict, Field
 
-from invoicegen.models.header import BusinessInfo
+from invoicegen.models.header import BusinessInfo, ClientInfo
+
+CONFIG_DIR = Path(__file__).parent
+
+GroupBy = Literal["project", "unit"]
 
 
 class InvoiceConfig(BaseModel):
@@ -19,13 +23,27 @@ class InvoiceConfig(BaseModel):
 
     # Invoice numbering information
     invoice_pattern: Literal["ym_unit_seq", "ym_seq", "simple_seq"] = Field(
-        default="ym_seq", description="ym_unit_seq -> pre-YYYY-MM-UNIT-SEQ, etc."
+        default="ym_seq",
+        description="ym_seq -> preYYYYMM-SEQ, ym_unit_seq -> preYYYY-MM-UNIT-SEQ, simple_seq -> preSEQ",
     )
     invoice_prefix: str = Field(default="", description="Fixed prefix for invoice numbers.")
     sequence_start: Decimal = Field(
         default=Decimal("1"), ge=0, description="Starting sequence number."
     )
 
+    sequence_file: Path | None = Field(
+        default=None,
+        description="SQLite file that shares the sequence between concurrent runs.",
+    )
+    sequence_block: int = Field(
+        default=100, ge=1, description="Sequence numbers reserved at a time from sequence_file."
+    )
+
+    # Invoice grouping information
+    group_by: GroupBy = Field(
+        default="project", description="One invoice per project/address, or per address and unit."
+    )
+
     # Currency label information
     currency: str = Field(
         default="USD$",
@@ -37,14 +55,29 @@ class InvoiceConfig(BaseModel):
     model_config = ConfigDict(extra="ignore")
 
 
-def load_config(config_dir: str | Path | None = None) -> InvoiceConfig:
-    base_dir = Path(__file__).parent if config_dir is None else Path(__file__).parent
+# The C parser of libyaml when PyYAML was built with it, several times faster
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+CONFIG_FILES = ("invoicegen.yaml", "business.yaml")
+
+# (st_mtime_ns, st_size) of a file, which changes whenever the file is edited
+FileStamp = tuple[int, int]
+# Resolved config directory -> stamps of CONFIG_FILES and the config built from them
+_configs: dict[Path, tuple[list[FileStamp], InvoiceConfig]] = {}
+
+
+def load_yaml(path: str | Path) -> Any:
+    with Path(path).open("r", encoding="utf-8") as f:
+        return yaml.load(f, Loader=SafeLoader)
+
+
+def file_stamp(path: Path) -> FileStamp:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
 
-    with (base_dir / "invoicegen.yaml").open("r", encoding="utf-8") as f:
-        raw_cfg = yaml.safe_load(f) or {}
 
-    with (base_dir / "business.yaml").open("r", encoding="utf-8") as f:
-        raw_business = yaml.safe_load(f) or {}
+def parse_config(base_dir: Path) -> InvoiceConfig:
+    raw_cfg = load_yaml(base_dir / "invoicegen.yaml") or {}
+    raw_business = load_yaml(base_dir / "business.yaml") or {}
 
     if "tax_rate" in raw_cfg:
         raw_cfg["tax_rate"] = Decimal(str(raw_cfg["tax_rate"]))
@@ -53,3 +86,44 @@ def load_config(config_dir: str | Path | None = None) -> InvoiceConfig:
     raw_cfg["business_info"] = business_info
 
     return InvoiceConfig(**raw_cfg)
+
+
+def load_config(config_dir: str | Path | None = None) -> InvoiceConfig:
+    """
+    The config in config_dir, parsed again only when one of its files changed.
+
+    Configs are cached per directory along with the modification time and size of
+    invoicegen.yaml and business.yaml, which are checked on every call, so long-running
+    processes pick up edits without restarting; see reload_config to force a new parse.
+
+    Parameters
+    ----------
+    config_dir : str | Path | None
+        Directory holding invoicegen.yaml and business.yaml; the package's own by default.
+
+    Returns
+    -------
+    InvoiceConfig
+        A copy of the cached config, which the caller may change (the sequence start moves
+        on as invoices are numbered) without affecting later calls.
+    """
+    base_dir = (CONFIG_DIR if config_dir is None else Path(config_dir)).resolve()
+    stamps = [file_stamp(base_dir / name) for name in CONFIG_FILES]
+
+    cached = _configs.get(base_dir)
+    if cached is None or cached[0] != stamps:
+        cached = (stamps, parse_config(base_dir))
+        _configs[base_dir] = cached
+    return cached[1].model_copy(deep=True)
+
+
+def reload_config(config_dir: str | Path | None = None) -> InvoiceConfig:
+    """Forget the cached configs and load config_dir's again, see load_config."""
+    _configs.clear()
+    return load_config(config_dir)
+
+
+def load_client(path: str | Path) -> ClientInfo:
+    raw_client = load_yaml(path) or {}
+
+    return ClientInfo(**raw_client)
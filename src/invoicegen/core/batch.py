@@ -0,0 +1,318 @@
+import time
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import pandas as pd
+import yaml
+from pydantic import BaseModel, ConfigDict, Field
+
+from invoicegen import stats
+from invoicegen.config import InvoiceConfig, load_client
+from invoicegen.config.models import load_yaml
+from invoicegen.io import RowError, read_joblines
+from invoicegen.io.columnar import (
+    SUMMARY_COLUMNS,
+    SUMMARY_FORMATS,
+    file_format,
+    invoice_summaries,
+    write_frame,
+)
+from invoicegen.models import Invoice, InvoiceHeader, InvoiceMeta
+from invoicegen.render.cache import RenderCache
+from invoicegen.render.html import HTMLRenderer, output_name
+from invoicegen.render.pdf import PDFPool
+
+from .grouping import build_invoices
+from .pipeline import OutputKind
+
+"""
+Invoices for many clients in one run.
+
+Each input pairs a job line CSV with the ClientInfo YAML of the client it bills. Running
+invoicegen once per client pays for interpreter start-up, the config and the templates every
+time; a batch loads the config once and keeps one HTML renderer, or one pool of PDF workers,
+for every input. The PDF workers are fed from all inputs in turn: the invoices of a client are
+built while the PDFs of the clients before it are still being written, so workers do not sit
+idle at the end of each client.
+
+Inputs come from a directory, where every <name>.csv is paired with <name>.yaml (or .yml), or
+from a manifest listing them, with paths relative to the manifest:
+
+    clients:
+      - name: elm             # output folder, the CSV's name when left out
+        jobs: elm/october.csv
+        client: elm/client.yaml
+
+Each client's files go to <out>/<name>/. A client with invalid rows, or whose files cannot be
+read, is reported and left out, and every other client is still rendered. A PDF that fails to
+render is reported with its client, and the other PDFs are still written and cached. The
+config's invoice sequence is shared, so numbers continue from one client to the next.
+"""
+
+MANIFEST_SUFFIXES = (".yaml", ".yml")
+# Client files next to a CSV in an input directory, in order of preference
+CLIENT_SUFFIXES = (".yaml", ".yml")
+
+
+class ManifestEntry(BaseModel):
+    name: str | None = None
+    jobs: Path
+    client: Path
+
+    model_config = ConfigDict(extra="forbid")
+
+
+class Manifest(BaseModel):
+    clients: list[ManifestEntry] = Field(min_length=1)
+
+    model_config = ConfigDict(extra="forbid")
+
+
+@dataclass(slots=True)
+class BatchInput:
+    # Output folder of the client, under the batch's output directory
+    name: str
+    jobs_file: Path
+    client_file: Path
+
+
+def directory_inputs(directory: Path) -> list[BatchInput]:
+    """Every <name>.csv of a directory, with the <name>.yaml or .yml next to it."""
+    inputs = []
+    for jobs_file in sorted(directory.glob("*.csv")):
+        candidates = [jobs_file.with_suffix(suffix) for suffix in CLIENT_SUFFIXES]
+        # A missing client file is reported with the client rather than stopping the batch
+        client_file = next((path for path in candidates if path.is_file()), candidates[0])
+        inputs.append(BatchInput(jobs_file.stem, jobs_file, client_file))
+    return inputs
+
+
+def manifest_inputs(path: Path) -> list[BatchInput]:
+    """The inputs listed by a manifest, see the module docstring."""
+    try:
+        raw = load_yaml(path) or {}
+    except yaml.YAMLError as exc:
+        raise ValueError(f"{path}: {exc}") from exc
+
+    manifest = Manifest.model_validate(raw)
+    return [
+        BatchInput(
+            entry.name or entry.jobs.stem, path.parent / entry.jobs, path.parent / entry.client
+        )
+        for entry in manifest.clients
+    ]
+
+
+def find_inputs(path: str | Path) -> list[BatchInput]:
+    """
+    The inputs of a batch.
+
+    Parameters
+    ----------
+    path : str | Path
+        A directory of <name>.csv and <name>.yaml pairs, or a .yaml manifest.
+
+    Returns
+    -------
+    list[BatchInput]
+        Inputs in directory or manifest order.
+    """
+    path = Path(path)
+    if path.is_dir():
+        inputs = directory_inputs(path)
+    elif path.suffix.lower() in MANIFEST_SUFFIXES:
+        inputs = manifest_inputs(path)
+    else:
+        raise ValueError(f"Expected a directory or a .yaml manifest, got {path}")
+
+    if not inputs:
+        raise ValueError(f"No job line CSVs in {path}")
+    seen: set[str] = set()
+    for item in inputs:
+        if Path(item.name).name != item.name or item.name in {"", ".", ".."}:
+            raise ValueError(f"Client name {item.name!r} is not a folder name")
+        if item.name in seen:
+            raise ValueError(f"More than one input for client {item.name!r}")
+        seen.add(item.name)
+    return inputs
+
+
+@dataclass(slots=True)
+class ClientResult:
+    name: str
+    # Files in the order of the client's invoices
+    paths: list[Path] = field(default_factory=list)
+    errors: list[RowError] = field(default_factory=list)
+    # Why the client's files could not be read, or its PDFs that could not be rendered
+    failure: str | None = None
+
+    @property
+    def failed(self) -> bool:
+        return self.failure is not None or bool(self.errors)
+
+
+@dataclass(slots=True)
+class BatchReport:
+    clients: list[ClientResult] = field(default_factory=list)
+    # SUMMARY_COLUMNS of each rendered client's invoices, after a client column
+    summaries: list[pd.DataFrame] = field(default_factory=list)
+    cached: int = 0
+    # Wall-clock seconds, and seconds spent rendering PDFs summed over the workers
+    seconds: float = 0.0
+    render_seconds: float = 0.0
+
+    @property
+    def failed(self) -> list[ClientResult]:
+        return [result for result in self.clients if result.failed]
+
+    def summary_frame(self) -> pd.DataFrame:
+        """One row per invoice of every rendered client."""
+        if not self.summaries:
+            return pd.DataFrame(columns=["client", *SUMMARY_COLUMNS])
+        return pd.concat(self.summaries, ignore_index=True)
+
+    def write_summary(self, path: str | Path) -> None:
+        """Write summary_frame to a .parquet, .feather, .arrow or .csv file."""
+        write_frame(self.summary_frame(), path, file_format(path, SUMMARY_FORMATS))
+
+    def summary(self) -> str:
+        files = sum(len(result.paths) for result in self.clients)
+        return (
+            f"{len(self.clients) - len(self.failed)} of {len(self.clients)} clients, "
+            f"{files} invoices in {self.seconds:.2f}s, {self.cached} from cache"
+        )
+
+
+@dataclass(slots=True)
+class Batch:
+    """
+    Builds and renders the invoices of many clients with one config and one set of workers.
+
+    Parameters
+    ----------
+    config : InvoiceConfig
+        Config shared by every client; its sequence start moves on with every invoice.
+    out_dir : Path
+        Output directory, with one folder per client.
+    kind : OutputKind
+        Write PDFs, or HTML previews.
+    jobs : int
+        PDF worker processes; 0 means one per CPU, 1 renders in this process.
+    logo : Path | None
+        Business logo file for the PDFs, see render.pdf.logo_path.
+    cache : RenderCache | None
+        PDF cache to reuse unchanged invoices from and to fill.
+    """
+
+    config: InvoiceConfig
+    out_dir: Path
+    kind: OutputKind = "pdf"
+    jobs: int = 0
+    logo: Path | None = None
+    cache: RenderCache | None = None
+
+    def run(self, inputs: Sequence[BatchInput]) -> BatchReport:
+        """Render every input in order and collect their results and invoice totals."""
+        started = time.perf_counter()
+        report = BatchReport()
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+
+        if self.kind == "html":
+            renderer = HTMLRenderer()
+            for item in inputs:
+                result, invoices = self.build(item, report)
+                if invoices:
+                    result.paths = renderer.render_all(invoices, self.out_dir / item.name)
+        else:
+            self.render_pdfs(inputs, report)
+
+        report.seconds = time.perf_counter() - started
+        return report
+
+    def build(self, item: BatchInput, report: BatchReport) -> tuple[ClientResult, list[Invoice]]:
+        # The invoices of one client, or none when its files are unreadable or invalid
+        result = ClientResult(item.name)
+        report.clients.append(result)
+        try:
+            header = InvoiceHeader(
+                business=self.config.business_info,
+                client=load_client(item.client_file),
+                meta=InvoiceMeta(number="DRAFT"),
+            )
+            lines = list(read_joblines(item.jobs_file, on_error=result.errors.append))
+        except (OSError, ValueError, yaml.YAMLError) as exc:
+            result.failure = str(exc)
+            return result, []
+        if result.errors:
+            return result, []
+
+        invoices = build_invoices(lines, header, self.config)
+        totals = invoice_summaries(invoices)
+        totals.insert(0, "client", item.name)
+        report.summaries.append(totals)
+        return result, invoices
+
+    def render_pdfs(self, inputs: Sequence[BatchInput], report: BatchReport) -> None:
+        # Path of every PDF being rendered -> its client and cache key
+        rendering: dict[Path, tuple[ClientResult, str | None]] = {}
+        done = failures = stored = 0
+
+        def finished(path: Path, seconds: float) -> None:
+            nonlocal done, stored
+            done += 1
+            report.render_seconds += seconds
+            _, key = rendering.pop(path)
+            if self.cache is not None and key is not None:
+                # Stored as each PDF is written, so a later failure does not lose it
+                with stats.stage("pdf_cache"):
+                    self.cache.store(key, path)
+                stored += 1
+
+        def failed(path: Path, exc: Exception) -> None:
+            nonlocal failures
+            failures += 1
+            result, _ = rendering.pop(path)
+            result.paths.remove(path)
+            path.unlink(missing_ok=True)
+            message = f"{path.name}: {exc}"
+            result.failure = message if result.failure is None else f"{result.failure}; {message}"
+
+        # Building the invoices happens in this stage too, between the PDFs
+        with PDFPool(self.jobs, self.logo) as pool, stats.stage("render_pdf") as stage:
+            pool.render_tasks(self.pdf_tasks(inputs, report, rendering), finished, failed)
+            stage.add(items=done + failures, errors=failures)
+
+        if self.cache is not None:
+            with stats.stage("pdf_cache") as stage:
+                if stored:
+                    self.cache.evict()
+                stage.add(cache_hits=report.cached, cache_misses=done + failures)
+
+    def pdf_tasks(
+        self,
+        inputs: Sequence[BatchInput],
+        report: BatchReport,
+        rendering: dict[Path, tuple[ClientResult, str | None]],
+    ) -> Iterator[tuple[Invoice, Path]]:
+        # Invoices to write, built one client at a time as the workers take them
+        for item in inputs:
+            result, invoices = self.build(item, report)
+            if not invoices:
+                continue
+            out_path = self.out_dir / item.name
+            out_path.mkdir(parents=True, exist_ok=True)
+
+            for invoice in invoices:
+                path = out_path / output_name(invoice, ".pdf")
+                result.paths.append(path)
+                key = None
+                if self.cache is not None:
+                    key = self.cache.key(invoice)
+                    if self.cache.restore(key, path):
+                        report.cached += 1
+                        continue
+                    # An earlier output may be a hard link into the cache, see render_cached
+                    path.unlink(missing_ok=True)
+                rendering[path] = (result, key)
+                yield invoice, path
@@ -1,14 +1,20 @@
-from collections import defaultdict
+from collections.abc import Mapping
 from datetime import date
+from decimal import Decimal
+from operator import attrgetter
 
+from invoicegen import stats
 from invoicegen.config import InvoiceConfig
-from invoicegen.models import Invoice, InvoiceHeader, JobLine
+from invoicegen.config.models import GroupBy
+from invoicegen.models import Invoice, InvoiceHeader, JobLine, JobLineBatch
+
+from .numbering import MemorySequence, SequenceAllocator, allocator_for, format_number
 
 """
 Core invoice building engine.
 
 This module converts the validated invoice objects into an Invoice object by doing the following:
-- grouping job lines by project/address,
+- grouping job lines by project/address, or by address and unit,
 - sorting the lines in each project by date,
 - computing the totals,
 - generating the invoice numbers based on a pattern
@@ -30,27 +36,129 @@ type
 """
 
 
-def group_by_project(job_lines: list[JobLine]) -> dict[str, list[JobLine]]:
-    projects = defaultdict(list)
-    for line in job_lines:
-        projects[line.address].append(line)
+# An address, or an (address, unit) pair when grouping by unit
+GroupKey = str | tuple[str, str]
+
+
+def group_lines(
+    job_lines: list[JobLine], group_by: GroupBy = "project"
+) -> dict[GroupKey, list[JobLine]]:
+    """
+    Group job lines per invoice and order each group by date, in one pass over the lines.
+
+    Exports are usually already in date order, so a group is only sorted when one of its
+    lines came in earlier than the one before it.
+
+    Parameters
+    ----------
+    job_lines : list[JobLine]
+        Validated lines in file order.
+    group_by : GroupBy
+        "project" for one group per address, "unit" for one per (address, unit).
+
+    Returns
+    -------
+    dict[GroupKey, list[JobLine]]
+        Groups in order of first appearance, lines sorted by date (ties keep file order).
+    """
+    with stats.stage("group") as stage:
+        by_unit = group_by == "unit"
+        groups: dict[GroupKey, list[JobLine]] = {}
+        unordered = set()
+
+        for line in job_lines:
+            key: GroupKey = (line.address, line.unit) if by_unit else line.address
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [line]
+                continue
+            if line.dates < group[-1].dates:
+                unordered.add(key)
+            group.append(line)
+
+        for key in unordered:
+            groups[key].sort(key=attrgetter("dates"))
+        stage.add(items=len(job_lines))
+
+    return groups
+
 
-    return projects
+def batch_groups(batch: JobLineBatch, group_by: GroupBy = "project") -> dict[GroupKey, list[int]]:
+    """
+    Positions of the lines of each group in a JobLineBatch, ordered by date.
 
+    Grouping and sorting work on the packed codes and date ordinals, so no JobLine is built;
+    see group_batch for the JobLines themselves.
 
-def sort_by_date(projects: dict[str, list[JobLine]]) -> dict[str, list[JobLine]]:
-    for _project, jobs in projects.items():
-        jobs.sort(key=lambda obj: obj.dates, reverse=False)
+    Parameters
+    ----------
+    batch : JobLineBatch
+        Validated lines.
+    group_by : GroupBy
+        "project" for one group per address, "unit" for one per (address, unit).
 
-    return projects
+    Returns
+    -------
+    dict[GroupKey, list[int]]
+        Groups in order of first appearance, line positions sorted by date (ties keep
+        batch order).
+    """
+    with stats.stage("group") as stage:
+        by_unit = group_by == "unit"
+        ordinals = batch.ordinals
+        unit_codes = batch.unit_codes
+        groups: dict[tuple[int, int], list[int]] = {}
+        unordered = set()
+
+        for index, address_code in enumerate(batch.address_codes):
+            key = (address_code, unit_codes[index] if by_unit else -1)
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [index]
+                continue
+            if ordinals[index] < ordinals[group[-1]]:
+                unordered.add(key)
+            group.append(index)
+
+        addresses = batch.addresses.strings
+        units = batch.units.strings
+        positions: dict[GroupKey, list[int]] = {}
+        for (address_code, unit_code), indices in groups.items():
+            if (address_code, unit_code) in unordered:
+                indices.sort(key=ordinals.__getitem__)
+            name: GroupKey = (
+                (addresses[address_code], units[unit_code]) if by_unit else addresses[address_code]
+            )
+            positions[name] = indices
+        stage.add(items=len(batch))
+
+    return positions
+
+
+def group_batch(
+    batch: JobLineBatch, group_by: GroupBy = "project"
+) -> dict[GroupKey, list[JobLine]]:
+    """Same as group_lines for a JobLineBatch, building JobLines only once they are grouped."""
+    return {
+        name: batch.joblines(indices) for name, indices in batch_groups(batch, group_by).items()
+    }
+
+
+def project_name(key: GroupKey) -> str:
+    if isinstance(key, tuple):
+        address, unit = key
+        return f"{address}, Unit {unit}"
+    return key
 
 
 def change_header(
     header: InvoiceHeader,
     invoice_number: str,
+    project: str | None = None,
 ) -> InvoiceHeader:
-    header.meta.number = invoice_number
-    return header
+    # Copy instead of assigning, so every invoice gets its own number and project name
+    # while the template header stays untouched
+    return header.for_invoice(invoice_number, project)
 
 
 def create_invoice(
@@ -58,10 +166,12 @@ def create_invoice(
     header: InvoiceHeader,
     invoice_number: str,
     config: InvoiceConfig,
+    project: str | None = None,
 ) -> Invoice:
-    inv_header = change_header(header, invoice_number)
+    inv_header = change_header(header, invoice_number, project)
 
-    return Invoice(
+    # The job lines and header were validated when they were built, so skip doing it again
+    return Invoice.from_trusted(
         header=inv_header,
         lines=jobs,
         currency=config.currency,
@@ -69,39 +179,104 @@ def create_invoice(
     )
 
 
-def build_invoices(
-    job_lines: list[JobLine],
+def invoice_group_by(config: InvoiceConfig) -> GroupBy:
+    # ym_unit_seq numbers each unit separately, so it always needs one invoice per unit
+    return "unit" if config.invoice_pattern == "ym_unit_seq" else config.group_by
+
+
+def build_group_invoices(
+    groups: dict[GroupKey, list[JobLine]],
     header: InvoiceHeader,
     config: InvoiceConfig,
-) -> list[Invoice]:
-    # Separate projects and sort them by date
-    projects = group_by_project(job_lines)
-    sorted_projects = sort_by_date(projects)
-
-    seq = config.sequence_start
-    invoices = []
-    for project, jobs in sorted_projects.items():
-        header.client.project_name = project
-        # Determine numbering for invoices
-        if config.invoice_pattern == "ym_seq":
-            # {PREFIX}{YYYY}{MM}-{SEQ}
-
-            # Retrieve date of the most recent job at that project
-            last_date: date = jobs[-1].dates
-
-            # Create the corresponding numbering prefix
-            invoice_number = f"{config.invoice_prefix}{last_date.strftime('%Y%m')}{seq}"
-
-            invoices.append(
-                create_invoice(
+    allocator: SequenceAllocator | None = None,
+    numbers: Mapping[GroupKey, str] | None = None,
+) -> dict[GroupKey, Invoice]:
+    """
+    Build one numbered invoice per group of date-sorted lines.
+
+    Parameters
+    ----------
+    groups : dict[GroupKey, list[JobLine]]
+        Output of group_lines or group_batch.
+    header : InvoiceHeader
+        Template header; every invoice gets a copy with its own number and project name.
+    config : InvoiceConfig
+        Numbering, tax and currency settings.
+    allocator : SequenceAllocator | None
+        Source of sequence numbers. By default numbers come from config (see
+        numbering.allocator_for), and when they are counted in memory the next free number
+        is written back to config.sequence_start.
+    numbers : Mapping[GroupKey, str] | None
+        Invoice numbers assigned earlier; these groups keep them and draw no new number.
+
+    Returns
+    -------
+    dict[GroupKey, Invoice]
+        Invoices by group, in the order of the groups.
+    """
+    numbers = numbers or {}
+    sequence = allocator or allocator_for(config)
+    invoices = {}
+    with stats.stage("build_invoices") as stage:
+        try:
+            for project, jobs in groups.items():
+                invoice_number = numbers.get(project)
+                if invoice_number is None:
+                    with stats.stage("numbering") as numbering:
+                        # Retrieve date of the most recent job at that project
+                        last_date: date = jobs[-1].dates
+                        invoice_number = format_number(
+                            config, sequence.next(), last_date, jobs[-1].unit
+                        )
+                        numbering.add(items=1)
+
+                invoices[project] = create_invoice(
                     jobs,
                     header,
                     invoice_number,
                     config,
+                    project_name(project),
                 )
-            )
+                stage.add(items=len(jobs))
+        finally:
+            sequence.release()
 
-            seq += 1
-
-    config.sequence_start = seq
+    if allocator is None and isinstance(sequence, MemorySequence):
+        config.sequence_start = Decimal(sequence.value)
     return invoices
+
+
+def build_invoices(
+    job_lines: list[JobLine] | JobLineBatch,
+    header: InvoiceHeader,
+    config: InvoiceConfig,
+    allocator: SequenceAllocator | None = None,
+) -> list[Invoice]:
+    """
+    Build one numbered invoice per project, or per unit.
+
+    Parameters
+    ----------
+    job_lines : list[JobLine] | JobLineBatch
+        Validated lines.
+    header : InvoiceHeader
+        Template header; every invoice gets a copy with its own number and project name.
+    config : InvoiceConfig
+        Numbering, grouping, tax and currency settings.
+    allocator : SequenceAllocator | None
+        Source of sequence numbers, see build_group_invoices.
+
+    Returns
+    -------
+    list[Invoice]
+        Invoices in order of first appearance of their project.
+    """
+    group_by = invoice_group_by(config)
+
+    # Separate projects (or units) and sort them by date
+    if isinstance(job_lines, JobLineBatch):
+        sorted_projects = group_batch(job_lines, group_by)
+    else:
+        sorted_projects = group_lines(job_lines, group_by)
+
+    return list(build_group_invoices(sorted_projects, header, config, allocator).values())
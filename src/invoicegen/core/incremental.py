@@ -0,0 +1,361 @@
+import hashlib
+import json
+import os
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from invoicegen import stats
+from invoicegen.config import InvoiceConfig
+from invoicegen.config.models import GroupBy
+from invoicegen.io.joblines import (
+    DEFAULT_CHUNK_SIZE,
+    ErrorHandler,
+    RowError,
+    iter_row_chunks,
+    validate_rows,
+)
+from invoicegen.models import Invoice, InvoiceHeader, JobLine
+
+from .grouping import GroupKey, build_group_invoices, group_lines
+from .numbering import MemorySequence, allocator_for
+
+"""
+Incremental re-invoicing of corrected CSV exports.
+
+A run remembers a fingerprint of every row's content by source_row, and for every invoice
+group the digest of its rows and the invoice number it was given. The next run over a
+corrected export compares against that state: rows are reported as added, removed or
+changed, and only the groups whose rows differ are validated and built again. Groups that
+already had an invoice keep its number; new groups draw the next number of the sequence.
+
+Group digests are made from row fingerprints only, not row numbers, so inserting a row
+shifts the rows after it without making their groups look changed. Everything else that
+shapes an invoice (config, client, templates) goes into the run's context string, and a
+different context rebuilds every group, still keeping their numbers.
+"""
+
+STATE_VERSION = 1
+FIELD_SEPARATOR = "\x1f"
+DIGEST_BYTES = 16
+
+
+def row_fingerprint(row: list[str]) -> str:
+    # Surrounding whitespace is stripped by validation, so it does not count as a change
+    text = FIELD_SEPARATOR.join(cell.strip() for cell in row)
+    return hashlib.blake2b(text.encode(), digest_size=DIGEST_BYTES).hexdigest()
+
+
+def encode_key(key: GroupKey) -> str | list[str]:
+    return list(key) if isinstance(key, tuple) else key
+
+
+def decode_key(value: str | list[str]) -> GroupKey:
+    if isinstance(value, list):
+        address, unit = value
+        return (address, unit)
+    return value
+
+
+@dataclass(slots=True)
+class GroupState:
+    # Digest of the group's row fingerprints; empty when the group has to be built again
+    digest: str
+    number: str | None = None
+
+
+@dataclass(slots=True)
+class RunState:
+    """What an incremental run remembers for the next one."""
+
+    context: str = ""
+    rows: dict[int, str] = field(default_factory=dict)
+    groups: dict[GroupKey, GroupState] = field(default_factory=dict)
+    # Next sequence number when numbers are counted in memory, see numbering.MemorySequence
+    next_sequence: int = 0
+
+    @classmethod
+    def load(cls, path: str | Path) -> "RunState":
+        """Read a saved state; a missing file, or one from another version, gives an empty one."""
+        try:
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return cls()
+        except (OSError, ValueError) as exc:
+            raise ValueError(f"Cannot read incremental state {path}: {exc}") from exc
+
+        if not isinstance(data, dict) or data.get("version") != STATE_VERSION:
+            return cls()
+        try:
+            return cls(
+                context=data["context"],
+                rows={int(row): fingerprint for row, fingerprint in data["rows"].items()},
+                groups={
+                    decode_key(group["key"]): GroupState(group["digest"], group["number"])
+                    for group in data["groups"]
+                },
+                next_sequence=data["next_sequence"],
+            )
+        except KeyError as exc:
+            raise ValueError(f"Cannot read incremental state {path}: missing {exc}") from exc
+        except (AttributeError, TypeError, ValueError) as exc:
+            raise ValueError(f"Cannot read incremental state {path}: {exc}") from exc
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data: dict[str, Any] = {
+            "version": STATE_VERSION,
+            "context": self.context,
+            "next_sequence": self.next_sequence,
+            "rows": {str(row): fingerprint for row, fingerprint in self.rows.items()},
+            "groups": [
+                {"key": encode_key(key), "digest": group.digest, "number": group.number}
+                for key, group in self.groups.items()
+            ],
+        }
+        # Write under a temporary name first so an interrupted run leaves the old state intact
+        partial = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        partial.write_text(json.dumps(data), encoding="utf-8")
+        partial.replace(path)
+
+
+@dataclass(slots=True)
+class RowDiff:
+    added: list[int] = field(default_factory=list)
+    removed: list[int] = field(default_factory=list)
+    changed: list[int] = field(default_factory=list)
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.added)} added, {len(self.changed)} changed, "
+            f"{len(self.removed)} removed rows"
+        )
+
+
+def diff_rows(previous: Mapping[int, str], current: Mapping[int, str]) -> RowDiff:
+    """Compare row fingerprints by source_row."""
+    diff = RowDiff()
+    for source_row, fingerprint in current.items():
+        before = previous.get(source_row)
+        if before is None:
+            diff.added.append(source_row)
+        elif before != fingerprint:
+            diff.changed.append(source_row)
+    diff.removed = [source_row for source_row in previous if source_row not in current]
+    return diff
+
+
+@dataclass(slots=True)
+class Snapshot:
+    """The non-blank records of a CSV file, fingerprinted and split into invoice groups."""
+
+    columns: dict[str, int] = field(default_factory=dict)
+    records: dict[int, list[str]] = field(default_factory=dict)
+    fingerprints: dict[int, str] = field(default_factory=dict)
+    # Source rows of each group, in file order
+    groups: dict[GroupKey, list[int]] = field(default_factory=dict)
+
+    def digest(self, key: GroupKey) -> str:
+        digest = hashlib.blake2b(digest_size=DIGEST_BYTES)
+        for source_row in self.groups[key]:
+            digest.update(self.fingerprints[source_row].encode())
+        return digest.hexdigest()
+
+
+def take_snapshot(
+    path: str | Path,
+    group_by: GroupBy = "project",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Snapshot:
+    """
+    Read and fingerprint every record of a job line CSV, without validating it.
+
+    Parameters
+    ----------
+    path : str | Path
+        CSV file following the README contract.
+    group_by : GroupBy
+        Grouping the invoices are built with, see grouping.group_lines.
+    chunk_size : int
+        Records read per chunk.
+
+    Returns
+    -------
+    Snapshot
+        Records keyed by source_row. Groups are keyed the way group_lines keys the validated
+        lines, from the stripped Address (and Unit) cells.
+    """
+    snapshot = Snapshot()
+    with stats.stage("ingest") as stage:
+        for columns, rows in iter_row_chunks(path, chunk_size):
+            stage.add(items=len(rows))
+            snapshot.columns = columns
+            address_index = columns["address"]
+            unit_index = columns["unit"]
+            for source_row, row in rows:
+                snapshot.records[source_row] = row
+                snapshot.fingerprints[source_row] = row_fingerprint(row)
+
+                width = len(row)
+                address = row[address_index].strip() if address_index < width else ""
+                key: GroupKey = address
+                if group_by == "unit":
+                    key = (address, row[unit_index].strip() if unit_index < width else "")
+                snapshot.groups.setdefault(key, []).append(source_row)
+    return snapshot
+
+
+class IncrementalRun:
+    """
+    One incremental pass over a CSV file, compared against the state of the previous pass.
+
+    Parameters
+    ----------
+    path : str | Path
+        CSV file following the README contract.
+    previous : RunState
+        State saved by the previous run; an empty RunState makes every group affected.
+    group_by : GroupBy
+        Grouping the invoices are built with, see grouping.invoice_group_by.
+    context : str
+        Digest of everything besides the rows that shapes the result. When it differs from
+        the previous run's, every group is affected.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        previous: RunState,
+        group_by: GroupBy = "project",
+        context: str = "",
+    ) -> None:
+        self.previous = previous
+        self.group_by = group_by
+        self.context = context
+        self.next_sequence = previous.next_sequence
+        self.snapshot = take_snapshot(path, group_by)
+        self.diff = diff_rows(previous.rows, self.snapshot.fingerprints)
+
+        rebuild_all = previous.context != context
+        self.digests = {key: self.snapshot.digest(key) for key in self.snapshot.groups}
+        self.affected: list[GroupKey] = []
+        for key, digest in self.digests.items():
+            before = previous.groups.get(key)
+            if rebuild_all or before is None or before.digest != digest:
+                self.affected.append(key)
+        # Groups of the previous run that have no rows left
+        self.removed = {
+            key: group for key, group in previous.groups.items() if key not in self.digests
+        }
+
+    @property
+    def unchanged(self) -> int:
+        return len(self.digests) - len(self.affected)
+
+    @property
+    def unchanged_rows(self) -> int:
+        affected = set(self.affected)
+        return sum(len(rows) for key, rows in self.snapshot.groups.items() if key not in affected)
+
+    def summary(self) -> str:
+        return (
+            f"{self.diff.summary()}; {len(self.affected)} of {len(self.digests)} groups "
+            f"rebuilt, {len(self.removed)} removed"
+        )
+
+    def validate(self, on_error: ErrorHandler) -> list[JobLine]:
+        """Validate the records of the affected groups, in file order."""
+        snapshot = self.snapshot
+        source_rows = sorted(
+            source_row for key in self.affected for source_row in snapshot.groups[key]
+        )
+        rows = ((source_row, snapshot.records[source_row]) for source_row in source_rows)
+        return validate_rows(rows, snapshot.columns, on_error)
+
+    def numbers(self) -> dict[GroupKey, str]:
+        """Invoice numbers already given to the affected groups."""
+        numbers = {}
+        for key in self.affected:
+            before = self.previous.groups.get(key)
+            if before is not None and before.number is not None:
+                numbers[key] = before.number
+        return numbers
+
+    def build(
+        self,
+        lines: list[JobLine],
+        header: InvoiceHeader,
+        config: InvoiceConfig,
+    ) -> dict[GroupKey, Invoice]:
+        """
+        Build the invoices of the affected groups from their validated lines.
+
+        Parameters
+        ----------
+        lines : list[JobLine]
+            Output of validate.
+        header : InvoiceHeader
+            Template header, see grouping.build_group_invoices.
+        config : InvoiceConfig
+            Numbering, tax and currency settings.
+
+        Returns
+        -------
+        dict[GroupKey, Invoice]
+            Invoices by group. Groups that had a number keep it; new ones draw from the
+            config's sequence, which continues after the previous run's when counted in memory.
+        """
+        sequence = allocator_for(config)
+        if isinstance(sequence, MemorySequence):
+            sequence.value = max(sequence.value, self.next_sequence)
+
+        invoices = build_group_invoices(
+            group_lines(lines, self.group_by), header, config, sequence, self.numbers()
+        )
+        if isinstance(sequence, MemorySequence):
+            self.next_sequence = sequence.value
+        return invoices
+
+    def valid_groups(self, errors: Iterable[RowError]) -> list[GroupKey]:
+        """Affected groups none of whose rows are in errors."""
+        failed = {error.source_row for error in errors}
+        return [
+            key
+            for key in self.affected
+            if not any(source_row in failed for source_row in self.snapshot.groups[key])
+        ]
+
+    def state(self, done: Mapping[GroupKey, str | None]) -> RunState:
+        """
+        State to save for the next run.
+
+        Parameters
+        ----------
+        done : Mapping[GroupKey, str | None]
+            Affected groups this run finished, with the invoice number they were given (None
+            when only validating). Affected groups left out are built again next time.
+
+        Returns
+        -------
+        RunState
+            Fingerprints of every current row and the state of every current group.
+        """
+        groups = {}
+        for key, digest in self.digests.items():
+            before = self.previous.groups.get(key)
+            number = before.number if before is not None else None
+            if key in done:
+                groups[key] = GroupState(digest, done[key] or number)
+            elif key in self.affected or before is None:
+                groups[key] = GroupState("", number)
+            else:
+                groups[key] = before
+
+        return RunState(
+            context=self.context,
+            rows=dict(self.snapshot.fingerprints),
+            groups=groups,
+            next_sequence=self.next_sequence,
+        )
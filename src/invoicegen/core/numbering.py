@@ -0,0 +1,177 @@
+import sqlite3
+from datetime import date
+from pathlib import Path
+from typing import Protocol
+
+from invoicegen.config import InvoiceConfig
+
+"""
+Invoice number allocation.
+
+Sequence numbers come from an allocator. MemorySequence counts in process, which is all a
+single run needs. SQLiteSequence keeps the next free number in a SQLite file, so runs and
+worker processes sharing the file never hand out the same number: each one reserves a
+block of numbers in a short write transaction and then numbers its invoices from the
+block without touching the file again. Numbers of a block that are not used are returned
+by release() when no one reserved after them; otherwise they are skipped, so sequences can
+have gaps but never repeats.
+"""
+
+DEFAULT_BLOCK_SIZE = 100
+# Seconds to wait for another process holding the write lock
+LOCK_TIMEOUT = 30.0
+
+
+class SequenceAllocator(Protocol):
+    def next(self) -> int: ...
+
+    def release(self) -> None: ...
+
+
+class MemorySequence:
+    """Sequence numbers counted in this process only."""
+
+    def __init__(self, start: int = 1) -> None:
+        self.value = start
+
+    def next(self) -> int:
+        value = self.value
+        self.value += 1
+        return value
+
+    def release(self) -> None:
+        return None
+
+
+class SQLiteSequence:
+    """
+    Sequence numbers shared through a SQLite file, reserved in blocks.
+
+    Parameters
+    ----------
+    path : str | Path
+        Database file, created when missing.
+    name : str
+        Sequence to draw from; different names count independently.
+    start : int
+        First number of the sequence when it does not exist yet.
+    block_size : int
+        Numbers reserved per write transaction.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        name: str = "invoice",
+        start: int = 1,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+    ) -> None:
+        if block_size < 1:
+            raise ValueError(f"Block size must be at least 1, got {block_size}")
+
+        self.path = Path(path)
+        self.name = name
+        self.start = start
+        self.block_size = block_size
+        # Next number to hand out and the end of the reserved block
+        self.value = 0
+        self.end = 0
+
+    def connect(self) -> sqlite3.Connection:
+        # Transactions are managed explicitly, see reserve
+        connection = sqlite3.connect(self.path, timeout=LOCK_TIMEOUT, isolation_level=None)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS sequences (name TEXT PRIMARY KEY, next INTEGER NOT NULL)"
+        )
+        return connection
+
+    def reserve(self) -> None:
+        connection = self.connect()
+        try:
+            # IMMEDIATE takes the write lock before reading, so no other process can read the
+            # same next value in between
+            connection.execute("BEGIN IMMEDIATE")
+            row = connection.execute(
+                "SELECT next FROM sequences WHERE name = ?", (self.name,)
+            ).fetchone()
+            first = self.start if row is None else int(row[0])
+            connection.execute(
+                "INSERT INTO sequences (name, next) VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET next = excluded.next",
+                (self.name, first + self.block_size),
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+        self.value = first
+        self.end = first + self.block_size
+
+    def next(self) -> int:
+        if self.value >= self.end:
+            self.reserve()
+        value = self.value
+        self.value += 1
+        return value
+
+    def release(self) -> None:
+        """Give back the rest of the current block if it is still the last one reserved."""
+        if self.value >= self.end:
+            return
+
+        connection = self.connect()
+        try:
+            with connection:
+                connection.execute(
+                    "UPDATE sequences SET next = ? WHERE name = ? AND next = ?",
+                    (self.value, self.name, self.end),
+                )
+        finally:
+            connection.close()
+        self.end = self.value
+
+
+def allocator_for(config: InvoiceConfig) -> SequenceAllocator:
+    """The allocator a config asks for: shared through sequence_file, or in memory."""
+    start = int(config.sequence_start)
+    if config.sequence_file is None:
+        return MemorySequence(start)
+    return SQLiteSequence(
+        config.sequence_file,
+        name=config.invoice_prefix or "invoice",
+        start=start,
+        block_size=config.sequence_block,
+    )
+
+
+def format_number(config: InvoiceConfig, seq: int, last_date: date, unit: str) -> str:
+    """
+    Invoice number for a sequence number, following config.invoice_pattern.
+
+    Parameters
+    ----------
+    config : InvoiceConfig
+        Supplies the pattern and prefix.
+    seq : int
+        Sequence number from an allocator.
+    last_date : date
+        Date of the most recent job on the invoice.
+    unit : str
+        Unit the invoice is for, used by ym_unit_seq.
+
+    Returns
+    -------
+    str
+        ym_seq: {PREFIX}{YYYY}{MM}-{SEQ}, ym_unit_seq: {PREFIX}{YYYY}-{MM}-{UNIT}-{SEQ},
+        simple_seq: {PREFIX}{SEQ}, with SEQ padded to 4 digits.
+    """
+    prefix = config.invoice_prefix
+    if config.invoice_pattern == "ym_seq":
+        return f"{prefix}{last_date:%Y%m}-{seq:04d}"
+    if config.invoice_pattern == "ym_unit_seq":
+        return f"{prefix}{last_date:%Y-%m}-{unit}-{seq:04d}"
+    return f"{prefix}{seq:04d}"
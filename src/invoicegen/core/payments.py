@@ -0,0 +1,183 @@
+from collections import deque
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from invoicegen import stats
+from invoicegen.io.payments import PaymentRow
+from invoicegen.models import Invoice
+from invoicegen.models.money import from_cents, to_cents
+
+"""
+Matching payments to open invoices.
+
+Open invoices are indexed in hash maps by number, by client, and by client and project, so
+each payment is matched without scanning the invoices. Payments are applied in the order
+given, and each one goes to:
+- the invoice it names, when it names one (an unknown number leaves it unmatched),
+- otherwise the open invoices of its client and project, of its project when no client is
+  given, or of its client when no project is given.
+Amounts are applied to those invoices oldest first, each paid in full before the next, so a
+partial payment settles the oldest balance. What is left once they are paid goes to the
+other open invoices of the same client, oldest first, and anything still left is reported
+as unapplied. Invoices are oldest first in the order they were given, which for
+build_invoices is the order of their numbers.
+
+Client and project names are matched ignoring case and repeated spaces. Applying a payment
+adds a Payment for the allocated amount to the invoice, which updates its totals in constant
+time, see Invoice.add_payment.
+"""
+
+# Open invoices of a client or project, oldest first; paid ones are dropped from the front
+OpenInvoices = deque[Invoice]
+
+
+def match_key(value: str) -> str:
+    return " ".join(value.split()).casefold()
+
+
+def balance_cents(invoice: Invoice) -> int:
+    return to_cents(invoice.balance_due or Decimal(0))
+
+
+@dataclass(slots=True)
+class Allocation:
+    source_row: int
+    number: str
+    amount: Decimal
+
+
+@dataclass(slots=True)
+class Unapplied:
+    row: PaymentRow
+    # The part of the payment that went to no invoice, all of it when nothing matched
+    amount: Decimal
+    reason: str
+
+    def __str__(self) -> str:
+        return f"Row {self.row.source_row}: {self.amount} not applied: {self.reason}"
+
+
+@dataclass(slots=True)
+class MatchReport:
+    allocations: list[Allocation] = field(default_factory=list)
+    unapplied: list[Unapplied] = field(default_factory=list)
+    payments: int = 0
+
+    def summary(self) -> str:
+        left = sum((item.amount for item in self.unapplied), Decimal(0))
+        return (
+            f"{self.payments} payments, {len(self.allocations)} allocations, "
+            f"{len(self.unapplied)} not fully applied ({left} unapplied)"
+        )
+
+
+class PaymentMatcher:
+    """
+    Open invoices indexed for matching payments, see the module docstring.
+
+    Parameters
+    ----------
+    invoices : Iterable[Invoice]
+        Invoices payments may go to, oldest first. Their numbers must be unique.
+    """
+
+    def __init__(self, invoices: Iterable[Invoice]) -> None:
+        self.by_number: dict[str, Invoice] = {}
+        self.by_client: dict[str, OpenInvoices] = {}
+        # Keyed by (client, project), and by (None, project) for payments without a client
+        self.by_project: dict[tuple[str | None, str], OpenInvoices] = {}
+
+        for invoice in invoices:
+            number = match_key(invoice.header.meta.number)
+            if number in self.by_number:
+                raise ValueError(f"Invoice number {invoice.header.meta.number} appears twice")
+            self.by_number[number] = invoice
+            if balance_cents(invoice) <= 0:
+                continue
+
+            client = match_key(invoice.header.client.name)
+            self.by_client.setdefault(client, deque()).append(invoice)
+            project = invoice.header.client.project_name
+            if project:
+                for key in [(client, match_key(project)), (None, match_key(project))]:
+                    self.by_project.setdefault(key, deque()).append(invoice)
+
+    def targets(self, row: PaymentRow) -> tuple[list[OpenInvoices], str | None]:
+        # The invoices a payment goes to in order, or the reason it matches none
+        client = match_key(row.client) if row.client else None
+        first: OpenInvoices
+        if row.invoice:
+            invoice = self.by_number.get(match_key(row.invoice))
+            if invoice is None:
+                return [], f"unknown invoice {row.invoice}"
+            client = match_key(invoice.header.client.name)
+            first = deque([invoice])
+        elif row.project:
+            first = self.by_project.get((client, match_key(row.project)), deque())
+        elif client is not None:
+            first = self.by_client.get(client, deque())
+        else:
+            return [], "no invoice, client or project to match on"
+
+        targets = [first]
+        if client is not None and client in self.by_client:
+            targets.append(self.by_client[client])
+        return targets, None
+
+    def apply(self, rows: Iterable[PaymentRow]) -> MatchReport:
+        """
+        Apply payments in order to the invoices they match.
+
+        Parameters
+        ----------
+        rows : Iterable[PaymentRow]
+            Validated payments, see io.payments.read_payments.
+
+        Returns
+        -------
+        MatchReport
+            Every amount applied to an invoice, and every payment not applied in full.
+        """
+        report = MatchReport()
+        with stats.stage("match_payments") as stage:
+            for row in rows:
+                report.payments += 1
+                self.apply_one(row, report)
+            stage.add(items=report.payments, errors=len(report.unapplied))
+        return report
+
+    def apply_one(self, row: PaymentRow, report: MatchReport) -> None:
+        targets, reason = self.targets(row)
+        left = to_cents(row.payment.amount)
+        applied = False
+
+        for invoices in targets:
+            while left > 0 and invoices:
+                invoice = invoices[0]
+                balance = balance_cents(invoice)
+                if balance <= 0:
+                    # Paid off, possibly through another index
+                    invoices.popleft()
+                    continue
+
+                cents = min(left, balance)
+                amount = from_cents(cents)
+                invoice.add_payment(row.payment.model_copy(update={"amount": amount}))
+                report.allocations.append(
+                    Allocation(row.source_row, invoice.header.meta.number, amount)
+                )
+                left -= cents
+                applied = True
+
+        if left > 0:
+            if reason is None:
+                reason = (
+                    "overpayment, the matched invoices are paid" if applied else "no open invoice"
+                )
+            report.unapplied.append(Unapplied(row, from_cents(left), reason))
+
+
+def apply_payments(invoices: Iterable[Invoice], rows: Iterable[PaymentRow]) -> MatchReport:
+    """Match payments to invoices and add them to the invoices, see PaymentMatcher."""
+    return PaymentMatcher(invoices).apply(rows)
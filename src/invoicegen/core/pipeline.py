@@ -0,0 +1,445 @@
+import asyncio
+import csv
+import os
+import time
+from collections.abc import Callable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from decimal import Decimal
+from operator import attrgetter
+from pathlib import Path
+from typing import Literal
+
+from invoicegen import stats
+from invoicegen.config import InvoiceConfig
+from invoicegen.io.joblines import (
+    COLUMNS,
+    DEFAULT_CHUNK_SIZE,
+    RowError,
+    iter_row_chunks,
+    validate_rows,
+    warn_total_mismatch,
+)
+from invoicegen.io.parallel import ChunkResult
+from invoicegen.models import Invoice, InvoiceHeader, JobLine
+from invoicegen.render.cache import RenderCache
+from invoicegen.render.html import HTMLRenderer, output_name
+from invoicegen.render.pdf import PDFWorker, require_weasyprint
+
+from .grouping import (
+    GroupBy,
+    GroupKey,
+    create_invoice,
+    group_lines,
+    invoice_group_by,
+    project_name,
+)
+from .numbering import MemorySequence, allocator_for, format_number
+
+"""
+Streaming CSV-to-invoice pipeline on asyncio.
+
+The stages run at the same time, connected by bounded queues:
+- read: a thread pulls record chunks from the CSV,
+- validate: every chunk is validated into JobLines by a worker,
+- group: validated lines are collected per project (or unit), and a project is built into
+  its Invoice as soon as the last of its rows has been validated,
+- render: invoices are handed to the workers to be written as PDF or HTML files.
+A stage waits when the queue after it is full, so no more than a few chunks and invoices per
+worker are held at once however large the file is, and finished invoices are dropped once
+they are rendered.
+
+Knowing when a project is finished takes the row of its last record, which a second thread
+finds by scanning the Address and Unit columns while the chunks are read. A project's last
+row is only known once the scan has seen the whole file, so chunks keep being read, validated
+and grouped while it runs, and the projects they complete are finished as soon as it is done.
+The scan does much less per row than validation, so on exports listing each project's rows
+together rendering still starts early; exports in date order finish most projects near the
+end of the file, so more of the rendering comes after reading.
+
+Validation and rendering share one pool of worker processes (with one worker, a single
+thread), so the CPU goes to whichever stage has work. Work done in worker processes is not
+seen by --stats.
+
+Invoice numbers are drawn as projects are finished, so they follow the order of each
+project's last row; build_invoices numbers by first valid line instead, which gives the same
+numbers for exports listing each project's rows together. Unlike build_invoices, invalid rows
+do not stop the run: a project with an invalid row is left out and reported without drawing
+a number, and every other project is rendered.
+"""
+
+OutputKind = Literal["pdf", "html"]
+# Chunks and invoices queued per worker between stages
+QUEUED_PER_JOB = 2
+# One thread reads the chunks, the other scans for the rows where groups end
+READER_THREADS = 2
+
+# (source_row, record) pairs of a chunk, as from iter_row_chunks
+Rows = list[tuple[int, list[str]]]
+# A chunk's columns and records, and its validation running in a worker
+Chunk = tuple[dict[str, int], Rows, asyncio.Future[ChunkResult]]
+
+
+@dataclass(slots=True)
+class PipelineReport:
+    # Files in the order their invoices were built
+    paths: list[Path] = field(default_factory=list)
+    errors: list[RowError] = field(default_factory=list)
+    # Groups left out because some of their rows are invalid
+    skipped: list[GroupKey] = field(default_factory=list)
+    lines: int = 0
+    cached: int = 0
+    # Wall-clock seconds, and seconds spent rendering summed over the workers
+    seconds: float = 0.0
+    render_seconds: float = 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.paths)} invoices from {self.lines} lines in {self.seconds:.2f}s, "
+            f"{self.cached} from cache, {len(self.skipped)} skipped"
+        )
+
+
+@dataclass(slots=True)
+class OpenGroup:
+    # Valid lines so far
+    lines: list[JobLine]
+    unordered: bool = False
+
+
+def add_lines(groups: dict[GroupKey, OpenGroup], lines: list[JobLine], group_by: GroupBy) -> None:
+    # Valid lines of a chunk, appended to the groups they belong to
+    for key, new_lines in group_lines(lines, group_by).items():
+        group = groups.get(key)
+        if group is None:
+            groups[key] = OpenGroup(new_lines)
+            continue
+        if new_lines[0].dates < group.lines[-1].dates:
+            group.unordered = True
+        group.lines.extend(new_lines)
+
+
+def row_key(row: list[str], address: int, unit: int, by_unit: bool) -> GroupKey:
+    # The group a raw record belongs to, stripped like JobLine strips address and unit
+    width = len(row)
+    address_cell = row[address].strip() if address < width else ""
+    if not by_unit:
+        return address_cell
+    return (address_cell, row[unit].strip() if unit < width else "")
+
+
+def group_ends(path: str | Path, by_unit: bool) -> dict[GroupKey, int]:
+    """
+    The source_row of the last record of every group, from the Address and Unit columns only.
+
+    Parameters
+    ----------
+    path : str | Path
+        CSV file following the README contract.
+    by_unit : bool
+        Group by (address, unit) instead of address.
+
+    Returns
+    -------
+    dict[GroupKey, int]
+        Last row per group. Empty when the columns are missing, which the reader reports.
+    """
+    with Path(path).open("r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        names = [name.strip() for name in next(reader, [])]
+        wanted = {field: name for name, field in COLUMNS.items()}
+        if wanted["address"] not in names or wanted["unit"] not in names:
+            return {}
+        address, unit = names.index(wanted["address"]), names.index(wanted["unit"])
+
+        ends: dict[GroupKey, int] = {}
+        for source_row, row in enumerate(reader, start=2):
+            ends[row_key(row, address, unit, by_unit)] = source_row
+    return ends
+
+
+def next_chunk(chunks: Iterator[tuple[dict[str, int], Rows]]) -> tuple[dict[str, int], Rows] | None:
+    with stats.stage("ingest") as stage:
+        chunk = next(chunks, None)
+        if chunk is not None:
+            stage.add(items=len(chunk[1]))
+    return chunk
+
+
+def validate_chunk(rows: Rows, columns: dict[str, int]) -> ChunkResult:
+    """Worker: validate one chunk of records, keeping Total mismatches for the caller."""
+    errors: list[RowError] = []
+    mismatches: list[tuple[int, str, Decimal | None]] = []
+
+    def on_mismatch(source_row: int, raw_total: str, line_total: Decimal | None) -> None:
+        mismatches.append((source_row, raw_total, line_total))
+
+    lines = validate_rows(rows, columns, errors.append, on_mismatch)
+    return ChunkResult(len(rows), len(lines), lines, errors, mismatches)
+
+
+# Stats stage and render function of this worker, set up by init_worker
+_worker: tuple[str, Callable[[Invoice, Path], object]] | None = None
+
+
+def init_worker(kind: OutputKind, logo: Path | None) -> None:
+    global _worker  # noqa: PLW0603
+    if kind == "pdf":
+        _worker = ("render_pdf", PDFWorker(logo).render)
+    else:
+        _worker = ("render_html", HTMLRenderer().render_to)
+
+
+def render_in_worker(invoice: Invoice, path: Path) -> float:
+    """Worker: write one invoice and return the seconds it took."""
+    assert _worker is not None, "init_worker was not called in this worker"
+    stage_name, render = _worker
+    started = time.perf_counter()
+    with stats.stage(stage_name) as stage:
+        render(invoice, path)
+        stage.add(items=1)
+    return time.perf_counter() - started
+
+
+@dataclass(slots=True)
+class Pipeline:
+    """
+    Settings of a pipelined run from a job line CSV to one rendered file per invoice.
+
+    Parameters
+    ----------
+    header : InvoiceHeader
+        Template header; every invoice gets a copy with its own number and project name.
+    config : InvoiceConfig
+        Numbering, grouping, tax and currency settings.
+    out_dir : Path
+        Output directory, created when missing.
+    kind : OutputKind
+        "pdf" to render with WeasyPrint, "html" for HTML previews.
+    jobs : int
+        Worker processes for validation and rendering; 0 means one per CPU. With 1, a
+        single worker thread does both.
+    logo : Path | None
+        Business logo file, see render.pdf.logo_path.
+    cache : RenderCache | None
+        PDF cache to reuse unchanged invoices from and fill, see render.cache.
+    chunk_size : int
+        Records per validated chunk.
+    """
+
+    header: InvoiceHeader
+    config: InvoiceConfig
+    out_dir: Path
+    kind: OutputKind = "pdf"
+    jobs: int = 0
+    logo: Path | None = None
+    cache: RenderCache | None = None
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+
+    def run(self, path: str | Path) -> PipelineReport:
+        """Run the pipeline on a CSV file, see process."""
+        return asyncio.run(self.process(path))
+
+    async def process(self, path: str | Path) -> PipelineReport:
+        """
+        Read, validate, build and render a job line CSV, all stages overlapping.
+
+        Parameters
+        ----------
+        path : str | Path
+            CSV file following the README contract.
+
+        Returns
+        -------
+        PipelineReport
+            Files written, errors, and the groups left out because of them.
+        """
+        if self.jobs < 0:
+            raise ValueError(f"Jobs must be at least 0, got {self.jobs}")
+        if self.chunk_size < 1:
+            raise ValueError(f"Chunk size must be at least 1, got {self.chunk_size}")
+        if self.kind == "pdf":
+            require_weasyprint()
+
+        started = time.perf_counter()
+        Path(self.out_dir).mkdir(parents=True, exist_ok=True)
+        jobs = self.jobs or os.cpu_count() or 1
+        loop = asyncio.get_running_loop()
+        report = PipelineReport()
+
+        chunks: asyncio.Queue[Chunk | None] = asyncio.Queue(jobs * QUEUED_PER_JOB)
+        invoices: asyncio.Queue[Invoice | None] = asyncio.Queue(jobs * QUEUED_PER_JOB)
+
+        with (
+            ThreadPoolExecutor(max_workers=READER_THREADS) as reader,
+            self.workers(jobs) as workers,
+        ):
+            by_unit = invoice_group_by(self.config) == "unit"
+            ends = loop.run_in_executor(reader, group_ends, path, by_unit)
+            try:
+                async with asyncio.TaskGroup() as tasks:
+                    tasks.create_task(self.read(path, reader, workers, chunks))
+                    tasks.create_task(self.group(chunks, ends, invoices, report))
+                    tasks.create_task(self.render(invoices, workers, jobs, report))
+            except BaseExceptionGroup as group:
+                # Raise the failing stage's own error, e.g. the ValueError of a bad header
+                raise group.exceptions[0] from None
+            finally:
+                # A scan error is the reader's error too, so it is only raised from there
+                ends.cancel()
+                if ends.done() and not ends.cancelled():
+                    ends.exception()
+
+        report.seconds = time.perf_counter() - started
+        return report
+
+    def workers(self, jobs: int) -> Executor:
+        if jobs == 1:
+            return ThreadPoolExecutor(
+                max_workers=1, initializer=init_worker, initargs=(self.kind, self.logo)
+            )
+        return ProcessPoolExecutor(
+            max_workers=jobs, initializer=init_worker, initargs=(self.kind, self.logo)
+        )
+
+    async def read(
+        self,
+        path: str | Path,
+        reader: Executor,
+        workers: Executor,
+        chunks: asyncio.Queue[Chunk | None],
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        records = iter_row_chunks(path, self.chunk_size)
+        while (chunk := await loop.run_in_executor(reader, next_chunk, records)) is not None:
+            columns, rows = chunk
+            # Validation starts right away; the queue bounds how many chunks are in flight
+            result = loop.run_in_executor(workers, validate_chunk, rows, columns)
+            await chunks.put((columns, rows, result))
+        await chunks.put(None)
+
+    async def group(
+        self,
+        chunks: asyncio.Queue[Chunk | None],
+        ends_future: asyncio.Future[dict[GroupKey, int]],
+        invoices: asyncio.Queue[Invoice | None],
+        report: PipelineReport,
+    ) -> None:
+        group_by = invoice_group_by(self.config)
+        sequence = allocator_for(self.config)
+        groups: dict[GroupKey, OpenGroup] = {}
+        invalid: set[GroupKey] = set()
+        ends: dict[GroupKey, int] | None = None
+        finishing: list[GroupKey] = []
+        position = 0
+
+        async def finish(key: GroupKey, group: OpenGroup | None) -> None:
+            if key in invalid:
+                report.skipped.append(key)
+            elif group is not None:
+                # Drawn only for projects that are rendered, so skipped ones leave no gaps
+                await invoices.put(self.build(key, group, sequence.next()))
+
+        try:
+            while (item := await chunks.get()) is not None:
+                columns, rows, future = item
+                result = await future
+                report.lines += result.valid
+                for source_row, raw_total, line_total in result.mismatches:
+                    warn_total_mismatch(source_row, raw_total, line_total)
+                if result.errors:
+                    report.errors.extend(result.errors)
+                    # The group of an invalid row is left out as a whole
+                    records = dict(rows)
+                    address, unit = columns["address"], columns["unit"]
+                    for error in result.errors:
+                        record = records[error.source_row]
+                        invalid.add(row_key(record, address, unit, group_by == "unit"))
+
+                add_lines(groups, result.lines, group_by)
+
+                # Until the scan is done, chunks are still taken in, so reading and
+                # validating go on; the groups they complete are finished once it is
+                if ends is None and ends_future.done():
+                    ends = ends_future.result()
+                    finishing = sorted(ends, key=ends.__getitem__)
+                if ends is None:
+                    continue
+                # Groups whose last row is in this chunk or an earlier one are complete
+                last_row = rows[-1][0]
+                while position < len(finishing) and ends[finishing[position]] <= last_row:
+                    key = finishing[position]
+                    position += 1
+                    await finish(key, groups.pop(key, None))
+
+            if ends is None:
+                ends = await ends_future
+                finishing = sorted(ends, key=ends.__getitem__)
+            # Every group is complete now, still finished in the order of their last rows
+            for key in finishing[position:]:
+                await finish(key, groups.pop(key, None))
+            for key in list(groups):
+                await finish(key, groups.pop(key))
+        finally:
+            sequence.release()
+        if isinstance(sequence, MemorySequence):
+            self.config.sequence_start = Decimal(sequence.value)
+        await invoices.put(None)
+
+    def build(self, key: GroupKey, group: OpenGroup, seq: int) -> Invoice:
+        jobs = group.lines
+        if group.unordered:
+            jobs.sort(key=attrgetter("dates"))
+        with stats.stage("build_invoices") as stage:
+            with stats.stage("numbering") as numbering:
+                number = format_number(self.config, seq, jobs[-1].dates, jobs[-1].unit)
+                numbering.add(items=1)
+            invoice = create_invoice(jobs, self.header, number, self.config, project_name(key))
+            stage.add(items=len(jobs))
+        return invoice
+
+    async def render(
+        self,
+        invoices: asyncio.Queue[Invoice | None],
+        workers: Executor,
+        jobs: int,
+        report: PipelineReport,
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        out_dir = Path(self.out_dir)
+        cache = self.cache if self.kind == "pdf" else None
+        # Rendering file -> (cache key, path)
+        running: dict[asyncio.Future[float], tuple[str | None, Path]] = {}
+
+        async def wait_first() -> None:
+            completed, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for future in completed:
+                report.render_seconds += future.result()
+                key, path = running.pop(future)
+                if cache is not None and key is not None:
+                    cache.store(key, path)
+
+        while (invoice := await invoices.get()) is not None:
+            path = out_dir / output_name(invoice, f".{self.kind}")
+            report.paths.append(path)
+
+            key = None
+            if cache is not None:
+                key = cache.key(invoice)
+                with stats.stage("pdf_cache") as stage:
+                    hit = cache.restore(key, path)
+                    stage.add(cache_hits=int(hit), cache_misses=int(not hit))
+                if hit:
+                    report.cached += 1
+                    continue
+                # An earlier output may be a hard link into the cache, see render.cache
+                path.unlink(missing_ok=True)
+
+            running[loop.run_in_executor(workers, render_in_worker, invoice, path)] = (key, path)
+            if len(running) >= jobs * QUEUED_PER_JOB:
+                await wait_first()
+
+        while running:
+            await wait_first()
+        if cache is not None and len(report.paths) > report.cached:
+            cache.evict()
@@ -0,0 +1,3 @@
+from .joblines import CSVWarning, RowError, read_jobline_chunks, read_joblines
+
+__all__ = ["CSVWarning", "RowError", "read_jobline_chunks", "read_joblines"]
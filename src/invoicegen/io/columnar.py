@@ -0,0 +1,325 @@
+from array import array
+from collections.abc import Iterable
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Literal
+
+import numpy as np
+import pandas as pd
+
+from invoicegen import stats
+from invoicegen.models import Invoice, JobLine, JobLineBatch
+from invoicegen.models.batch import (
+    CENT_PLACES,
+    ScaledColumn,
+    decimal_exponent,
+    from_ordinal,
+    unscale,
+)
+from invoicegen.models.money import to_cents
+
+from .frames import FRAME_COLUMNS
+
+"""
+Parquet and Feather files of validated job lines and of invoice totals.
+
+A job line file holds one typed column per JobLine field: strings, dates, decimals with the
+scale of their column, and booleans, plus source_row. The exponent each quantity and rate
+had is kept in a column of its own, as Arrow decimals all share their column's scale, so
+Decimal("1") comes back as 1 rather than 1.0 next to a 0.5. Writing one after a CSV has been
+validated lets later runs skip parsing and validating the text: read_jobline_batch loads the
+columns straight into a JobLineBatch, factorizing each column so every distinct value is
+converted once, and no JobLine is built until the lines are grouped into invoices. The file
+is trusted to hold lines that were validated when it was written.
+
+An invoice summary file holds one row per invoice with its number, project and totals, for
+accounting tools that need the amounts but not the documents. Summaries can also be written
+as CSV.
+
+Both formats go through pyarrow, which is an optional dependency (the "columnar" extra).
+Decimal columns are stored as Arrow decimals, so amounts stay exact in the files.
+"""
+
+ColumnarFormat = Literal["parquet", "feather", "csv"]
+# File suffix -> format; Arrow IPC files are Feather files
+FORMATS: dict[str, ColumnarFormat] = {
+    ".parquet": "parquet",
+    ".feather": "feather",
+    ".arrow": "feather",
+}
+SUMMARY_FORMATS: dict[str, ColumnarFormat] = {**FORMATS, ".csv": "csv"}
+SUMMARY_COLUMNS = [
+    "number",
+    "project",
+    "subtotal",
+    "tax_total",
+    "total",
+    "amount_paid",
+    "balance_due",
+]
+STRING_COLUMNS = {"address": "addresses", "unit": "units", "description": "descriptions"}
+# Decimal column -> the column holding each value's own exponent, see ScaledColumn
+EXPONENT_COLUMNS = {"qty": "qty_exponent", "rate": "rate_exponent"}
+
+
+def require_pyarrow() -> None:
+    try:
+        import pyarrow  # noqa: F401, PLC0415
+    except ImportError as exc:
+        raise RuntimeError(
+            f"pyarrow is not available, install invoicegen[columnar]: {exc}"
+        ) from exc
+
+
+def file_format(path: str | Path, formats: dict[str, ColumnarFormat] = FORMATS) -> ColumnarFormat:
+    """The format of a path from its suffix, or a ValueError naming the supported ones."""
+    suffix = Path(path).suffix.lower()
+    if suffix not in formats:
+        raise ValueError(f"Cannot tell the format of {path}, expected a {', '.join(formats)} file")
+    return formats[suffix]
+
+
+def write_frame(frame: pd.DataFrame, path: str | Path, file_type: ColumnarFormat) -> None:
+    if file_type == "csv":
+        frame.to_csv(path, index=False)
+        return
+
+    require_pyarrow()
+    if file_type == "parquet":
+        frame.to_parquet(path, engine="pyarrow", index=False)
+    else:
+        frame.to_feather(path)
+
+
+def read_frame(
+    path: str | Path,
+    file_type: ColumnarFormat,
+    columns: list[str],
+    optional: Iterable[str] = (),
+) -> pd.DataFrame:
+    require_pyarrow()
+    if file_type == "parquet":
+        frame = pd.read_parquet(path, engine="pyarrow")
+    else:
+        frame = pd.read_feather(path)
+
+    missing = [name for name in columns if name not in frame.columns]
+    if missing:
+        raise ValueError(f"{path} is missing columns: {', '.join(missing)}")
+    return frame[columns + [name for name in optional if name in frame.columns]]
+
+
+def as_numpy(values: array) -> np.ndarray:
+    # A view of an array's buffer, nothing is copied
+    return np.frombuffer(values, dtype=np.dtype(values.typecode))
+
+
+def unpack(codes: np.ndarray, values: list[Any]) -> np.ndarray:
+    # Per-line values from codes into a list of distinct values
+    table = np.empty(len(values), dtype=object)
+    table[:] = values
+    result: np.ndarray = table[codes]
+    return result
+
+
+def scaled_values(column: ScaledColumn) -> np.ndarray:
+    # Decimals once per distinct scaled integer and exponent
+    pairs = pd.MultiIndex.from_arrays([as_numpy(column.values), as_numpy(column.exponents)])
+    codes, uniques = pd.factorize(pairs)
+    return unpack(codes, [unscale(value, column.scale, exponent) for value, exponent in uniques])
+
+
+def batch_frame(batch: JobLineBatch) -> pd.DataFrame:
+    """
+    The lines of a batch as a typed frame, the same as frames.FrameResult.frame.
+
+    Parameters
+    ----------
+    batch : JobLineBatch
+        Lines to convert.
+
+    Returns
+    -------
+    pd.DataFrame
+        FRAME_COLUMNS with python dates, Decimals and bools, indexed by source_row.
+    """
+    columns: dict[str, np.ndarray] = {}
+    for name, table in STRING_COLUMNS.items():
+        codes = as_numpy(getattr(batch, f"{name}_codes"))
+        columns[name] = unpack(codes, getattr(batch, table).strings)
+
+    codes, ordinals = pd.factorize(as_numpy(batch.ordinals))
+    columns["dates"] = unpack(codes, [from_ordinal(ordinal) for ordinal in ordinals.tolist()])
+    for name in ["qty", "rate", "line_total"]:
+        columns[name] = scaled_values(getattr(batch, name))
+
+    bits = np.unpackbits(np.frombuffer(batch.paid_bits, dtype=np.uint8), bitorder="little")
+    columns["paid"] = bits[: len(batch)].astype(bool)
+
+    index = pd.Index(as_numpy(batch.source_rows), name="source_row")
+    return pd.DataFrame(columns, index=index)[FRAME_COLUMNS]
+
+
+def factorized(frame: pd.DataFrame, name: str) -> tuple[np.ndarray, list[Any]]:
+    # Codes and distinct values of a column, which must not have gaps
+    codes, uniques = pd.factorize(frame[name].to_numpy())
+    if (codes < 0).any():
+        raise ValueError(f"Column {name} has missing values")
+    return codes, uniques.tolist()
+
+
+def to_decimal(value: Any) -> Decimal:
+    # Files written by other tools may hold floats or integers instead of decimals
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def pack_decimals(frame: pd.DataFrame, name: str, column: ScaledColumn) -> None:
+    # Fill an empty column once per distinct value, checked like ScaledColumn.fit
+    codes, uniques = factorized(frame, name)
+    decimals = [to_decimal(value) for value in uniques]
+    own = np.array([decimal_exponent(value) for value in decimals], dtype=np.int64)
+    exponents = own[codes]
+
+    if name == "line_total":
+        scale = CENT_PLACES
+        scaled = [to_cents(value) for value in decimals]
+        exponents[:] = -CENT_PLACES
+    else:
+        exponent_column = EXPONENT_COLUMNS.get(name)
+        if exponent_column in frame.columns:
+            # Arrow gave every value the column's scale; the file kept what each one had,
+            # which may drop trailing zeros but no other digit
+            shortest = np.array(
+                [decimal_exponent(value.normalize()) for value in decimals], dtype=np.int64
+            )
+            saved = frame[exponent_column].to_numpy(dtype=np.int64)
+            exponents = np.maximum(np.minimum(saved, shortest[codes]), exponents)
+        scale = max(-int(exponents.min(initial=0)), 0)
+        scaled = [int(value.scaleb(scale)) for value in decimals]
+
+    column.check(max(map(abs, scaled), default=0), scale)
+    column.scale = scale
+    column.values.frombytes(np.array(scaled, dtype=np.int64)[codes].tobytes())
+    column.exponents.frombytes(exponents.astype(np.int8).tobytes())
+
+
+def frame_batch(frame: pd.DataFrame) -> JobLineBatch:
+    """
+    Pack a typed frame of validated lines into a JobLineBatch without building JobLines.
+
+    Parameters
+    ----------
+    frame : pd.DataFrame
+        FRAME_COLUMNS indexed by source_row, as from batch_frame or frames.validate_frame.
+
+    Returns
+    -------
+    JobLineBatch
+        The lines, in frame order.
+    """
+    batch = JobLineBatch()
+    batch.size = len(frame)
+
+    for name, table_name in STRING_COLUMNS.items():
+        codes, strings = factorized(frame, name)
+        table = getattr(batch, table_name)
+        table.strings = [str(value) for value in strings]
+        table.codes = {value: code for code, value in enumerate(table.strings)}
+        getattr(batch, f"{name}_codes").frombytes(codes.astype(np.uintc).tobytes())
+
+    codes, dates = factorized(frame, "dates")
+    ordinals = np.array([value.toordinal() for value in dates], dtype=np.intc)
+    batch.ordinals.frombytes(ordinals[codes].tobytes())
+
+    for name in ["qty", "rate", "line_total"]:
+        pack_decimals(frame, name, getattr(batch, name))
+
+    paid = frame["paid"].to_numpy()
+    if pd.isna(paid).any():
+        raise ValueError("Column paid has missing values")
+    batch.paid_bits = bytearray(np.packbits(paid.astype(bool), bitorder="little").tobytes())
+    batch.source_rows.frombytes(frame.index.to_numpy(dtype=np.int64).tobytes())
+    return batch
+
+
+def write_joblines(lines: JobLineBatch | Iterable[JobLine], path: str | Path) -> None:
+    """
+    Write validated job lines to a Parquet or Feather file.
+
+    Parameters
+    ----------
+    lines : JobLineBatch | Iterable[JobLine]
+        Lines to write, in order.
+    path : str | Path
+        Output file; its suffix (.parquet, .feather or .arrow) picks the format.
+    """
+    file_type = file_format(path)
+    batch = lines if isinstance(lines, JobLineBatch) else JobLineBatch.from_joblines(lines)
+    frame = batch_frame(batch)
+    for name, exponent_column in EXPONENT_COLUMNS.items():
+        frame[exponent_column] = as_numpy(getattr(batch, name).exponents)
+    write_frame(frame.reset_index(), path, file_type)
+
+
+def read_jobline_batch(path: str | Path) -> JobLineBatch:
+    """
+    Load a file from write_joblines into a JobLineBatch.
+
+    Parameters
+    ----------
+    path : str | Path
+        Parquet or Feather file of job lines.
+
+    Returns
+    -------
+    JobLineBatch
+        The lines, in file order. They are not validated again.
+    """
+    file_type = file_format(path)
+    with stats.stage("ingest") as stage:
+        frame = read_frame(
+            path, file_type, ["source_row", *FRAME_COLUMNS], EXPONENT_COLUMNS.values()
+        )
+        try:
+            batch = frame_batch(frame.set_index("source_row"))
+        except ValueError as exc:
+            raise ValueError(f"{path}: {exc}") from exc
+        stage.add(items=len(batch))
+    return batch
+
+
+def invoice_summaries(invoices: Iterable[Invoice]) -> pd.DataFrame:
+    """One row per invoice: SUMMARY_COLUMNS, with the amounts as Decimals."""
+    rows = [
+        (
+            invoice.header.meta.number,
+            invoice.header.client.project_name,
+            invoice.subtotal,
+            invoice.tax_total,
+            invoice.total,
+            invoice.amount_paid,
+            invoice.balance_due,
+        )
+        for invoice in invoices
+    ]
+    return pd.DataFrame.from_records(rows, columns=SUMMARY_COLUMNS)
+
+
+def write_invoice_summaries(invoices: Iterable[Invoice], path: str | Path) -> None:
+    """
+    Write the number, project and totals of each invoice.
+
+    Parameters
+    ----------
+    invoices : Iterable[Invoice]
+        Built invoices.
+    path : str | Path
+        Output file; its suffix (.parquet, .feather, .arrow or .csv) picks the format.
+    """
+    file_type = file_format(path, SUMMARY_FORMATS)
+    write_frame(invoice_summaries(invoices), path, file_type)
+
+
+def read_invoice_summaries(path: str | Path) -> pd.DataFrame:
+    """Load a Parquet or Feather file from write_invoice_summaries."""
+    return read_frame(path, file_format(path), SUMMARY_COLUMNS)
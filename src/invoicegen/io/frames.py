@@ -0,0 +1,321 @@
+import csv
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from invoicegen import stats
+from invoicegen.models import JobLine
+from invoicegen.models.jobline import round_line_total
+from invoicegen.models.parsing import parse_date, parse_decimal_text
+from invoicegen.models.trusted import construct, paused_gc
+
+from .joblines import DEFAULT_CHUNK_SIZE, RowError, resolve_columns, warn_total_mismatch
+
+"""
+Columnar validation of job line CSV files with pandas.
+
+Each chunk of the file is checked one column at a time instead of one JobLine at a time.
+Every column is factorized first, so a rule runs once per distinct value in the chunk
+instead of once per row; real exports only have a few hundred distinct dates, rates,
+quantities, addresses and units, even across millions of rows. The results are then
+broadcast back to the rows with numpy.
+
+The rules and messages mirror the JobLine field validators for text input (which is all a
+CSV can hold), so a file produces the same RowErrors through either path.
+"""
+
+# JobLine field order, which is also the order pydantic reports field errors in
+FIELD_ORDER = ["address", "unit", "dates", "description", "qty", "rate", "paid"]
+# Every JobLine field except source_row, which is the frame index
+FRAME_COLUMNS = ["address", "unit", "dates", "description", "qty", "rate", "line_total", "paid"]
+
+MAX_DESCRIPTION_CHARS = 2000
+
+# (parsed value, error message) for one distinct cell value
+Check = Callable[[str], tuple[Any, str | None]]
+
+
+@dataclass(slots=True)
+class FrameResult:
+    # Valid rows with typed columns: python dates, Decimals and bools, indexed by source_row
+    frame: pd.DataFrame
+    errors: list[RowError] = field(default_factory=list)
+
+    def joblines(self) -> list[JobLine]:
+        """Build JobLines for the valid rows without running the field validators again."""
+        frame = self.frame
+        columns = [frame[name].tolist() for name in FRAME_COLUMNS]
+        names = [*FRAME_COLUMNS, "source_row"]
+
+        # Every value was checked column by column and line_total was rounded the same way
+        # as JobLine does it, so the instances are filled in directly (see models.trusted)
+        with paused_gc():
+            return [
+                construct(JobLine, dict(zip(names, values, strict=True)))
+                for values in zip(*columns, frame.index.tolist(), strict=True)
+            ]
+
+
+def read_header(path: str | Path) -> list[str]:
+    with Path(path).open("r", encoding="utf-8-sig", newline="") as f:
+        header = next(csv.reader(f), None)
+
+    if header is None:
+        raise ValueError(f"{path} is empty, expected a header row")
+    return header
+
+
+def blank_rows(raw: pd.DataFrame) -> np.ndarray:
+    # A record is blank when every cell is whitespace. Most rows are ruled out by the first
+    # column, so later columns are only checked for the rows that are still candidates.
+    blank = np.ones(len(raw), dtype=bool)
+    for position in range(raw.shape[1]):
+        candidates = np.flatnonzero(blank)
+        if not len(candidates):
+            break
+        cells = raw.iloc[candidates, position].to_numpy()
+        blank[candidates] = [not cell.strip() for cell in cells]
+    return blank
+
+
+def read_frame_chunks(
+    path: str | Path,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a job line CSV as DataFrames of raw text, one column per JobLine field.
+
+    Parameters
+    ----------
+    path : str | Path
+        CSV file following the README contract.
+    chunk_size : int
+        Number of records (blank ones included) per DataFrame.
+
+    Returns
+    -------
+    Iterator[pd.DataFrame]
+        Chunks indexed by source_row, with blank records removed. The optional Total column
+        is kept as "total" so mismatches can be reported.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"Chunk size must be at least 1, got {chunk_size}")
+
+    header = read_header(path)
+    columns = resolve_columns(header)
+    names = {index: name for name, index in columns.items()}
+
+    reader = pd.read_csv(
+        path,
+        # Fields past the header are dropped rather than rejected, as the csv reader does
+        usecols=range(len(header)),
+        dtype=object,
+        keep_default_na=False,
+        skip_blank_lines=False,
+        encoding="utf-8-sig",
+        chunksize=chunk_size,
+    )
+    with reader:
+        for records in reader:
+            # Short records leave missing cells, which the csv reader treats as empty
+            raw = records.fillna("")
+
+            chunk = raw.iloc[~blank_rows(raw), list(names)]
+            chunk.columns = list(names.values())
+            # The header is row 1, so the first record is row 2
+            chunk.index = chunk.index + 2
+            chunk.index.name = "source_row"
+
+            if len(chunk):
+                yield chunk
+
+
+def check_nonempty(label: str) -> Check:
+    def check(text: str) -> tuple[Any, str | None]:
+        value = text.strip()
+        if not value:
+            return None, f"{label} is empty, expected a value"
+        return value, None
+
+    return check
+
+
+def check_description(text: str) -> tuple[Any, str | None]:
+    value = text.strip()
+    if not value:
+        return None, "Description is empty, expected a value"
+    if len(value) > MAX_DESCRIPTION_CHARS:
+        return None, "Description is too long (max 2000 chars)"
+    return value, None
+
+
+def check_date(text: str) -> tuple[Any, str | None]:
+    try:
+        return parse_date(text.strip()), None
+    except ValueError as e:
+        return None, str(e)
+
+
+def check_decimal(label: str) -> Check:
+    def check(text: str) -> tuple[Any, str | None]:
+        try:
+            return parse_decimal_text(text, label), None
+        except ValueError as e:
+            return None, str(e)
+
+    return check
+
+
+def check_paid(text: str) -> tuple[Any, str | None]:
+    value = text.strip().lower()
+    if value == "true":
+        return True, None
+    if value == "false":
+        return False, None
+    return None, "Paid must be a string or boolean True or False"
+
+
+CHECKS: dict[str, Check] = {
+    "address": check_nonempty("Address"),
+    "unit": check_nonempty("Unit"),
+    "dates": check_date,
+    "description": check_description,
+    "qty": check_decimal("Qty"),
+    "rate": check_decimal("Rate"),
+    "paid": check_paid,
+}
+
+
+def check_column(values: np.ndarray, check: Check) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Run a check once per distinct value of a column.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray, np.ndarray]
+        Per row: parsed values, error messages (None when valid) and a failure mask.
+    """
+    codes, uniques = pd.factorize(values)
+
+    parsed = np.empty(len(uniques), dtype=object)
+    messages = np.empty(len(uniques), dtype=object)
+    for position, text in enumerate(uniques):
+        parsed[position], messages[position] = check(text)
+    failed = np.array([message is not None for message in messages], dtype=bool)
+
+    return parsed[codes], messages[codes], failed[codes]
+
+
+def line_totals(qty: np.ndarray, rate: np.ndarray) -> np.ndarray:
+    # Same rounding as JobLine.compute_line_total, once per distinct (qty, rate) pair
+    qty_codes, qty_uniques = pd.factorize(qty)
+    rate_codes, rate_uniques = pd.factorize(rate)
+    width = max(len(rate_uniques), 1)
+    pair_codes, pairs = pd.factorize(qty_codes * width + rate_codes)
+
+    totals = np.empty(len(pairs), dtype=object)
+    for position, pair in enumerate(pairs.tolist()):
+        totals[position] = round_line_total(qty_uniques[pair // width], rate_uniques[pair % width])
+
+    per_row: np.ndarray = totals[pair_codes]
+    return per_row
+
+
+def validate_frame(chunk: pd.DataFrame) -> FrameResult:
+    """
+    Validate a raw text chunk from read_frame_chunks column by column.
+
+    Parameters
+    ----------
+    chunk : pd.DataFrame
+        Raw text columns indexed by source_row.
+
+    Returns
+    -------
+    FrameResult
+        Typed columns for the rows that passed, and one RowError per failing field in the
+        same order and wording JobLine would report them.
+    """
+    parsed: dict[str, np.ndarray] = {}
+    messages: dict[str, np.ndarray] = {}
+    bad = np.zeros(len(chunk), dtype=bool)
+
+    for name in FIELD_ORDER:
+        parsed[name], messages[name], failed = check_column(chunk[name].to_numpy(), CHECKS[name])
+        if failed.any():
+            bad |= failed
+        else:
+            del messages[name]
+
+    # Errors are few, so they are gathered row by row, fields in model order
+    errors = []
+    if bad.any():
+        bad_messages = {name: column[bad].tolist() for name, column in messages.items()}
+        for position, source_row in enumerate(chunk.index[bad].tolist()):
+            for name, column in bad_messages.items():
+                message = column[position]
+                if message is not None:
+                    errors.append(RowError(source_row, name, message))
+
+    good = ~bad
+    columns = {name: values[good] for name, values in parsed.items()}
+    columns["line_total"] = line_totals(columns["qty"], columns["rate"])
+    columns["paid"] = columns["paid"].astype(bool)
+
+    frame = pd.DataFrame(columns, index=chunk.index[good])
+    frame = frame[FRAME_COLUMNS]
+
+    if "total" in chunk.columns:
+        check_totals(chunk["total"].to_numpy()[good], frame)
+
+    return FrameResult(frame, errors)
+
+
+def parse_total(text: str) -> tuple[Any, str | None]:
+    # The Total column is ignored for math, so an unreadable Total is just a mismatch
+    value = text.strip().replace("$", "").replace(",", "")
+    if not value:
+        return None, None
+    try:
+        return Decimal(value), None
+    except InvalidOperation:
+        return value, None
+
+
+def check_totals(raw_totals: np.ndarray, frame: pd.DataFrame) -> None:
+    # Vectorized version of joblines.total_matches: only non-empty Totals are compared
+    totals, _, _ = check_column(raw_totals, parse_total)
+    present = np.flatnonzero([total is not None for total in totals])
+    if not len(present):
+        return
+
+    mismatched = present[totals[present] != frame["line_total"].to_numpy()[present]]
+    for position in mismatched.tolist():
+        warn_total_mismatch(
+            frame.index[position], raw_totals[position], frame["line_total"].iat[position]
+        )
+
+
+def read_frames(
+    path: str | Path,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[FrameResult]:
+    """Stream a job line CSV as validated columnar chunks, see validate_frame."""
+    chunks = read_frame_chunks(path, chunk_size)
+    while True:
+        with stats.stage("ingest") as stage:
+            chunk = next(chunks, None)
+            if chunk is not None:
+                stage.add(items=len(chunk))
+        if chunk is None:
+            return
+
+        with stats.stage("validate") as stage:
+            result = validate_frame(chunk)
+            stage.add(items=len(chunk), errors=len({error.source_row for error in result.errors}))
+        yield result
@@ -0,0 +1,294 @@
+import csv
+import warnings
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import Literal
+
+from pydantic import ValidationError
+
+from invoicegen import stats
+from invoicegen.models import JobLine
+
+"""
+Streaming reader for job line CSV files.
+
+Rows are pulled lazily from the csv module and validated into JobLine objects one chunk at a
+time, so memory stays bounded by the chunk size no matter how large the export is.
+Row numbers follow the spreadsheet the CSV came from: the header is row 1, and blank lines
+still count towards the numbering even though they are skipped.
+"""
+
+# CSV header -> JobLine field, as described by the CSV contract in the README
+COLUMNS = {
+    "Date": "dates",
+    "Address": "address",
+    "Unit": "unit",
+    "Description": "description",
+    "Quantity": "qty",
+    "Unit Price": "rate",
+    "Paid": "paid",
+}
+TOTAL_COLUMN = "Total"
+
+DEFAULT_CHUNK_SIZE = 10_000
+
+Engine = Literal["python", "pandas", "mmap"]
+
+
+class CSVWarning(UserWarning):
+    """Notices about the input that do not stop validation (unknown columns, bad totals)."""
+
+
+@dataclass(frozen=True, slots=True)
+class RowError:
+    source_row: int
+    field: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"Row {self.source_row}: {self.field}: {self.message}"
+
+
+ErrorHandler = Callable[[RowError], None]
+
+
+def resolve_columns(header: list[str]) -> dict[str, int]:
+    """
+    Map each JobLine field to its column position in the CSV header.
+
+    Parameters
+    ----------
+    header : list[str]
+        The first record of the CSV file.
+
+    Returns
+    -------
+    dict[str, int]
+        Field name -> column index. The optional Total column is stored under "total".
+    """
+    positions: dict[str, int] = {}
+    for index, raw_name in enumerate(header):
+        name = raw_name.strip()
+
+        if name in COLUMNS:
+            positions.setdefault(COLUMNS[name], index)
+        elif name == TOTAL_COLUMN:
+            positions.setdefault("total", index)
+        elif name:
+            warnings.warn(f"Unknown column: {name}", CSVWarning, stacklevel=2)
+
+    missing = [name for name, field in COLUMNS.items() if field not in positions]
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+
+    return positions
+
+
+def is_blank(row: list[str]) -> bool:
+    return not any(cell.strip() for cell in row)
+
+
+def errors_from_exception(exc: ValidationError, source_row: int) -> list[RowError]:
+    """Flatten a JobLine ValidationError into one RowError per failing field."""
+    errors = []
+    for err in exc.errors():
+        field = str(err["loc"][0]) if err["loc"] else ""
+
+        # Report the message raised by the validator, without pydantic's "Value error, " prefix
+        ctx_error = err.get("ctx", {}).get("error")
+        message = str(ctx_error) if ctx_error is not None else err["msg"]
+
+        errors.append(RowError(source_row, field, message))
+    return errors
+
+
+def raise_first_error(error: RowError) -> None:
+    raise ValueError(str(error))
+
+
+def total_matches(raw_total: str, line_total: Decimal | None) -> bool:
+    # The Total column is ignored for math, it only produces a warning when it disagrees
+    value = raw_total.strip().replace("$", "").replace(",", "")
+    if not value:
+        return True
+
+    try:
+        return Decimal(value) == line_total
+    except InvalidOperation:
+        return False
+
+
+def warn_total_mismatch(source_row: int, raw_total: str, line_total: Decimal | None) -> None:
+    warnings.warn(
+        f"Row {source_row}: Total '{raw_total.strip()}' does not match "
+        f"Quantity * Unit Price ({line_total})",
+        CSVWarning,
+        stacklevel=2,
+    )
+
+
+MismatchHandler = Callable[[int, str, Decimal | None], None]
+
+
+def validate_rows(
+    rows: Iterable[tuple[int, list[str]]],
+    columns: dict[str, int],
+    on_error: ErrorHandler,
+    on_mismatch: MismatchHandler = warn_total_mismatch,
+) -> list[JobLine]:
+    """
+    Validate numbered CSV records into JobLine objects.
+
+    Parameters
+    ----------
+    rows : Iterable[tuple[int, list[str]]]
+        (source_row, record) pairs, blank records already removed.
+    columns : dict[str, int]
+        Output of resolve_columns for the file the rows came from.
+    on_error : ErrorHandler
+        Called once per failing field; the row is dropped from the result.
+    on_mismatch : MismatchHandler
+        Called with (source_row, raw Total, line_total) when the Total column disagrees.
+
+    Returns
+    -------
+    list[JobLine]
+        The rows that passed validation, in input order.
+    """
+    total_index = columns.get("total")
+    fields = [(field, index) for field, index in columns.items() if field != "total"]
+
+    lines = []
+    checked = 0
+    with stats.stage("validate") as stage:
+        for source_row, row in rows:
+            checked += 1
+            width = len(row)
+            data: dict[str, object] = {
+                field: row[index] if index < width else "" for field, index in fields
+            }
+            data["source_row"] = source_row
+
+            try:
+                line = JobLine.model_validate(data)
+            except ValidationError as exc:
+                for error in errors_from_exception(exc, source_row):
+                    on_error(error)
+                continue
+
+            if total_index is not None and total_index < width:
+                raw_total = row[total_index]
+                if not total_matches(raw_total, line.line_total):
+                    on_mismatch(source_row, raw_total, line.line_total)
+
+            lines.append(line)
+        stage.add(items=checked, errors=checked - len(lines))
+
+    return lines
+
+
+def iter_row_chunks(
+    path: str | Path,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[tuple[dict[str, int], list[tuple[int, list[str]]]]]:
+    """Yield (columns, numbered non-blank records) for each chunk of a job line CSV."""
+    if chunk_size < 1:
+        raise ValueError(f"Chunk size must be at least 1, got {chunk_size}")
+
+    with Path(path).open("r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+
+        header = next(reader, None)
+        if header is None:
+            raise ValueError(f"{path} is empty, expected a header row")
+        columns = resolve_columns(header)
+
+        chunk: list[tuple[int, list[str]]] = []
+        # The header is row 1, so the first data record is row 2
+        for source_row, row in enumerate(reader, start=2):
+            if is_blank(row):
+                continue
+
+            chunk.append((source_row, row))
+            if len(chunk) >= chunk_size:
+                yield columns, chunk
+                chunk = []
+
+        if chunk:
+            yield columns, chunk
+
+
+def read_jobline_chunks(
+    path: str | Path,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    on_error: ErrorHandler | None = None,
+    engine: Engine = "python",
+) -> Iterator[list[JobLine]]:
+    """
+    Stream a job line CSV as lists of at most chunk_size validated JobLines.
+
+    Parameters
+    ----------
+    path : str | Path
+        CSV file following the README contract.
+    chunk_size : int
+        Number of non-blank records validated per chunk.
+    on_error : ErrorHandler | None
+        Called for every invalid field. When omitted, the first invalid row raises ValueError.
+    engine : Engine
+        "python" validates each row through JobLine, "pandas" validates whole columns at once
+        (see invoicegen.io.frames), "mmap" maps the file and decodes only the columns JobLine
+        uses before validating like "python", for files whose other columns are not UTF-8;
+        it is slower than "python" (see invoicegen.io.mapped). All report the same errors.
+
+    Returns
+    -------
+    Iterator[list[JobLine]]
+        Validated lines with source_row set, in file order.
+    """
+    handler = raise_first_error if on_error is None else on_error
+
+    if engine == "pandas":
+        # Only pay for importing pandas when the columnar engine is asked for
+        from .frames import read_frames  # noqa: PLC0415
+
+        for result in read_frames(path, chunk_size):
+            for error in result.errors:
+                handler(error)
+            lines = result.joblines()
+            if lines:
+                yield lines
+        return
+
+    if engine == "mmap":
+        from .mapped import iter_mapped_chunks  # noqa: PLC0415
+
+        chunks = iter_mapped_chunks(path, chunk_size)
+    else:
+        chunks = iter_row_chunks(path, chunk_size)
+    while True:
+        # Reading is timed apart from validating, so ingest and validate show separately
+        with stats.stage("ingest") as stage:
+            chunk = next(chunks, None)
+            if chunk is not None:
+                stage.add(items=len(chunk[1]))
+        if chunk is None:
+            return
+
+        columns, rows = chunk
+        lines = validate_rows(rows, columns, handler)
+        if lines:
+            yield lines
+
+
+def read_joblines(
+    path: str | Path,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    on_error: ErrorHandler | None = None,
+    engine: Engine = "python",
+) -> Iterator[JobLine]:
+    """Stream validated JobLines from a CSV file, see read_jobline_chunks."""
+    for lines in read_jobline_chunks(path, chunk_size, on_error, engine):
+        yield from lines
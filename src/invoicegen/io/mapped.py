@@ -0,0 +1,267 @@
+import csv
+import io
+import mmap
+from collections.abc import Callable, Iterator
+from operator import itemgetter
+from pathlib import Path
+from typing import Any
+
+from invoicegen.models.trusted import paused_gc
+
+from .joblines import DEFAULT_CHUNK_SIZE, is_blank, resolve_columns
+
+"""
+Memory-mapped reader for job line CSV files whose other columns need not be decoded.
+
+The file is mapped instead of read, and scanned forward once in blocks of about a megabyte
+of whole lines. Fields stay bytes until they are needed: only the columns JobLine uses (the
+README contract plus Total) are decoded, and other columns, such as Technician, are never
+decoded at all, so an export whose notes are in another encoding still reads. The records
+are then validated by the same code as the python engine, so both report the same lines and
+errors.
+
+Most lines of an export are plain: no quotes, every column present, not blank. Those are
+split into fields by bytes methods, and the wanted fields of a whole block are joined and
+decoded with a single call. A record with a quote, whose fields may hold commas, doubled
+quotes and line breaks, is split by the csv module instead, reading the bytes as latin-1 so
+that its unused fields are not decoded either.
+
+This is not a faster reader. Splitting lines takes a few calls per line here, where the
+python engine's csv reader does all of it in C, so on typical exports, with quoted prices and
+descriptions, the python engine reads rows faster; use this engine for what it leaves
+undecoded, not for speed.
+
+Records follow the csv module's default dialect. Lines end with \\n or \\r\\n; old Mac files
+ending lines with a bare \\r need the python engine.
+"""
+
+BOM = b"\xef\xbb\xbf"
+# Lines are taken in blocks of at least this many bytes
+BLOCK_BYTES = 1 << 20
+# Delimiters and the ASCII characters str.strip removes; a line of only these is blank
+BLANK_BYTES = b", \t\r\x0b\x0c\x1c\x1d\x1e\x1f"
+# Separates the fields of plain lines while a block is decoded
+SEPARATOR = b"\x1f"
+ASCII_END = 0x80
+
+
+def latin1_lines(data: mmap.mmap, pos: int, ends: list[int]) -> Iterator[str]:
+    # Lines from pos as latin-1 text, which csv splits exactly like the UTF-8 bytes since
+    # delimiters, quotes and line breaks are ASCII; ends[0] follows the last line taken
+    size = len(data)
+    while pos < size:
+        newline = data.find(b"\n", pos)
+        ends[0] = size if newline == -1 else newline + 1
+        yield data[pos : ends[0]].decode("latin-1")
+        pos = ends[0]
+
+
+def header_record(data: mmap.mmap, path: str | Path) -> tuple[list[str], int]:
+    """The header, decoded in full so unknown columns are still noticed, and where it ends."""
+    pos = len(BOM) if data[: len(BOM)] == BOM else 0
+    if pos >= len(data):
+        raise ValueError(f"{path} is empty, expected a header row")
+    ends = [len(data)]
+    header = next(csv.reader(latin1_lines(data, pos, ends)), [])
+    return [name.encode("latin-1").decode() for name in header], ends[0]
+
+
+class RecordScanner:
+    """
+    Splits the lines of a mapped CSV file into records, decoding only the wanted columns.
+
+    Records come out as the cells of the wanted columns only, in file order, and blank
+    records as None.
+
+    Parameters
+    ----------
+    data : mmap.mmap
+        The mapped file.
+    indices : list[int]
+        Positions of the wanted columns, in increasing order.
+    """
+
+    __slots__ = ("data", "pick", "width")
+
+    def __init__(self, data: mmap.mmap, indices: list[int]):
+        self.data = data
+        self.width = indices[-1] + 1
+        # itemgetter only returns a tuple for more than one item
+        self.pick: Callable[[list[Any]], tuple[Any, ...]] = (
+            itemgetter(*indices) if len(indices) > 1 else lambda row: (row[indices[0]],)
+        )
+
+    def line_cells(self, line: bytes) -> list[str] | None:
+        # A line without quotes that is short, may be blank or holds the separator
+        line = line.removesuffix(b"\r")
+        fields = line.split(b",", self.width)
+        if len(fields) < self.width:
+            # Short records, the missing cells are empty like with csv
+            fields += [b""] * (self.width - len(fields))
+        cells = [field.decode() for field in self.pick(fields)]
+        # When every wanted cell is blank, the record still counts if another cell is not
+        if any(cell.strip() for cell in cells) or not is_blank(line.decode().split(",")):
+            return cells
+        return None
+
+    def quoted_cells(self, row: list[str]) -> list[str] | None:
+        # A record split by csv from latin-1 text
+        if len(row) < self.width:
+            row = row + [""] * (self.width - len(row))
+        cells = [cell.encode("latin-1").decode() for cell in self.pick(row)]
+        if any(cell.strip() for cell in cells) or not is_blank(
+            [cell.encode("latin-1").decode() for cell in row]
+        ):
+            return cells
+        return None
+
+    def block(self, lines: list[bytes], final: bool) -> tuple[list[list[str] | None], int]:
+        """
+        The records of a block of lines.
+
+        Parameters
+        ----------
+        lines : list[bytes]
+            Consecutive lines of the file, without their line breaks.
+        final : bool
+            Whether the block ends with the file.
+
+        Returns
+        -------
+        tuple[list[list[str] | None], int]
+            The records, and the number of lines they were read from. Unless the block is
+            final, a quoted record reaching its last line may go on past it, so such a
+            record and the lines after it are left for the next block.
+        """
+        width, pick = self.width, self.pick
+        count = len(lines)
+        fields = [line.split(b",", width) for line in lines]
+        is_plain = [
+            len(line_fields) >= width
+            and b'"' not in line
+            and SEPARATOR not in line
+            and bool(content := line.strip(BLANK_BYTES))
+            # Lines starting with non-ASCII text may only hold Unicode whitespace
+            and content[0] < ASCII_END
+            for line, line_fields in zip(lines, fields, strict=True)
+        ]
+
+        # The other lines go one by one, in order, as line breaks in quoted fields take in
+        # the lines after them
+        slow: dict[int, list[str] | None] = {}
+        dropped: set[int] = set()
+        taken = 0
+        for index in [index for index, plain in enumerate(is_plain) if not plain]:
+            if index < taken:
+                continue
+            if b'"' not in lines[index]:
+                slow[index] = self.line_cells(lines[index])
+                continue
+
+            reader = csv.reader(
+                lines[position].decode("latin-1") + "\n" for position in range(index, count)
+            )
+            row = next(reader)
+            taken = index + reader.line_num
+            if taken >= count and not final:
+                count = index
+                break
+            slow[index] = self.quoted_cells(row)
+            for position in range(index + 1, taken):
+                dropped.add(position)
+                is_plain[position] = False
+
+        plain = [index for index in range(count) if is_plain[index]]
+        records: list[list[str] | None] = [None] * count
+        if plain:
+            text = b"\n".join([SEPARATOR.join(pick(fields[index])) for index in plain]).decode()
+            if "\r" in text:
+                # Only the last column of a plain line ends with the \r of its \r\n
+                text = text.replace("\r\n", "\n").removesuffix("\r")
+            separator = SEPARATOR.decode()
+            cells: list[list[str] | None] = [row.split(separator) for row in text.split("\n")]
+            if len(plain) == count:
+                return cells, count
+            for index, row_cells in zip(plain, cells, strict=True):
+                records[index] = row_cells
+
+        for index, value in slow.items():
+            records[index] = value
+        if dropped:
+            records = [record for index, record in enumerate(records) if index not in dropped]
+        return records, count
+
+    def records(self, pos: int) -> Iterator[list[str] | None]:
+        """Every record from pos to the end of the file, None for blank ones."""
+        data = self.data
+        size = len(data)
+        block_bytes = BLOCK_BYTES
+        while pos < size:
+            stop = data.find(b"\n", pos + block_bytes)
+            final = stop == -1
+            if final:
+                stop = size
+
+            lines = data[pos:stop].split(b"\n")
+            # A block makes tens of thousands of lists at once, none of them in a cycle
+            with paused_gc():
+                records, used = self.block(lines, final)
+            if not used:
+                # A single record longer than the block
+                block_bytes *= 2
+                continue
+
+            block_bytes = BLOCK_BYTES
+            yield from records
+            if used == len(lines):
+                pos = stop + 1
+            else:
+                pos += sum(len(line) + 1 for line in lines[:used])
+
+
+def iter_mapped_chunks(
+    path: str | Path,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[tuple[dict[str, int], list[tuple[int, list[str]]]]]:
+    """
+    Memory-mapped counterpart of joblines.iter_row_chunks.
+
+    Parameters
+    ----------
+    path : str | Path
+        CSV file following the README contract.
+    chunk_size : int
+        Number of non-blank records per chunk.
+
+    Returns
+    -------
+    Iterator[tuple[dict[str, int], list[tuple[int, list[str]]]]]
+        (columns, numbered non-blank records). Records only hold the cells of the columns
+        JobLine uses, so columns maps each field to its position among those.
+    """
+    if chunk_size < 1:
+        raise ValueError(f"Chunk size must be at least 1, got {chunk_size}")
+
+    with Path(path).open("rb") as f:
+        if not f.seek(0, io.SEEK_END):
+            raise ValueError(f"{path} is empty, expected a header row")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            header, pos = header_record(data, path)
+            positions = resolve_columns(header)
+            indices = sorted(positions.values())
+            columns = {field: indices.index(index) for field, index in positions.items()}
+            scanner = RecordScanner(data, indices)
+
+            chunk: list[tuple[int, list[str]]] = []
+            # The header is row 1, so the first data record is row 2
+            for source_row, cells in enumerate(scanner.records(pos), start=2):
+                if cells is None:
+                    continue
+
+                chunk.append((source_row, cells))
+                if len(chunk) >= chunk_size:
+                    yield columns, chunk
+                    chunk = []
+
+            if chunk:
+                yield columns, chunk
@@ -0,0 +1,347 @@
+import csv
+import io
+import os
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from decimal import Decimal
+from pathlib import Path
+
+from invoicegen import stats
+from invoicegen.models import JobLine
+
+from .joblines import (
+    ErrorHandler,
+    RowError,
+    is_blank,
+    resolve_columns,
+    validate_rows,
+    warn_total_mismatch,
+)
+
+"""
+Multi-process validation of job line CSV files.
+
+The file is split into byte ranges that end on record boundaries, and every range is parsed
+and validated into JobLines by a worker process. Workers do not know how many records come
+before their range, so they number rows as if their range started right after the header;
+the parent shifts the numbers once the earlier ranges have reported their record counts.
+
+Splits are first looked for by counting quote characters, which takes one pass over the
+bytes but is fooled by a quote inside an unquoted field, such as 3/4" pipe. So every worker
+also checks that its range ends on a record boundary, and when one does not, the rest of the
+file is split again by parsing its records with the csv module. Quotes that leave two targets
+on one split, which is how an unbalanced quote shows up before the end of the file, are split
+by parsing from the start.
+"""
+
+MAX_CHUNK_BYTES = 16 * 1024 * 1024
+MIN_CHUNK_BYTES = 256 * 1024
+# Tasks per worker, so a slow chunk does not leave the other workers idle at the end
+TASKS_PER_JOB = 4
+SCAN_BLOCK_BYTES = 1024 * 1024
+QUOTE = ord('"')
+# Appended to a range by its worker: it parses as a record of its own only when the range
+# ends on a record boundary
+RANGE_END = "invoicegen:end-of-range"
+
+
+@dataclass(slots=True)
+class ValidationReport:
+    # Records after the header, blank ones included
+    rows: int = 0
+    valid: int = 0
+    lines: list[JobLine] = field(default_factory=list)
+    errors: list[RowError] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class ChunkResult:
+    records: int
+    valid: int
+    lines: list[JobLine]
+    errors: list[RowError]
+    # (source_row, raw Total, computed line total) for Totals that disagree
+    mismatches: list[tuple[int, str, Decimal | None]]
+    # False when the range ended inside a quoted field, which leaves the rest of the result empty
+    complete: bool = True
+
+
+def record_boundaries(path: str | Path, targets: list[int]) -> list[int]:
+    """
+    Find where the records containing each target byte offset end.
+
+    A newline only ends a record when it is outside a quoted field. Quotes inside a quoted
+    field are doubled, so a newline is outside quotes exactly when an even number of quote
+    characters come before it.
+
+    Parameters
+    ----------
+    path : str | Path
+        CSV file to scan.
+    targets : list[int]
+        Ascending byte offsets.
+
+    Returns
+    -------
+    list[int]
+        For each target, the offset just past the first record-ending newline at or after it,
+        or the file size when there is none.
+    """
+    boundaries: list[int] = []
+    pending = list(targets)
+    quotes_before = 0
+    offset = 0
+
+    with Path(path).open("rb") as f:
+        while pending:
+            block = f.read(SCAN_BLOCK_BYTES)
+            if not block:
+                break
+
+            while pending and pending[0] < offset + len(block):
+                start = max(pending[0] - offset, 0)
+                newline = block.find(b"\n", start)
+                while newline != -1 and (quotes_before + block.count(QUOTE, 0, newline)) % 2:
+                    newline = block.find(b"\n", newline + 1)
+
+                if newline == -1:
+                    # Keep looking in the next block
+                    pending[0] = offset + len(block)
+                    break
+
+                boundaries.append(offset + newline + 1)
+                pending.pop(0)
+
+            quotes_before += block.count(QUOTE)
+            offset += len(block)
+
+    # Targets past the last record-ending newline
+    boundaries.extend(offset for _ in pending)
+    return boundaries
+
+
+def parsed_boundaries(path: str | Path, start: int, targets: list[int]) -> list[int]:
+    """
+    Like record_boundaries, but found by parsing the records after start with csv.reader.
+
+    Slower than counting quotes, and right however the quotes are placed. start must be a
+    record boundary.
+    """
+    boundaries: list[int] = []
+    pending = list(targets)
+    offset = start
+
+    with Path(path).open("rb") as f:
+        f.seek(start)
+
+        def lines() -> Iterator[str]:
+            nonlocal offset
+            for line in f:
+                offset += len(line)
+                # csv only looks for ASCII quotes, commas and newlines, which latin-1 leaves as
+                # they are in UTF-8; csv.reader asks for a line only when it needs one
+                yield line.decode("latin-1")
+
+        try:
+            for _ in csv.reader(lines()):
+                while pending and pending[0] < offset:
+                    boundaries.append(offset)
+                    pending.pop(0)
+                if not pending:
+                    break
+        except csv.Error:
+            # Such as a line ending in a lone \r; the rest is left to one range
+            offset = os.fstat(f.fileno()).st_size
+
+    boundaries.extend(offset for _ in pending)
+    return boundaries
+
+
+def split_ranges(start: int, ends: list[int], size: int) -> list[tuple[int, int]]:
+    ends = sorted(set(ends + [size]))
+    starts = [start, *ends[:-1]]
+    return [(begin, end) for begin, end in zip(starts, ends, strict=True) if end > begin]
+
+
+def exact_ranges(path: str | Path, start: int, chunk_bytes: int) -> list[tuple[int, int]]:
+    """Byte ranges of about chunk_bytes from start to the end, split by parsing the records."""
+    size = os.path.getsize(path)
+    targets = list(range(start + chunk_bytes, size, chunk_bytes))
+    return split_ranges(start, parsed_boundaries(path, start, targets), size)
+
+
+def plan_ranges(path: str | Path, chunk_bytes: int) -> tuple[list[str], list[tuple[int, int]]]:
+    """Split a CSV into (header, byte ranges of whole records) of about chunk_bytes each."""
+    size = os.path.getsize(path)
+    header_end = parsed_boundaries(path, 0, [0])[0]
+
+    with Path(path).open("rb") as f:
+        raw_header = f.read(header_end).decode("utf-8-sig")
+    header = next(csv.reader(io.StringIO(raw_header, newline="")), None)
+    if header is None:
+        raise ValueError(f"{path} is empty, expected a header row")
+
+    targets = list(range(header_end + chunk_bytes, size, chunk_bytes))
+    ends = record_boundaries(path, targets)
+    if len(set(ends)) < len(ends):
+        # A record longer than a chunk, or a quote that leaves every later newline looking
+        # quoted; parsing tells them apart
+        ends = parsed_boundaries(path, header_end, targets)
+    return header, split_ranges(header_end, ends, size)
+
+
+def validate_range(
+    path: str | Path,
+    start: int,
+    end: int,
+    columns: dict[str, int],
+    keep_lines: bool,
+) -> ChunkResult:
+    """Worker: validate the records in [start, end), numbering the first one as row 2."""
+    with Path(path).open("rb") as f:
+        last = end >= os.fstat(f.fileno()).st_size
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8")
+
+    records = 0
+    rows = []
+    reader = csv.reader(io.StringIO(text if last else text + RANGE_END, newline=""))
+    for records, row in enumerate(reader, start=1):
+        if not is_blank(row):
+            rows.append((records + 1, row))
+
+    if not last:
+        if not rows or rows[-1][1] != [RANGE_END]:
+            return ChunkResult(records, 0, [], [], [], complete=False)
+        rows.pop()
+        records -= 1
+
+    errors: list[RowError] = []
+    mismatches: list[tuple[int, str, Decimal | None]] = []
+
+    def on_mismatch(source_row: int, raw_total: str, line_total: Decimal | None) -> None:
+        mismatches.append((source_row, raw_total, line_total))
+
+    lines = validate_rows(rows, columns, errors.append, on_mismatch)
+    return ChunkResult(records, len(lines), lines if keep_lines else [], errors, mismatches)
+
+
+def merge_result(report: ValidationReport, result: ChunkResult, on_error: ErrorHandler) -> None:
+    # The chunk numbered its first record as row 2, as if it came right after the header
+    shift = report.rows
+
+    for line in result.lines:
+        line.source_row += shift
+    for error in result.errors:
+        on_error(replace(error, source_row=error.source_row + shift))
+    for source_row, raw_total, line_total in result.mismatches:
+        warn_total_mismatch(source_row + shift, raw_total, line_total)
+
+    report.rows += result.records
+    report.valid += result.valid
+    report.lines.extend(result.lines)
+
+
+def merge_complete(
+    report: ValidationReport,
+    ranges: list[tuple[int, int]],
+    results: Iterable[ChunkResult],
+    on_error: ErrorHandler,
+) -> int | None:
+    """
+    Merge results in file order up to the first range that did not end on a record boundary.
+
+    Returns the start of that range, from where the file has to be split again, or None when
+    every range was complete.
+    """
+    for (start, _), result in zip(ranges, results, strict=False):
+        if not result.complete:
+            return start
+        merge_result(report, result, on_error)
+    return None
+
+
+def validate_file(
+    path: str | Path,
+    jobs: int = 1,
+    keep_lines: bool = True,
+    chunk_bytes: int | None = None,
+) -> ValidationReport:
+    """
+    Validate a job line CSV, spreading byte-range chunks over a pool of processes.
+
+    Parameters
+    ----------
+    path : str | Path
+        CSV file following the README contract.
+    jobs : int
+        Worker processes to use; 0 means one per CPU. With 1, or a file that fits in one
+        chunk, everything runs in this process.
+    keep_lines : bool
+        Return the validated JobLines. Without them only counts and errors come back, which
+        saves sending every line between processes.
+    chunk_bytes : int | None
+        Approximate size of the byte range handed to each task. By default the file is split
+        into a few tasks per worker, between 256 KiB and 16 MiB each.
+
+    Returns
+    -------
+    ValidationReport
+        Lines and errors ordered by source_row.
+    """
+    if jobs < 0:
+        raise ValueError(f"Jobs must be at least 0, got {jobs}")
+    if chunk_bytes is not None and chunk_bytes < 1:
+        raise ValueError(f"Chunk bytes must be at least 1, got {chunk_bytes}")
+
+    jobs = jobs or os.cpu_count() or 1
+    if chunk_bytes is None:
+        share = os.path.getsize(path) // (jobs * TASKS_PER_JOB)
+        chunk_bytes = min(max(share, MIN_CHUNK_BYTES), MAX_CHUNK_BYTES)
+
+    report = ValidationReport()
+    on_error = report.errors.append
+
+    header, ranges = plan_ranges(path, chunk_bytes)
+    columns = resolve_columns(header)
+
+    def validate_all(run: Callable[[list[tuple[int, int]]], Iterator[ChunkResult]]) -> None:
+        start = merge_complete(report, ranges, run(ranges), on_error)
+        if start is not None:
+            # A split counted from the quotes fell inside a quoted field
+            exact = exact_ranges(path, start, chunk_bytes)
+            merge_complete(report, exact, run(exact), on_error)
+
+    if jobs == 1 or len(ranges) <= 1:
+        validate_all(
+            lambda ranges: (
+                validate_range(path, start, end, columns, keep_lines) for start, end in ranges
+            )
+        )
+        return report
+
+    # Validation in the workers is not seen by this process's stats, so count it here
+    with (
+        stats.stage("validate") as stage,
+        ProcessPoolExecutor(max_workers=min(jobs, len(ranges))) as pool,
+    ):
+
+        def run_in_pool(ranges: list[tuple[int, int]]) -> Iterator[ChunkResult]:
+            futures = [
+                pool.submit(validate_range, path, start, end, columns, keep_lines)
+                for start, end in ranges
+            ]
+            # In file order so row numbers can be shifted by the records before each chunk
+            try:
+                for future in futures:
+                    yield future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+        validate_all(run_in_pool)
+        invalid = len({error.source_row for error in report.errors})
+        stage.add(items=report.valid + invalid, errors=invalid)
+
+    return report
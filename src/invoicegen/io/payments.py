@@ -0,0 +1,128 @@
+import csv
+import warnings
+from dataclasses import dataclass
+from pathlib import Path
+
+from pydantic import ValidationError
+
+from invoicegen import stats
+from invoicegen.models import Payment
+
+from .joblines import (
+    CSVWarning,
+    ErrorHandler,
+    RowError,
+    errors_from_exception,
+    is_blank,
+    raise_first_error,
+)
+
+"""
+Reader for payment CSV files, such as a bank export.
+
+Each row is one payment: a date and an amount, and what it pays for. A payment names its
+invoice number when the payer gave one; otherwise the client and project it came from are
+used to match it to open invoices, see core.payments. Rows are numbered like job line rows:
+the header is row 1 and blank lines count.
+"""
+
+# CSV header -> Payment field
+PAYMENT_COLUMNS = {"Date": "dates", "Amount": "amount", "Note": "note"}
+# CSV header -> what a payment is matched on; every one of them is optional
+MATCH_COLUMNS = {"Invoice": "invoice", "Client": "client", "Project": "project"}
+REQUIRED_COLUMNS = ["Date", "Amount"]
+
+
+@dataclass(frozen=True, slots=True)
+class PaymentRow:
+    source_row: int
+    payment: Payment
+    invoice: str | None = None
+    client: str | None = None
+    project: str | None = None
+
+
+def resolve_payment_columns(header: list[str]) -> dict[str, int]:
+    """Map each payment field and match column to its position in the CSV header."""
+    known = {**PAYMENT_COLUMNS, **MATCH_COLUMNS}
+    positions: dict[str, int] = {}
+    for index, raw_name in enumerate(header):
+        name = raw_name.strip()
+
+        if name in known:
+            positions.setdefault(known[name], index)
+        elif name:
+            warnings.warn(f"Unknown column: {name}", CSVWarning, stacklevel=2)
+
+    missing = [name for name in REQUIRED_COLUMNS if PAYMENT_COLUMNS[name] not in positions]
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+
+    return positions
+
+
+def optional_cell(row: list[str], index: int | None) -> str | None:
+    if index is None or index >= len(row):
+        return None
+    return row[index].strip() or None
+
+
+def read_payments(path: str | Path, on_error: ErrorHandler | None = None) -> list[PaymentRow]:
+    """
+    Read and validate every payment of a CSV file.
+
+    Parameters
+    ----------
+    path : str | Path
+        CSV with Date and Amount columns, and any of Invoice, Client, Project and Note.
+    on_error : ErrorHandler | None
+        Called for every invalid field. When omitted, the first invalid row raises ValueError.
+
+    Returns
+    -------
+    list[PaymentRow]
+        The valid payments, in file order.
+    """
+    handler = raise_first_error if on_error is None else on_error
+
+    payments = []
+    checked = 0
+    with (
+        stats.stage("ingest") as stage,
+        Path(path).open("r", encoding="utf-8-sig", newline="") as f,
+    ):
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            raise ValueError(f"{path} is empty, expected a header row")
+        columns = resolve_payment_columns(header)
+        fields = [(name, columns.get(name)) for name in PAYMENT_COLUMNS.values()]
+
+        for source_row, row in enumerate(reader, start=2):
+            if is_blank(row):
+                continue
+            checked += 1
+
+            data = {name: optional_cell(row, index) or "" for name, index in fields}
+            try:
+                payment = Payment.model_validate(data)
+            except ValidationError as exc:
+                for error in errors_from_exception(exc, source_row):
+                    handler(error)
+                continue
+            if payment.amount <= 0:
+                handler(RowError(source_row, "amount", "Payment amount must be more than 0"))
+                continue
+
+            payments.append(
+                PaymentRow(
+                    source_row,
+                    payment,
+                    invoice=optional_cell(row, columns.get("invoice")),
+                    client=optional_cell(row, columns.get("client")),
+                    project=optional_cell(row, columns.get("project")),
+                )
+            )
+        stage.add(items=checked, errors=checked - len(payments))
+
+    return payments
@@ -1,16 +1,39 @@
-from .header import (
-    Address,
-    BusinessInfo,
-    ClientInfo,
-    ContactInfo,
-    InvoiceHeader,
-    InvoiceMeta,
-)
-from .invoice import Invoice, Payment
-from .jobline import JobLine
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .batch import JobLineBatch, JobLineView
+    from .header import (
+        Address,
+        BusinessInfo,
+        ClientInfo,
+        ContactInfo,
+        InvoiceHeader,
+        InvoiceMeta,
+    )
+    from .invoice import Invoice, Payment
+    from .jobline import JobLine
+
+# Export -> submodule defining it. Submodules are imported on first access, so reading job
+# lines does not pay for building the header and invoice models.
+EXPORTS = {
+    "JobLine": ".jobline",
+    "JobLineBatch": ".batch",
+    "JobLineView": ".batch",
+    "Invoice": ".invoice",
+    "InvoiceHeader": ".header",
+    "Address": ".header",
+    "Payment": ".invoice",
+    "BusinessInfo": ".header",
+    "ClientInfo": ".header",
+    "InvoiceMeta": ".header",
+    "ContactInfo": ".header",
+}
 
 __all__ = [
     "JobLine",
+    "JobLineBatch",
+    "JobLineView",
     "Invoice",
     "InvoiceHeader",
     "Address",
@@ -20,3 +43,16 @@ __all__ = [
     "InvoiceMeta",
     "ContactInfo",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    module = EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,322 @@
+from array import array
+from collections.abc import Iterable, Iterator
+from datetime import date
+from decimal import Decimal
+from functools import lru_cache
+
+from .jobline import JobLine
+from .money import line_total_cents, to_cents
+from .trusted import construct, paused_gc
+
+"""
+Compact columnar storage for large numbers of job lines.
+
+A JobLine instance, with its dict, Decimals and date, takes around a kilobyte. JobLineBatch
+keeps the same fields as parallel arrays instead:
+- address, unit and description as codes into a table of distinct strings,
+- dates as proleptic Gregorian ordinals,
+- qty and rate as integers scaled by 10**scale, where the scale of each column grows to the
+  most decimal places seen so far, and line_total as integer cents, each with the exponent
+  the value had,
+- paid as a bitset,
+- source_row as a plain integer,
+which comes to about 55 bytes per line plus the distinct strings.
+
+Values come back as they went in, exponent included: Decimal("1") in a column that also
+holds Decimal("0.25") comes back as Decimal("1"), not Decimal("1.00"), so it prints the same.
+"""
+
+CENT_PLACES = 2
+INT64_MAX = 2**63 - 1
+# Exponents are kept as signed bytes
+EXPONENT_RANGE = range(-128, 128)
+# Distinct decimals and dates kept when converting back, shared between the JobLines built
+CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def unscale(value: int, scale: int, exponent: int) -> Decimal:
+    # The value had no digits past its exponent, so the division is exact
+    return Decimal(value // 10 ** (scale + exponent)).scaleb(exponent)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def from_ordinal(ordinal: int) -> date:
+    return date.fromordinal(ordinal)
+
+
+def decimal_exponent(value: Decimal) -> int:
+    exponent = value.as_tuple().exponent
+    if not isinstance(exponent, int):
+        raise ValueError(f"Cannot store {value} in a batch, expected a finite number")
+    if exponent not in EXPONENT_RANGE:
+        raise ValueError(
+            f"Cannot store {value} in a batch, its exponent must be between -128 and 127"
+        )
+    return exponent
+
+
+def decimal_places(value: Decimal) -> int:
+    return max(-decimal_exponent(value), 0)
+
+
+class StringTable:
+    """Distinct strings of a column, each stored once and referred to by its position."""
+
+    __slots__ = ("codes", "strings")
+
+    def __init__(self) -> None:
+        self.strings: list[str] = []
+        self.codes: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.strings)
+            self.strings.append(value)
+        return code
+
+
+class ScaledColumn:
+    """
+    Non-negative decimals stored as 64-bit integers sharing one power-of-ten scale.
+
+    The exponent of each value is kept next to it, so values come back as they went in.
+    """
+
+    __slots__ = ("exponents", "name", "scale", "values")
+
+    def __init__(self, name: str, scale: int = 0) -> None:
+        # Field name for error messages
+        self.name = name
+        self.scale = scale
+        self.values = array("q")
+        self.exponents = array("b")
+
+    def check(self, scaled: int, scale: int) -> None:
+        if scaled > INT64_MAX:
+            limit = Decimal(INT64_MAX).scaleb(-scale)
+            raise ValueError(
+                f"{self.name} must be at most {limit} to be stored with {scale} decimal places"
+            )
+
+    def fit(self, value: Decimal) -> int:
+        """The scale the column needs to hold value, checking every value still fits in 64 bits."""
+        scale = max(decimal_places(value), self.scale)
+        largest = int(value.scaleb(scale))
+        if scale > self.scale and self.values:
+            largest = max(largest, max(self.values) * 10 ** (scale - self.scale))
+        self.check(largest, scale)
+        return scale
+
+    def append(self, value: Decimal, scale: int | None = None) -> None:
+        """Append value at scale, as returned by fit for it, which is checked when left out."""
+        if scale is None:
+            scale = self.fit(value)
+        if scale > self.scale:
+            # Rare: only when a value has more decimal places than any before it
+            factor = 10 ** (scale - self.scale)
+            self.values = array("q", [scaled * factor for scaled in self.values])
+            self.scale = scale
+
+        self.append_scaled(int(value.scaleb(self.scale)), decimal_exponent(value))
+
+    def append_scaled(self, scaled: int, exponent: int) -> None:
+        """Append a value already at the column's scale, such as cents to a column at scale 2."""
+        self.values.append(scaled)
+        self.exponents.append(exponent)
+
+    def __getitem__(self, index: int) -> Decimal:
+        return unscale(self.values[index], self.scale, self.exponents[index])
+
+
+class JobLineView:
+    """One line of a JobLineBatch, read from the batch's arrays on access."""
+
+    __slots__ = ("batch", "index")
+
+    def __init__(self, batch: "JobLineBatch", index: int) -> None:
+        self.batch = batch
+        self.index = index
+
+    @property
+    def address(self) -> str:
+        return self.batch.addresses.strings[self.batch.address_codes[self.index]]
+
+    @property
+    def unit(self) -> str:
+        return self.batch.units.strings[self.batch.unit_codes[self.index]]
+
+    @property
+    def dates(self) -> date:
+        return from_ordinal(self.batch.ordinals[self.index])
+
+    @property
+    def description(self) -> str:
+        return self.batch.descriptions.strings[self.batch.description_codes[self.index]]
+
+    @property
+    def qty(self) -> Decimal:
+        return self.batch.qty[self.index]
+
+    @property
+    def rate(self) -> Decimal:
+        return self.batch.rate[self.index]
+
+    @property
+    def line_total(self) -> Decimal:
+        return self.batch.line_total[self.index]
+
+    @property
+    def paid(self) -> bool:
+        return self.batch.is_paid(self.index)
+
+    @property
+    def source_row(self) -> int:
+        return self.batch.source_rows[self.index]
+
+    def to_jobline(self) -> JobLine:
+        return self.batch.jobline(self.index)
+
+
+class JobLineBatch:
+    """
+    Job lines stored column by column, for holding many more lines than JobLine instances allow.
+
+    Lines are added from validated JobLines, and come back either as JobLineView rows (cheap,
+    nothing is copied) or as JobLines again.
+    """
+
+    __slots__ = (
+        "address_codes",
+        "addresses",
+        "description_codes",
+        "descriptions",
+        "line_total",
+        "ordinals",
+        "paid_bits",
+        "qty",
+        "rate",
+        "size",
+        "source_rows",
+        "unit_codes",
+        "units",
+    )
+
+    def __init__(self) -> None:
+        self.size = 0
+        self.addresses = StringTable()
+        self.units = StringTable()
+        self.descriptions = StringTable()
+        self.address_codes = array("I")
+        self.unit_codes = array("I")
+        self.description_codes = array("I")
+        self.ordinals = array("i")
+        self.qty = ScaledColumn("Quantity")
+        self.rate = ScaledColumn("Unit Price")
+        self.line_total = ScaledColumn("Total", CENT_PLACES)
+        self.paid_bits = bytearray()
+        self.source_rows = array("q")
+
+    @classmethod
+    def from_joblines(cls, lines: Iterable[JobLine]) -> "JobLineBatch":
+        """
+        Pack job lines into a new batch.
+
+        Parameters
+        ----------
+        lines : Iterable[JobLine]
+            Validated lines. Any iterable works, so a file can be packed straight from
+            io.read_joblines without holding all of its JobLines at once.
+
+        Returns
+        -------
+        JobLineBatch
+            The lines, in the order given.
+        """
+        batch = cls()
+        batch.extend(lines)
+        return batch
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[JobLineView]:
+        for index in range(self.size):
+            yield JobLineView(self, index)
+
+    def __getitem__(self, index: int) -> JobLineView:
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError(f"Line {index} is out of range for a batch of {self.size}")
+        return JobLineView(self, index)
+
+    def append(self, line: JobLine) -> None:
+        """Add one line; a value too large to store raises ValueError and changes nothing."""
+        qty_scale = self.qty.fit(line.qty)
+        rate_scale = self.rate.fit(line.rate)
+        # line_total is kept in cents, and computed the same way JobLine does when missing
+        line_total = line.line_total
+        cents = (
+            line_total_cents(line.qty, line.rate) if line_total is None else to_cents(line_total)
+        )
+        self.line_total.check(cents, CENT_PLACES)
+
+        self.address_codes.append(self.addresses.code(line.address))
+        self.unit_codes.append(self.units.code(line.unit))
+        self.description_codes.append(self.descriptions.code(line.description))
+        self.ordinals.append(line.dates.toordinal())
+        self.qty.append(line.qty, qty_scale)
+        self.rate.append(line.rate, rate_scale)
+        self.line_total.append_scaled(cents, -CENT_PLACES)
+        self.source_rows.append(line.source_row)
+
+        index = self.size
+        if index % 8 == 0:
+            self.paid_bits.append(0)
+        if line.paid:
+            self.paid_bits[index >> 3] |= 1 << (index & 7)
+        self.size += 1
+
+    def extend(self, lines: Iterable[JobLine]) -> None:
+        for line in lines:
+            self.append(line)
+
+    def total_cents(self, indices: Iterable[int] | None = None) -> int:
+        """Sum of the line totals, in cents, of the given lines or of the whole batch."""
+        values = self.line_total.values
+        if indices is None:
+            return sum(values)
+        return sum(values[index] for index in indices)
+
+    def is_paid(self, index: int) -> bool:
+        return bool(self.paid_bits[index >> 3] >> (index & 7) & 1)
+
+    def jobline(self, index: int) -> JobLine:
+        """Build the JobLine for one line; every value was validated before it was packed."""
+        return construct(
+            JobLine,
+            {
+                "address": self.addresses.strings[self.address_codes[index]],
+                "unit": self.units.strings[self.unit_codes[index]],
+                "dates": from_ordinal(self.ordinals[index]),
+                "description": self.descriptions.strings[self.description_codes[index]],
+                "qty": self.qty[index],
+                "rate": self.rate[index],
+                "line_total": self.line_total[index],
+                "paid": self.is_paid(index),
+                "source_row": self.source_rows[index],
+            },
+        )
+
+    def joblines(self, indices: Iterable[int]) -> list[JobLine]:
+        """Build JobLines for the given line positions, in that order."""
+        with paused_gc():
+            return [self.jobline(index) for index in indices]
+
+    def to_joblines(self) -> list[JobLine]:
+        return self.joblines(range(self.size))
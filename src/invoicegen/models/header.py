@@ -1,9 +1,10 @@
-import re
-from datetime import date, datetime, timedelta
+from datetime import date, timedelta
 from typing import Any
 
 from pydantic import BaseModel, ValidationInfo, field_validator, model_validator
 
+from .parsing import parse_date
+
 """
 Need to create stronger validation for multiple fields, just checking for precense now.
 """
@@ -181,19 +182,7 @@ class InvoiceMeta(BaseModel):
                 f"Start date must be a string in MM/DD/YYYY format, got {type(value).__name__}"
             )
 
-        value = value.strip()
-
-        # Check expected fromat
-        if not re.fullmatch(r"\d{1,2}/\d{1,2}/\d{4}", value):
-            raise ValueError(f"Invalid date format '{value}' (expected MM/DD/YYYY)")
-
-        # Parse to real date object
-        try:
-            parsed = datetime.strptime(value, "%m/%d/%Y").date()
-        except ValueError:
-            raise ValueError(f"Invalid calendar date '{value}' (MM/DD/YYYY)") from None
-
-        return parsed
+        return parse_date(value.strip())
 
     @field_validator("due_date", mode="before")
     def validate_due_date(cls: Any, value: Any) -> Any:
@@ -206,19 +195,7 @@ class InvoiceMeta(BaseModel):
                 f"Due date must be a string in MM/DD/YYYY format, got {type(value).__name__}"
             )
 
-        value = value.strip()
-
-        # Check expected fromat
-        if not re.fullmatch(r"\d{1,2}/\d{1,2}/\d{4}", value):
-            raise ValueError(f"Invalid date format '{value}' (expected MM/DD/YYYY)")
-
-        # Parse to real date object
-        try:
-            parsed = datetime.strptime(value, "%m/%d/%Y").date()
-        except ValueError:
-            raise ValueError(f"Invalid calendar date '{value}' (MM/DD/YYYY)") from None
-
-        return parsed
+        return parse_date(value.strip())
 
     @field_validator("terms", mode="before")
     def ensure_optional_str(cls: Any, value: str, info: ValidationInfo) -> Any:
@@ -263,3 +240,30 @@ class InvoiceHeader(BaseModel):
     business: BusinessInfo
     client: ClientInfo
     meta: InvoiceMeta
+
+    def for_invoice(self, number: str, project_name: str | None) -> "InvoiceHeader":
+        """
+        Copy of this header for one invoice, with its own number and project name.
+
+        Only the header, its meta and its client are copied; BusinessInfo, the client's
+        Address and ContactInfo are shared with this header. Shared parts must be treated as
+        read-only, which lets headers be built from the same template in several threads.
+
+        Parameters
+        ----------
+        number : str
+            Invoice number for meta.number.
+        project_name : str | None
+            Project name for client.project_name.
+
+        Returns
+        -------
+        InvoiceHeader
+            A new header; this one is left unchanged.
+        """
+        return self.model_copy(
+            update={
+                "meta": self.meta.model_copy(update={"number": number}),
+                "client": self.client.model_copy(update={"project_name": project_name}),
+            }
+        )
@@ -1,5 +1,4 @@
-import re
-from datetime import date, datetime
+from datetime import date
 from decimal import ROUND_HALF_UP, Decimal
 from typing import Any
 
@@ -7,8 +6,12 @@ from pydantic import BaseModel, ValidationInfo, field_validator, model_validator
 
 from .header import InvoiceHeader
 from .jobline import JobLine
+from .money import ZERO, apply_rate, from_cents, sum_cents, to_cents
+from .parsing import parse_date, parse_decimal
+from .trusted import construct
 
 TWO = Decimal("0.01")
+PERCENT = Decimal("100")
 
 
 def q2(x: Decimal) -> Decimal:
@@ -28,57 +31,11 @@ class Payment(BaseModel):
                 f"Dates must be a string in MM/DD/YYYY format, got {type(value).__name__}"
             )
 
-        value = value.strip()
-
-        # Check expected fromat
-        if not re.fullmatch(r"\d{1,2}/\d{1,2}/\d{4}", value):
-            raise ValueError(f"Invalid date format '{value}' (expected MM/DD/YYYY)")
-
-        # Parse to real date object
-        try:
-            parsed = datetime.strptime(value, "%m/%d/%Y").date()
-        except ValueError:
-            raise ValueError(f"Invalid calendar date '{value}' (MM/DD/YYYY)") from None
-
-        return parsed
+        return parse_date(value.strip())
 
     @field_validator("amount", mode="before")
     def validate_decimals(cls: Any, value: Any) -> Decimal:
-        # We do not want any floats for precision
-        if isinstance(value, float):
-            raise ValueError(
-                "Payment amount must not be a float, please use string, decimal, or int"
-            )
-
-        # Make sure input is a string, integer, or decimal
-        if not isinstance(value, (str, int, Decimal)):
-            raise ValueError(
-                f"Payment amount must be a string, int, or decimal, got {type(value).__name__}"
-            )
-
-        # If the instance is a string, then prepare it to be converted to Decimal
-        if isinstance(value, str):
-            # Remove empty space, commas, and dollar signs
-            value = value.strip().replace("$", "").replace(",", "")
-
-            # If after removing non number characters, the string is empty
-            if not len(value):
-                raise ValueError("Payment amount is empty after removing symbols; provide a number")
-
-            # Make sure pattern is a decimal number
-            if not re.fullmatch(r"^[0-9]+(\.[0-9]+)?$", value):
-                raise ValueError("Payment amount must be digits.decimals (e.g. 1.5, 65)")
-
-        # Since now should only have values that can be converted to Decimals, convert it
-        dec = q2(Decimal(value))
-
-        # We only allow decimals that are finite and at least 0
-        if not dec.is_finite():
-            raise ValueError("Payment amount must be a finite number")
-        if dec < 0:
-            raise ValueError(f"Payment amount must be at least 0: got {dec}")
-
-        return dec
+        return q2(parse_decimal(value, "Payment amount"))
 
     @field_validator("note", mode="before")
     def ensure_optional_str(cls: Any, value: str, info: ValidationInfo) -> Any:
@@ -127,11 +84,10 @@ class Invoice(BaseModel):
         if not isinstance(value, Decimal):
             raise ValueError("Tax rate should be a decimal number between 0 and 100")
 
-        max_percent = Decimal("100")
-        if not (0 <= value <= max_percent):
+        if not (0 <= value <= PERCENT):
             raise ValueError("Tax rate should be between 0 and 100")
 
-        return value / max_percent
+        return value / PERCENT
 
     @field_validator("payments", mode="before")
     def verify_payments_exist(cls: Any, value: list, info: ValidationInfo) -> Any:
@@ -147,19 +103,118 @@ class Invoice(BaseModel):
 
     @model_validator(mode="after")
     def compute_values(self: Any) -> Any:
-        sub = Decimal(0)
-        paid = Decimal(0)
-        for line in self.lines:
-            sub += line.line_total
+        return self.recompute_totals()
+
+    def recompute_totals(self) -> "Invoice":
+        # Totals are worked out in integer cents, see models.money
+        # line_total is always set once a JobLine has been built
+        subtotal = sum_cents(line.line_total or ZERO for line in self.lines)
+        amount_paid = sum_cents(payment.amount for payment in self.payments or [])
+        return self.set_totals(subtotal, amount_paid)
+
+    def set_totals(self, subtotal: int, amount_paid: int) -> "Invoice":
+        # Every total from the subtotal and payments in cents; tax is due on the subtotal as a
+        # whole, so it is worked out again rather than adjusted
+        tax_total = apply_rate(subtotal, self.tax_rate or ZERO)
+        total = subtotal + tax_total
+
+        self.amount_paid = from_cents(amount_paid)
+        self.subtotal = from_cents(subtotal)
+        self.tax_total = from_cents(tax_total)
+        self.total = from_cents(total)
+        self.balance_due = from_cents(total - amount_paid)
 
-        if self.payments:
-            for payment in self.payments:
-                paid += payment.amount
+        return self
 
-        self.amount_paid = q2(paid)
-        self.subtotal = q2(sub)
-        self.tax_total = q2(self.subtotal * (self.tax_rate if self.tax_rate else 0))
-        self.total = self.subtotal + self.tax_total
-        self.balance_due = self.total - self.amount_paid
+    def adjust_totals(self, line_cents: int = 0, paid_cents: int = 0) -> "Invoice":
+        # The totals after adding cents to the subtotal or amount paid, without walking the
+        # lines and payments. Line totals and payment amounts have two places once validated,
+        # so adding their cents gives what recompute_totals would.
+        if self.subtotal is None or self.amount_paid is None:
+            return self.recompute_totals()
+        return self.set_totals(
+            to_cents(self.subtotal) + line_cents, to_cents(self.amount_paid) + paid_cents
+        )
+
+    def add_line(self, line: JobLine) -> None:
+        """Append a validated job line and update the totals in constant time."""
+        self.lines.append(line)
+        self.adjust_totals(line_cents=to_cents(line.line_total or ZERO))
+
+    def remove_line(self, position: int = -1) -> JobLine:
+        """
+        Remove a job line and update the totals in constant time.
+
+        Parameters
+        ----------
+        position : int
+            Index of the line in lines; the last line by default, which is also the cheapest
+            to remove from the list.
+
+        Returns
+        -------
+        JobLine
+            The line removed.
+        """
+        if len(self.lines) == 1:
+            raise ValueError("Cannot remove the only job line, an invoice needs at least one")
+        line = self.lines.pop(position)
+        self.adjust_totals(line_cents=-to_cents(line.line_total or ZERO))
+        return line
+
+    def add_payment(self, payment: Payment) -> None:
+        """Record a validated payment and update amount_paid and balance_due in constant time."""
+        if self.payments is None:
+            self.payments = []
+        self.payments.append(payment)
+        self.adjust_totals(paid_cents=to_cents(payment.amount))
+
+    @classmethod
+    def from_trusted(
+        cls,
+        header: InvoiceHeader,
+        lines: list[JobLine],
+        currency: str = "USD$",
+        tax_rate: Decimal = Decimal("0"),
+        payments: list[Payment] | None = None,
+    ) -> "Invoice":
+        """
+        Build an Invoice from validated parts without validating them again.
+
+        Parameters
+        ----------
+        header : InvoiceHeader
+            Validated header, used as is.
+        lines : list[JobLine]
+            Validated job lines, used as is. Must not be empty.
+        currency : str
+            Currency label.
+        tax_rate : Decimal
+            Tax rate as given to the constructor, which scales it by 1/100.
+        payments : list[Payment] | None
+            Validated payments.
+
+        Returns
+        -------
+        Invoice
+            Equal to Invoice(...) with the same arguments, totals included.
+        """
+        if not lines:
+            raise ValueError("Job Lines are empty, must include at least one line")
 
-        return self
+        invoice = construct(
+            cls,
+            {
+                "header": header,
+                "lines": lines,
+                "currency": currency,
+                "tax_rate": tax_rate / PERCENT,
+                "payments": payments or None,
+                "subtotal": None,
+                "tax_total": None,
+                "total": None,
+                "amount_paid": None,
+                "balance_due": None,
+            },
+        )
+        return invoice.recompute_totals()
@@ -1,10 +1,19 @@
-import re
-from datetime import date, datetime
+from datetime import date
 from decimal import ROUND_HALF_UP, Decimal
 from typing import Any
 
 from pydantic import BaseModel, ValidationInfo, field_validator, model_validator
 
+from .parsing import parse_date, parse_decimal
+from .trusted import construct
+
+CENT = Decimal("0.01")
+
+
+def round_line_total(qty: Decimal, rate: Decimal) -> Decimal:
+    # Calculate line total and round up to the nearest hundredth
+    return (qty * rate).quantize(CENT, rounding=ROUND_HALF_UP)
+
 
 class JobLine(BaseModel):
     address: str
@@ -60,61 +69,11 @@ class JobLine(BaseModel):
                 f"Dates must be a string in MM/DD/YYYY format, got {type(value).__name__}"
             )
 
-        value = value.strip()
-
-        # Check expected fromat
-        if not re.fullmatch(r"\d{1,2}/\d{1,2}/\d{4}", value):
-            raise ValueError(f"Invalid date format '{value}' (expected MM/DD/YYYY)")
-
-        # Parse to real date object
-        try:
-            parsed = datetime.strptime(value, "%m/%d/%Y").date()
-        except ValueError:
-            raise ValueError(f"Invalid calendar date '{value}' (MM/DD/YYYY)") from None
-
-        return parsed
+        return parse_date(value.strip())
 
     @field_validator("qty", "rate", mode="before")
     def validate_decimals(cls: Any, value: Any, info: ValidationInfo) -> Decimal:
-        # We do not want any floats for precision
-        if isinstance(value, float):
-            raise ValueError(
-                f"{str(info.field_name).capitalize()} must not be a float, please use string, decimal, or int"
-            )
-
-        # Make sure input is a string, integer, or decimal
-        if not isinstance(value, (str, int, Decimal)):
-            raise ValueError(
-                f"{str(info.field_name).capitalize()} must be a string, int, or decimal, got {type(value).__name__}"
-            )
-
-        # If the instance is a string, then prepare it to be converted to Decimal
-        if isinstance(value, str):
-            # Remove empty space, commas, and dollar signs
-            value = value.strip().replace("$", "").replace(",", "")
-
-            # If after removing non number characters, the string is empty
-            if not len(value):
-                raise ValueError(
-                    f"{str(info.field_name).capitalize()} is empty after removing symbols; provide a number"
-                )
-
-            # Make sure pattern is a decimal number
-            if not re.fullmatch(r"^[0-9]+(\.[0-9]+)?$", value):
-                raise ValueError(
-                    f"{str(info.field_name).capitalize()} must be digits.decimals (e.g. 1.5, 65)"
-                )
-
-        # Since now should only have values that can be converted to Decimals, convert it
-        dec = Decimal(value)
-
-        # We only allow decimals that are finite and at least 0
-        if not dec.is_finite():
-            raise ValueError(f"{str(info.field_name).capitalize()} must be a finite number")
-        if dec < 0:
-            raise ValueError(f"{str(info.field_name).capitalize()} must be at least 0: got {dec}")
-
-        return dec
+        return parse_decimal(value, str(info.field_name).capitalize())
 
     @field_validator("paid", mode="before")
     def validate_paid(cls: Any, value: Any) -> bool:
@@ -143,7 +102,40 @@ class JobLine(BaseModel):
 
     @model_validator(mode="after")
     def compute_line_total(self: Any) -> Any:
-        # Calculate line total and round up to the nearest hundredth
-        raw = self.qty * self.rate
-        self.line_total = raw.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+        self.line_total = round_line_total(self.qty, self.rate)
         return self
+
+    @classmethod
+    def from_trusted(cls, values: dict[str, Any]) -> "JobLine":
+        """
+        Build a JobLine from values that were already validated, skipping every validator.
+
+        Parameters
+        ----------
+        values : dict[str, Any]
+            Every field in its validated form (str, date, Decimal, bool, int). line_total is
+            computed from qty and rate when it is not given.
+
+        Returns
+        -------
+        JobLine
+            Equal to the JobLine validation would have produced from the same data.
+        """
+        line_total = values.get("line_total")
+        if line_total is None:
+            line_total = round_line_total(values["qty"], values["rate"])
+
+        return construct(
+            cls,
+            {
+                "address": values["address"],
+                "unit": values["unit"],
+                "dates": values["dates"],
+                "description": values["description"],
+                "qty": values["qty"],
+                "rate": values["rate"],
+                "line_total": line_total,
+                "paid": values.get("paid", False),
+                "source_row": values["source_row"],
+            },
+        )
@@ -0,0 +1,63 @@
+from collections.abc import Iterable
+from decimal import Decimal
+
+"""
+Fixed-point money arithmetic in integer cents.
+
+Amounts are exact rationals, so every rounding here is done once, on exact integers, half
+away from zero: the same result Decimal.quantize(Decimal("0.01"), ROUND_HALF_UP) gives for
+any product Decimal can hold exactly (fewer than 28 significant digits), which covers every
+realistic quantity, rate and tax rate.
+
+Converting a Decimal to integers costs about as much as one Decimal multiply, so the wins
+come from keeping amounts as cents: sums, tax and balances over integers, and columns of
+cents such as JobLineBatch.line_total that never become Decimals at all.
+"""
+
+CENTS_PER_UNIT = 100
+ZERO = Decimal(0)
+
+
+def round_half_up(numerator: int, denominator: int) -> int:
+    """Divide and round to the nearest integer, ties away from zero (denominator > 0)."""
+    quotient, remainder = divmod(abs(numerator), denominator)
+    if 2 * remainder >= denominator:
+        quotient += 1
+    return quotient if numerator >= 0 else -quotient
+
+
+def to_cents(value: Decimal) -> int:
+    """Round an amount to whole cents, like q2, and return them as an integer."""
+    numerator, denominator = value.as_integer_ratio()
+    return round_half_up(numerator * CENTS_PER_UNIT, denominator)
+
+
+def from_cents(cents: int) -> Decimal:
+    """The Decimal with two places for a number of cents, e.g. 12000 -> Decimal("120.00")."""
+    return Decimal(cents).scaleb(-2)
+
+
+def line_total_cents(qty: Decimal, rate: Decimal) -> int:
+    """qty * rate in cents, rounded once like JobLine's line_total."""
+    qty_numerator, qty_denominator = qty.as_integer_ratio()
+    rate_numerator, rate_denominator = rate.as_integer_ratio()
+    return round_half_up(
+        qty_numerator * rate_numerator * CENTS_PER_UNIT, qty_denominator * rate_denominator
+    )
+
+
+def apply_rate(cents: int, rate: Decimal) -> int:
+    """cents * rate rounded to whole cents, e.g. the tax on a subtotal."""
+    numerator, denominator = rate.as_integer_ratio()
+    return round_half_up(cents * numerator, denominator)
+
+
+def sum_cents(values: Iterable[Decimal]) -> int:
+    """
+    Add amounts and round the sum to cents once, as Invoice always has.
+
+    Rounding each amount first could give a different total when they have more than two
+    places. Decimal addition of amounts that already have two places is exact and runs in C,
+    so it is only converted at the end.
+    """
+    return to_cents(sum(values, ZERO))
@@ -0,0 +1,119 @@
+import re
+from datetime import date
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any
+
+"""
+Parsers shared by the model validators.
+
+Exports repeat the same dates, rates and quantities on thousands of rows, so the text -> value
+conversions are cached. Only successful parses are cached (lru_cache does not store
+exceptions), and the cached values are immutable, so handing the same object to many models
+is safe.
+
+The error messages are the ones the models have always reported; callers add their own
+type checks and field labels around them.
+"""
+
+DECIMAL_PATTERN = re.compile(r"[0-9]+(\.[0-9]+)?")
+
+# Distinct values kept per cache: a few years of dates, and the usual rates and quantities
+CACHE_SIZE = 4096
+
+DATE_PARTS = 3
+MAX_DAY_DIGITS = 2
+YEAR_DIGITS = 4
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_date(value: str) -> date:
+    """
+    Parse a stripped MM/DD/YYYY string into a date.
+
+    Same rules as re.fullmatch(r"\\d{1,2}/\\d{1,2}/\\d{4}") followed by
+    datetime.strptime(value, "%m/%d/%Y"), without the cost of either.
+
+    Parameters
+    ----------
+    value : str
+        Date text with surrounding whitespace already removed.
+
+    Returns
+    -------
+    date
+        The calendar date.
+    """
+    parts = value.split("/")
+
+    # \d matches any Unicode decimal digit, which is what str.isdecimal checks
+    if not (
+        len(parts) == DATE_PARTS
+        and 1 <= len(parts[0]) <= MAX_DAY_DIGITS
+        and 1 <= len(parts[1]) <= MAX_DAY_DIGITS
+        and len(parts[2]) == YEAR_DIGITS
+        and value.replace("/", "").isdecimal()
+    ):
+        raise ValueError(f"Invalid date format '{value}' (expected MM/DD/YYYY)")
+
+    # strptime reads %Y as \d{4}, which takes any decimal digit, but %m and %d as ASCII
+    # ranges, apart from the second digit of days 10 to 29 ([12]\d)
+    month, day, year = parts
+    if month.isascii() and (day.isascii() or day[0] in "12"):
+        try:
+            return date(int(year), int(month), int(day))
+        except ValueError:
+            pass
+
+    raise ValueError(f"Invalid calendar date '{value}' (MM/DD/YYYY)")
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_decimal_text(value: str, label: str) -> Decimal:
+    # Remove empty space, commas, and dollar signs
+    cleaned = value.strip().replace("$", "").replace(",", "")
+
+    # If after removing non number characters, the string is empty
+    if not cleaned:
+        raise ValueError(f"{label} is empty after removing symbols; provide a number")
+
+    # Make sure pattern is a decimal number
+    if not DECIMAL_PATTERN.fullmatch(cleaned):
+        raise ValueError(f"{label} must be digits.decimals (e.g. 1.5, 65)")
+
+    return Decimal(cleaned)
+
+
+def parse_decimal(value: Any, label: str) -> Decimal:
+    """
+    Convert an amount given as text, int or Decimal into a finite, non-negative Decimal.
+
+    Parameters
+    ----------
+    value : Any
+        Raw input. Text may contain "$", commas and surrounding whitespace.
+    label : str
+        How the field is named in error messages, e.g. "Qty" or "Payment amount".
+
+    Returns
+    -------
+    Decimal
+        The amount, with the precision it was given in.
+    """
+    # We do not want any floats for precision
+    if isinstance(value, float):
+        raise ValueError(f"{label} must not be a float, please use string, decimal, or int")
+
+    # Make sure input is a string, integer, or decimal
+    if not isinstance(value, (str, int, Decimal)):
+        raise ValueError(f"{label} must be a string, int, or decimal, got {type(value).__name__}")
+
+    dec = parse_decimal_text(value, label) if isinstance(value, str) else Decimal(value)
+
+    # We only allow decimals that are finite and at least 0
+    if not dec.is_finite():
+        raise ValueError(f"{label} must be a finite number")
+    if dec < 0:
+        raise ValueError(f"{label} must be at least 0: got {dec}")
+
+    return dec
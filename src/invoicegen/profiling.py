@@ -0,0 +1,265 @@
+import cProfile
+import pstats
+import sys
+import tracemalloc
+from collections import defaultdict
+from collections.abc import Callable
+from pathlib import Path
+from typing import Literal
+
+from invoicegen import stats
+
+"""
+CPU and memory profiling of a CLI run, with the standard library only.
+
+"cpu" runs the command under cProfile and writes the raw profile as a .prof file, which
+pstats, snakeviz and similar tools read. "mem" runs it under tracemalloc and writes a text
+report of where memory was allocated, taken at the highest point of the run.
+
+Both break the results down by the package's own modules (models.jobline, models.invoice,
+core.grouping, ...). Time and memory spent in the standard library or in dependencies are
+charged to the package module that called into them, so pydantic validating a JobLine counts
+towards models.jobline; what no package module led to is listed as (other).
+
+Tracing allocations with enough frames for that slows a run down several times (rendering
+the most), so "mem" is for finding where memory goes rather than for timing.
+"""
+
+ProfileKind = Literal["cpu", "mem"]
+PACKAGE_DIR = Path(stats.__file__).parent
+OTHER = "(other)"
+DEFAULT_TOP = 25
+# Frames kept per allocation, enough to get from pydantic, Jinja2 or the stdlib back to the
+# package. Every frame makes each allocation slower, and rendering allocates a lot.
+TRACE_FRAMES = 8
+# A new memory snapshot is only taken once traced memory grew this much past the last one
+SNAPSHOT_GROWTH = 1.25
+MIB = 1024**2
+
+# (file, line, function), the key pstats uses
+FunctionKey = tuple[str, int, str]
+
+
+def package_module(filename: str) -> str | None:
+    """Dotted module name inside the package, e.g. models.jobline, or None for other files."""
+    try:
+        relative = Path(filename).resolve().relative_to(PACKAGE_DIR)
+    except ValueError:
+        return None
+    parts = list(relative.with_suffix("").parts)
+    if parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts) or PACKAGE_DIR.name
+
+
+class ModuleResolver:
+    # Resolving paths is slow, and profiles see the same few files over and over
+    def __init__(self) -> None:
+        self.modules: dict[str, str | None] = {}
+
+    def __call__(self, filename: str) -> str | None:
+        if filename not in self.modules:
+            self.modules[filename] = package_module(filename)
+        return self.modules[filename]
+
+
+def share_table(rows: list[tuple[str, float]], total: float, unit: str) -> list[str]:
+    lines = []
+    for name, value in rows:
+        share = value / total * 100 if total else 0.0
+        lines.append(f"  {name:<32}{value:>12.3f} {unit}{share:>7.1f}%")
+    return lines
+
+
+def cpu_breakdown(profile: pstats.Stats, top: int = DEFAULT_TOP) -> str:
+    """
+    Seconds per package module, and the slowest package functions.
+
+    Parameters
+    ----------
+    profile : pstats.Stats
+        Profile of the run.
+    top : int
+        Package functions listed, by cumulative time.
+
+    Returns
+    -------
+    str
+        Report text.
+    """
+    # pstats keeps, per function: (primitive calls, calls, own time, cumulative time, callers)
+    entries: dict[FunctionKey, tuple[int, int, float, float, dict[FunctionKey, tuple]]]
+    entries = profile.stats  # type: ignore[attr-defined]
+    resolve = ModuleResolver()
+    owners: dict[FunctionKey, dict[str, float]] = {}
+
+    def owner(key: FunctionKey, visiting: frozenset[FunctionKey]) -> dict[str, float]:
+        # Which package modules a function ran on behalf of, split by how much each caller
+        # accounted for of its cumulative time
+        if key in owners:
+            return owners[key]
+        module = resolve(key[0])
+        if module is not None:
+            return {module: 1.0}
+
+        callers = {
+            caller: edge[3] for caller, edge in entries[key][4].items() if caller not in visiting
+        }
+        weight = sum(callers.values())
+        shares: dict[str, float] = defaultdict(float)
+        if not callers or not weight:
+            shares[OTHER] = 1.0
+        else:
+            for caller, caller_time in callers.items():
+                for name, share in owner(caller, visiting | {key}).items():
+                    shares[name] += share * caller_time / weight
+        owners[key] = dict(shares)
+        return owners[key]
+
+    seconds: dict[str, float] = defaultdict(float)
+    for key, (_, _, own_time, _, _) in entries.items():
+        for name, share in owner(key, frozenset()).items():
+            seconds[name] += own_time * share
+
+    total = sum(seconds.values())
+    lines = [f"CPU time by module ({total:.3f}s)"]
+    lines += share_table(sorted(seconds.items(), key=lambda item: -item[1]), total, "s")
+
+    functions = sorted(
+        (
+            (cumulative, calls, key)
+            for key, (_, calls, _, cumulative, _) in entries.items()
+            if resolve(key[0]) is not None
+        ),
+        reverse=True,
+    )[:top]
+    lines.append(f"Top {len(functions)} package functions by cumulative time")
+    for cumulative, calls, (filename, lineno, function) in functions:
+        where = f"{resolve(filename)}:{lineno} {function}"
+        lines.append(f"  {where:<56}{cumulative:>10.3f}s {calls:>10} calls")
+    return "\n".join(lines)
+
+
+class PeakSnapshot:
+    """Keeps a tracemalloc snapshot from when traced memory was at its highest so far."""
+
+    def __init__(self) -> None:
+        self.snapshot: tracemalloc.Snapshot | None = None
+        self.size = 0
+
+    def __call__(self) -> None:
+        current, _ = tracemalloc.get_traced_memory()
+        if current > self.size * SNAPSHOT_GROWTH:
+            self.snapshot = tracemalloc.take_snapshot()
+            self.size = current
+
+
+def memory_breakdown(snapshot: tracemalloc.Snapshot, peak: int, top: int = DEFAULT_TOP) -> str:
+    """
+    Allocated memory per package module, and the package lines that allocated the most.
+
+    Parameters
+    ----------
+    snapshot : tracemalloc.Snapshot
+        Snapshot taken near the peak, with enough frames per trace to reach the package.
+    peak : int
+        Peak traced bytes of the run.
+    top : int
+        Package lines listed, by size.
+
+    Returns
+    -------
+    str
+        Report text.
+    """
+    resolve = ModuleResolver()
+    by_module: dict[str, int] = defaultdict(int)
+    by_line: dict[tuple[str, int], list[int]] = defaultdict(lambda: [0, 0])
+
+    for trace in snapshot.traces:
+        # Frames go from the oldest call to the allocation, so look from the end
+        site = None
+        for frame in reversed(trace.traceback):
+            module = resolve(frame.filename)
+            if module is not None:
+                site = (module, frame.lineno)
+                break
+        by_module[site[0] if site else OTHER] += trace.size
+        if site is not None:
+            by_line[site][0] += trace.size
+            by_line[site][1] += 1
+
+    total = sum(by_module.values())
+    lines = [
+        f"Peak traced memory {peak / MIB:.1f} MiB; snapshot near the peak holds "
+        f"{total / MIB:.1f} MiB",
+        "Memory by module",
+    ]
+    rows = [(name, size / MIB) for name, size in by_module.items()]
+    lines += share_table(sorted(rows, key=lambda item: -item[1]), total / MIB, "MiB")
+
+    sites = sorted(by_line.items(), key=lambda item: -item[1][0])[:top]
+    lines.append(f"Top {len(sites)} package lines by allocated memory")
+    for (module, lineno), (size, count) in sites:
+        where = f"{module}:{lineno}"
+        lines.append(f"  {where:<40}{size / MIB:>12.3f} MiB {count:>10} blocks")
+    return "\n".join(lines)
+
+
+def profile_run(
+    kind: ProfileKind,
+    run: Callable[[], int],
+    base: Path,
+    top: int = DEFAULT_TOP,
+) -> int:
+    """
+    Run a command under the profiler and write its results.
+
+    Parameters
+    ----------
+    kind : ProfileKind
+        "cpu" for cProfile, "mem" for tracemalloc.
+    run : Callable[[], int]
+        The command; its return code is passed through.
+    base : Path
+        Output path without suffix: cpu writes <base>.prof, mem writes <base>-mem.txt.
+    top : int
+        Functions or lines listed in the report.
+
+    Returns
+    -------
+    int
+        The command's return code.
+    """
+    base.parent.mkdir(parents=True, exist_ok=True)
+
+    if kind == "cpu":
+        profiler = cProfile.Profile()
+        try:
+            code = profiler.runcall(run)
+        finally:
+            path = base.with_name(f"{base.name}.prof")
+            profiler.dump_stats(path)
+        report = cpu_breakdown(pstats.Stats(profiler), top)
+    else:
+        # The stage listener takes the snapshots, so stages have to be collected
+        collector = stats.active() or stats.enable()
+        peak_snapshot = PeakSnapshot()
+        collector.listener = peak_snapshot
+        tracemalloc.start(TRACE_FRAMES)
+        try:
+            code = run()
+            peak_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            collector.listener = None
+
+        path = base.with_name(f"{base.name}-mem.txt")
+        assert peak_snapshot.snapshot is not None
+        report = memory_breakdown(peak_snapshot.snapshot, peak, top)
+        path.write_text(report + "\n", encoding="utf-8")
+
+    print(report, file=sys.stderr)
+    print(f"[invoicegen] profile: {kind} -> {path}", file=sys.stderr)
+    return code
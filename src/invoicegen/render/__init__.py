@@ -0,0 +1,34 @@
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .html import HTMLRenderer, RenderTimings
+    from .pdf import PDFReport, render_pdfs
+
+# Export -> submodule defining it, imported on first access so Jinja2 only loads when used
+EXPORTS = {
+    "HTMLRenderer": ".html",
+    "PDFReport": ".pdf",
+    "RenderTimings": ".html",
+    "render_pdfs": ".pdf",
+}
+
+__all__ = [
+    "HTMLRenderer",
+    "PDFReport",
+    "RenderTimings",
+    "render_pdfs",
+]
+
+
+def __getattr__(name: str) -> Any:
+    module = EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
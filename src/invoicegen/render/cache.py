@@ -0,0 +1,246 @@
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import time
+from collections.abc import Callable
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Any
+
+from invoicegen import stats
+from invoicegen.models import Invoice
+
+from .html import TEMPLATE_DIR, default_cache_dir, money, output_name, us_date
+from .pdf import PDFReport
+
+"""
+Content-addressed cache of rendered PDFs.
+
+A PDF is stored under a SHA-256 of what the template prints of the Invoice (the header, each
+line's fields and the totals, formatted as printed) and a fingerprint of everything else that
+shapes the output: the template files, the logo and the WeasyPrint version. What is not
+printed, such as the source_row of each line, is left out, so inserting a CSV row does not
+change the keys of the invoices after it. When nothing in that key changed since a previous
+run, the PDF is hard-linked (or copied, across file systems) from the cache instead of
+rendered.
+
+Entries are evicted least recently used first once the cache grows past its size limit; a
+hit refreshes the entry's modification time, which is what eviction orders by.
+"""
+
+DEFAULT_MAX_BYTES = 2 * 1024**3
+HASH_BLOCK_BYTES = 1024 * 1024
+
+RenderFunction = Callable[[list[Invoice], Path], PDFReport]
+
+
+def default_pdf_cache_dir() -> Path:
+    return default_cache_dir().parent / "pdf"
+
+
+def update_with_file(digest: "hashlib._Hash", path: Path) -> None:
+    with path.open("rb") as f:
+        while block := f.read(HASH_BLOCK_BYTES):
+            digest.update(block)
+
+
+def render_fingerprint(template_dir: str | Path | None = None, logo: Path | None = None) -> str:
+    """
+    Hash of everything besides the invoice that affects a rendered PDF.
+
+    Parameters
+    ----------
+    template_dir : str | Path | None
+        Template directory; every file in it is included. The packaged templates by default.
+    logo : Path | None
+        Business logo file.
+
+    Returns
+    -------
+    str
+        Hex digest that changes whenever a template, the stylesheet, the logo or the
+        WeasyPrint version does.
+    """
+    digest = hashlib.sha256()
+    base = Path(template_dir or TEMPLATE_DIR)
+    for path in sorted(path for path in base.rglob("*") if path.is_file()):
+        digest.update(path.relative_to(base).as_posix().encode())
+        update_with_file(digest, path)
+
+    if logo is not None:
+        digest.update(b"logo")
+        update_with_file(digest, logo)
+
+    with contextlib.suppress(PackageNotFoundError):
+        digest.update(f"weasyprint {version('weasyprint')}".encode())
+    return digest.hexdigest()
+
+
+def printed_fields(invoice: Invoice) -> dict[str, Any]:
+    """What templates/invoice.html shows of an invoice, as it shows it; keep the two in step."""
+    currency = invoice.currency
+    return {
+        "header": invoice.header.model_dump(mode="json"),
+        "lines": [
+            [
+                us_date(line.dates),
+                line.unit,
+                line.description,
+                line.paid,
+                str(line.qty),
+                money(line.rate, currency),
+                money(line.line_total, currency),
+            ]
+            for line in invoice.lines
+        ],
+        "payments": [
+            [us_date(payment.dates), payment.note, money(payment.amount, currency)]
+            for payment in invoice.payments or []
+        ],
+        "totals": [
+            money(value, currency)
+            for value in [invoice.subtotal, invoice.tax_total, invoice.total, invoice.balance_due]
+        ],
+    }
+
+
+def place(source: Path, target: Path) -> None:
+    # Replace target with a hard link to source, or a copy when linking is not possible
+    target.unlink(missing_ok=True)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+class RenderCache:
+    """
+    Rendered PDFs stored by content hash.
+
+    Parameters
+    ----------
+    directory : str | Path
+        Where entries are kept, created when missing.
+    fingerprint : str
+        See render_fingerprint; part of every key.
+    max_bytes : int
+        Size the cache is trimmed back to after new entries are stored.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        fingerprint: str,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.fingerprint = fingerprint
+        self.max_bytes = max_bytes
+
+    def key(self, invoice: Invoice) -> str:
+        digest = hashlib.sha256(self.fingerprint.encode())
+        digest.update(json.dumps(printed_fields(invoice)).encode())
+        return digest.hexdigest()
+
+    def entry(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.pdf"
+
+    def restore(self, key: str, target: Path) -> bool:
+        """Put the cached PDF for key at target, if there is one."""
+        entry = self.entry(key)
+        try:
+            # Refresh the entry for LRU eviction
+            os.utime(entry)
+        except FileNotFoundError:
+            return False
+        place(entry, target)
+        return True
+
+    def store(self, key: str, source: Path) -> None:
+        entry = self.entry(key)
+        entry.parent.mkdir(exist_ok=True)
+        # Link under a temporary name first so a concurrent reader never sees a partial entry
+        partial = entry.with_suffix(f".{os.getpid()}.tmp")
+        place(source, partial)
+        partial.replace(entry)
+
+    def evict(self) -> int:
+        """Delete least recently used entries until the cache fits max_bytes; returns count."""
+        entries = []
+        size = 0
+        for path in self.directory.glob("*/*.pdf"):
+            stat = path.stat()
+            entries.append((stat.st_mtime, stat.st_size, path))
+            size += stat.st_size
+
+        removed = 0
+        for _, entry_size, path in sorted(entries):
+            if size <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            size -= entry_size
+            removed += 1
+        return removed
+
+
+def render_cached(
+    cache: RenderCache | None,
+    invoices: list[Invoice],
+    out_dir: str | Path,
+    render: RenderFunction,
+) -> PDFReport:
+    """
+    Render invoices to out_dir, reusing cached PDFs for the ones that did not change.
+
+    Parameters
+    ----------
+    cache : RenderCache | None
+        Cache to read and fill; None renders everything.
+    invoices : list[Invoice]
+        Invoices to render.
+    out_dir : str | Path
+        Output directory, created when missing.
+    render : RenderFunction
+        Renders a list of invoices into a directory, e.g. render_pdfs with its options bound.
+
+    Returns
+    -------
+    PDFReport
+        Paths for every invoice in order; cached counts the PDFs taken from the cache.
+    """
+    out_path = Path(out_dir)
+    if cache is None:
+        return render(invoices, out_path)
+
+    started = time.perf_counter()
+    out_path.mkdir(parents=True, exist_ok=True)
+    paths = [out_path / output_name(invoice, ".pdf") for invoice in invoices]
+
+    with stats.stage("pdf_cache") as stage:
+        keys = [cache.key(invoice) for invoice in invoices]
+        missing = [
+            position
+            for position, (key, path) in enumerate(zip(keys, paths, strict=True))
+            if not cache.restore(key, path)
+        ]
+        stage.add(cache_hits=len(invoices) - len(missing), cache_misses=len(missing))
+
+    # Outputs of an earlier run may be hard links into the cache; writing through them would
+    # overwrite the cached entry, so they are removed first
+    for position in missing:
+        paths[position].unlink(missing_ok=True)
+
+    report = render([invoices[position] for position in missing], out_path)
+    with stats.stage("pdf_cache"):
+        for position in missing:
+            cache.store(keys[position], paths[position])
+        if missing:
+            cache.evict()
+
+    report.paths = paths
+    report.cached = len(invoices) - len(missing)
+    report.seconds = time.perf_counter() - started
+    return report
@@ -0,0 +1,166 @@
+import os
+import re
+import time
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+from typing import Any
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+
+from invoicegen import stats
+from invoicegen.models import Invoice
+
+"""
+HTML rendering of invoices with Jinja2.
+
+The environment and the invoice template are set up once per HTMLRenderer and reused for
+every invoice. Compiled templates are also kept in a bytecode cache on disk, so a new
+process skips compiling them again. Rendered invoices are streamed from
+Template.generate() into their files chunk by chunk instead of being joined into one
+string first.
+"""
+
+TEMPLATE_DIR = Path(__file__).parents[1] / "templates"
+DEFAULT_TEMPLATE = "invoice.html"
+UNSAFE_NAME = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+def default_cache_dir() -> Path:
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "invoicegen" / "jinja"
+
+
+def money(value: Decimal | None, currency: str = "") -> str:
+    return f"{currency}{value or Decimal(0):,.2f}"
+
+
+def us_date(value: date | None) -> str:
+    return "" if value is None else f"{value.month}/{value.day}/{value.year}"
+
+
+def number_file_name(number: str, suffix: str = ".html") -> str:
+    # Invoice numbers come from the configured prefix, so keep them safe as file names
+    return UNSAFE_NAME.sub("_", number) + suffix
+
+
+def output_name(invoice: Invoice, suffix: str = ".html") -> str:
+    return number_file_name(invoice.header.meta.number, suffix)
+
+
+@dataclass(slots=True)
+class RenderTimings:
+    # Seconds to set up the environment and load the template
+    startup: float = 0.0
+    count: int = 0
+    # Seconds spent rendering invoices, and the longest single one
+    total: float = 0.0
+    slowest: float = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.slowest = max(self.slowest, seconds)
+
+    @property
+    def per_invoice(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.count} invoices in {self.total:.2f}s "
+            f"(startup {self.startup * 1000:.1f} ms, {self.per_invoice * 1000:.2f} ms/invoice, "
+            f"slowest {self.slowest * 1000:.2f} ms)"
+        )
+
+
+class HTMLRenderer:
+    """
+    Render invoices to HTML with one compiled template.
+
+    Parameters
+    ----------
+    template_dir : str | Path | None
+        Directory holding the templates; the packaged templates by default.
+    template_name : str
+        Template rendered for every invoice. It gets the Invoice as `invoice`.
+    cache_dir : str | Path | None
+        Directory for the compiled template bytecode; ~/.cache/invoicegen/jinja (or under
+        $XDG_CACHE_HOME) by default.
+    bytecode_cache : bool
+        Set to False to compile the templates in memory only.
+    context : Mapping[str, Any] | None
+        Extra variables for every render, e.g. logo_url or embed_css=False.
+    """
+
+    def __init__(
+        self,
+        template_dir: str | Path | None = None,
+        template_name: str = DEFAULT_TEMPLATE,
+        cache_dir: str | Path | None = None,
+        bytecode_cache: bool = True,
+        context: Mapping[str, Any] | None = None,
+    ) -> None:
+        started = time.perf_counter()
+
+        cache = None
+        if bytecode_cache:
+            cache_path = Path(cache_dir) if cache_dir is not None else default_cache_dir()
+            cache_path.mkdir(parents=True, exist_ok=True)
+            cache = FileSystemBytecodeCache(str(cache_path))
+
+        self.environment = Environment(
+            loader=FileSystemLoader(template_dir or TEMPLATE_DIR),
+            autoescape=select_autoescape(["html"]),
+            bytecode_cache=cache,
+            # Templates do not change during a run, so do not check them on every lookup
+            auto_reload=False,
+            trim_blocks=True,
+            lstrip_blocks=True,
+        )
+        self.environment.filters["money"] = money
+        self.environment.filters["us_date"] = us_date
+        self.environment.globals.update(context or {})
+        self.template = self.environment.get_template(template_name)
+
+        self.timings = RenderTimings(startup=time.perf_counter() - started)
+
+    def render(self, invoice: Invoice) -> str:
+        return "".join(self.template.generate(invoice=invoice))
+
+    def render_to(self, invoice: Invoice, path: str | Path) -> Path:
+        """Stream one invoice into a file and record how long it took."""
+        started = time.perf_counter()
+        path = Path(path)
+        with path.open("w", encoding="utf-8") as f:
+            for chunk in self.template.generate(invoice=invoice):
+                f.write(chunk)
+        self.timings.add(time.perf_counter() - started)
+        return path
+
+    def render_all(self, invoices: Iterable[Invoice], out_dir: str | Path) -> list[Path]:
+        """
+        Render every invoice into out_dir, one <invoice number>.html file each.
+
+        Parameters
+        ----------
+        invoices : Iterable[Invoice]
+            Invoices to render; they are consumed one at a time.
+        out_dir : str | Path
+            Output directory, created when missing.
+
+        Returns
+        -------
+        list[Path]
+            The files written, in the order of the invoices.
+        """
+        out_path = Path(out_dir)
+        out_path.mkdir(parents=True, exist_ok=True)
+        with stats.stage("render_html") as stage:
+            paths = [
+                self.render_to(invoice, out_path / output_name(invoice)) for invoice in invoices
+            ]
+            stage.add(items=len(paths))
+        return paths
@@ -0,0 +1,322 @@
+import os
+import time
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import FIRST_COMPLETED, BrokenExecutor, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import Any
+
+from invoicegen import stats
+from invoicegen.models import BusinessInfo, Invoice
+
+from .html import HTMLRenderer, output_name
+
+"""
+PDF rendering of invoices with WeasyPrint, spread over a pool of worker processes.
+
+Laying out a PDF is CPU-bound and takes far longer than rendering its HTML, so invoices are
+handed to long-lived worker processes. Each worker sets up everything the documents share
+once: the Jinja2 template, the parsed stylesheet, the font configuration, and the business
+logo, which is fetched once and decoded once through WeasyPrint's image cache.
+
+WeasyPrint is imported by the workers only, so the rest of the package works without it
+(and without the system libraries it needs).
+"""
+
+STYLESHEET = "invoice.css"
+# Invoices queued per worker, so workers never wait while memory stays bounded
+QUEUED_PER_JOB = 2
+
+ProgressHandler = Callable[[int, int], None]
+# Called with the path of a PDF and its render seconds, or the error that stopped it
+FinishedHandler = Callable[[Path, float], None]
+FailedHandler = Callable[[Path, Exception], None]
+
+
+def logo_path(business: BusinessInfo, base_dir: str | Path) -> Path | None:
+    """The business logo as a file, relative paths resolved against base_dir."""
+    if not business.logo:
+        return None
+    path = Path(base_dir) / business.logo
+    return path if path.is_file() else None
+
+
+def require_weasyprint() -> None:
+    # Fail once with a clear message instead of in every worker process
+    try:
+        import weasyprint  # noqa: F401, PLC0415
+    except (ImportError, OSError) as exc:
+        raise RuntimeError(f"WeasyPrint is not available: {exc}") from exc
+
+
+class PDFWorker:
+    """
+    Everything needed to write invoice PDFs, set up once and reused for every document.
+
+    Parameters
+    ----------
+    logo : Path | None
+        Business logo shown on every invoice.
+    """
+
+    def __init__(self, logo: Path | None = None) -> None:
+        import weasyprint  # noqa: PLC0415
+        from weasyprint.text.fonts import FontConfiguration  # noqa: PLC0415
+
+        self.weasyprint = weasyprint
+        self.font_config = FontConfiguration()
+        self.resources: dict[str, dict[str, Any]] = {}
+        self.image_cache: dict[str, Any] = {}
+
+        logo_url = logo.resolve().as_uri() if logo else None
+        # The stylesheet is parsed once below instead of once per document
+        self.renderer = HTMLRenderer(context={"embed_css": False, "logo_url": logo_url})
+        loader = self.renderer.environment.loader
+        assert loader is not None
+        css, _, _ = loader.get_source(self.renderer.environment, STYLESHEET)
+        self.stylesheets = [weasyprint.CSS(string=css, font_config=self.font_config)]
+
+        if logo_url:
+            self.fetch(logo_url)
+
+    def fetch(self, url: str) -> dict[str, Any]:
+        # Resources shared by every document (the logo) are read from disk once
+        resource = self.resources.get(url)
+        if resource is None:
+            resource = self.weasyprint.default_url_fetcher(url)
+            file_obj = resource.pop("file_obj", None)
+            if file_obj is not None:
+                with file_obj:
+                    resource["string"] = file_obj.read()
+            self.resources[url] = resource
+        return dict(resource)
+
+    def render(self, invoice: Invoice, path: str | Path) -> float:
+        """Write one invoice PDF and return the seconds it took."""
+        started = time.perf_counter()
+        # WeasyPrint lays out whole documents, so the HTML is not streamed here
+        document = self.weasyprint.HTML(
+            string=self.renderer.render(invoice), url_fetcher=self.fetch
+        )
+        document.write_pdf(
+            str(path),
+            stylesheets=self.stylesheets,
+            font_config=self.font_config,
+            cache=self.image_cache,
+        )
+        return time.perf_counter() - started
+
+
+def settle(
+    path: Path,
+    render: Callable[[], float],
+    finished: FinishedHandler,
+    failed: FailedHandler | None,
+) -> None:
+    """Report the outcome of one PDF to finished, or to failed when it raised."""
+    try:
+        seconds = render()
+    except BrokenExecutor:
+        # The workers are gone, so every later PDF would fail the same way
+        raise
+    except Exception as exc:
+        if failed is None:
+            raise
+        failed(path, exc)
+        return
+    finished(path, seconds)
+
+
+# The worker of this process, set up by init_worker
+_worker: PDFWorker | None = None
+
+
+def init_worker(logo: Path | None) -> None:
+    global _worker  # noqa: PLW0603
+    _worker = PDFWorker(logo)
+
+
+def render_in_worker(invoice: Invoice, path: Path) -> float:
+    assert _worker is not None, "init_worker was not called in this process"
+    return _worker.render(invoice, path)
+
+
+@dataclass(slots=True)
+class PDFReport:
+    paths: list[Path] = field(default_factory=list)
+    # Wall-clock seconds, and seconds spent rendering summed over the workers
+    seconds: float = 0.0
+    render_seconds: float = 0.0
+    # PDFs taken from a render cache instead of rendered, see render.cache
+    cached: int = 0
+
+    def summary(self) -> str:
+        rendered = len(self.paths) - self.cached
+        per_pdf = self.render_seconds / rendered if rendered else 0.0
+        return (
+            f"{len(self.paths)} PDFs in {self.seconds:.2f}s, {self.cached} from cache "
+            f"({per_pdf * 1000:.0f} ms/PDF per worker)"
+        )
+
+
+class PDFPool:
+    """
+    Workers that write invoice PDFs, kept open across calls so that several batches of
+    invoices share one set of workers, each set up once.
+
+    The workers start with the first PDF, so an unused pool costs nothing and does not need
+    WeasyPrint.
+
+    Parameters
+    ----------
+    jobs : int
+        Worker processes; 0 means one per CPU. With 1 everything runs in this process.
+    logo : Path | None
+        Business logo file, see logo_path.
+    """
+
+    def __init__(self, jobs: int = 0, logo: Path | None = None) -> None:
+        if jobs < 0:
+            raise ValueError(f"Jobs must be at least 0, got {jobs}")
+        self.jobs = jobs or os.cpu_count() or 1
+        self.logo = logo
+        self.worker: PDFWorker | None = None
+        self.executor: ProcessPoolExecutor | None = None
+
+    def __enter__(self) -> "PDFPool":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Wait for the PDFs in progress and stop the workers."""
+        if self.executor is not None:
+            self.executor.shutdown()
+        self.executor = None
+        self.worker = None
+
+    def submit(self, invoice: Invoice, path: Path) -> Future[float]:
+        if self.executor is None:
+            require_weasyprint()
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.jobs, initializer=init_worker, initargs=(self.logo,)
+            )
+        return self.executor.submit(render_in_worker, invoice, path)
+
+    def process_worker(self) -> PDFWorker:
+        # The worker used with jobs=1, set up with the first PDF
+        if self.worker is None:
+            require_weasyprint()
+            self.worker = PDFWorker(self.logo)
+        return self.worker
+
+    def render_tasks(
+        self,
+        tasks: Iterable[tuple[Invoice, Path]],
+        finished: FinishedHandler,
+        failed: FailedHandler | None = None,
+    ) -> None:
+        """
+        Write each invoice to its path, taking tasks from the iterable as workers free up.
+
+        Parameters
+        ----------
+        tasks : Iterable[tuple[Invoice, Path]]
+            Invoices and the files to write them to; consumed lazily, so a generator can
+            build the invoices of one input while the PDFs of the previous one are written.
+        finished : FinishedHandler
+            Called with the path and render seconds of every PDF, in the order they finish.
+        failed : FailedHandler | None
+            Called with the path and the error of every PDF that could not be written, after
+            which the other tasks go on. Without it the first error is raised.
+        """
+        if self.jobs == 1:
+            for invoice, path in tasks:
+                settle(path, partial(self.process_worker().render, invoice, path), finished, failed)
+            return
+
+        queued = iter(tasks)
+        pending: dict[Future[float], Path] = {}
+        while True:
+            # Keep a few invoices queued per worker instead of submitting all of them
+            for invoice, path in queued:
+                pending[self.submit(invoice, path)] = path
+                if len(pending) >= self.jobs * QUEUED_PER_JOB:
+                    break
+            if not pending:
+                break
+
+            completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in completed:
+                settle(pending.pop(future), future.result, finished, failed)
+
+    def render_pdfs(
+        self,
+        invoices: Sequence[Invoice],
+        out_dir: str | Path,
+        progress: ProgressHandler | None = None,
+    ) -> PDFReport:
+        """Write one <invoice number>.pdf per invoice into out_dir, see render_pdfs."""
+        started = time.perf_counter()
+        out_path = Path(out_dir)
+        out_path.mkdir(parents=True, exist_ok=True)
+
+        report = PDFReport(paths=[out_path / output_name(invoice, ".pdf") for invoice in invoices])
+        if not invoices:
+            return report
+
+        total = len(invoices)
+        done = 0
+
+        def finished(path: Path, seconds: float) -> None:
+            nonlocal done
+            done += 1
+            report.render_seconds += seconds
+            if progress is not None:
+                progress(done, total)
+
+        with stats.stage("render_pdf") as stage:
+            self.render_tasks(zip(invoices, report.paths, strict=True), finished)
+            stage.add(items=total)
+
+        report.seconds = time.perf_counter() - started
+        return report
+
+
+def render_pdfs(
+    invoices: Sequence[Invoice],
+    out_dir: str | Path,
+    jobs: int = 0,
+    logo: Path | None = None,
+    progress: ProgressHandler | None = None,
+) -> PDFReport:
+    """
+    Write one <invoice number>.pdf per invoice, using a pool of worker processes.
+
+    Parameters
+    ----------
+    invoices : Sequence[Invoice]
+        Invoices to render.
+    out_dir : str | Path
+        Output directory, created when missing.
+    jobs : int
+        Worker processes; 0 means one per CPU. With 1 everything runs in this process.
+    logo : Path | None
+        Business logo file, see logo_path.
+    progress : ProgressHandler | None
+        Called with (done, total) after every PDF.
+
+    Returns
+    -------
+    PDFReport
+        Paths in the order of the invoices, and timings.
+    """
+    if jobs < 0:
+        raise ValueError(f"Jobs must be at least 0, got {jobs}")
+
+    # No more workers than invoices
+    jobs = min(jobs or os.cpu_count() or 1, max(len(invoices), 1))
+    with PDFPool(jobs, logo) as pool:
+        return pool.render_pdfs(invoices, out_dir, progress)
@@ -0,0 +1,194 @@
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from functools import wraps
+from typing import Any, ParamSpec, TypeVar
+
+"""
+Per-stage timing and counters.
+
+Instrumented code wraps each stage (ingest, validate, group, build_invoices, numbering,
+render_html, render_pdf, pdf_cache, match_payments) in `with stats.stage(name) as stage:`,
+which adds the wall time and a call to that stage, and reports what it handled through
+stage.add(): items (CSV rows, job lines, invoices or payments, depending on the stage), errors,
+and cache hits and misses.
+Memory is how far the process's peak RSS rose while the stage ran, summed over its calls.
+Memory freed by an earlier stage and reused does not raise the peak, so a stage that needs
+less than one before it shows none; the whole run's peak is reported apart.
+
+Nothing is collected unless enable() was called, which the CLI does for --stats and
+--stats-json. While disabled, stage() returns one shared stage that does nothing, so
+instrumented code pays a function call per stage and allocates nothing.
+
+Stages nest, e.g. numbering is also counted in build_invoices. Work done in worker processes
+is counted by the stage of this process that waits for it. A collector's listener, when set,
+is called after every stage; the memory profiler uses it to catch the peak.
+"""
+
+KIB = 1024
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+def peak_rss() -> int | None:
+    """Peak resident set size of this process in bytes, where the platform reports it."""
+    try:
+        import resource  # noqa: PLC0415
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * KIB
+
+
+@dataclass(slots=True)
+class StageStats:
+    calls: int = 0
+    seconds: float = 0.0
+    items: int = 0
+    errors: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    # Rise of the process's peak RSS during the stage, None where the platform has no figure
+    peak_rss_growth_bytes: int | None = None
+
+
+class Stage:
+    """One timed pass through a stage; with no record it does nothing."""
+
+    __slots__ = ("listener", "record", "rss_before", "started")
+
+    def __init__(
+        self, record: StageStats | None, listener: Callable[[], None] | None = None
+    ) -> None:
+        self.record = record
+        self.listener = listener
+        self.started = 0.0
+        self.rss_before: int | None = None
+
+    def __enter__(self) -> "Stage":
+        if self.record is not None:
+            self.rss_before = peak_rss()
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        record = self.record
+        if record is not None:
+            record.calls += 1
+            record.seconds += time.perf_counter() - self.started
+            rss_after = peak_rss()
+            if rss_after is not None and self.rss_before is not None:
+                growth = rss_after - self.rss_before
+                record.peak_rss_growth_bytes = (record.peak_rss_growth_bytes or 0) + growth
+            if self.listener is not None:
+                self.listener()
+
+    def add(
+        self, items: int = 0, errors: int = 0, cache_hits: int = 0, cache_misses: int = 0
+    ) -> None:
+        record = self.record
+        if record is not None:
+            record.items += items
+            record.errors += errors
+            record.cache_hits += cache_hits
+            record.cache_misses += cache_misses
+
+
+# Handed out while collection is disabled
+NULL_STAGE = Stage(None)
+
+
+class Stats:
+    """Stage records of one run, in the order the stages first ran."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.stages: dict[str, StageStats] = {}
+        # Called after every stage ends
+        self.listener: Callable[[], None] | None = None
+
+    @property
+    def seconds(self) -> float:
+        return time.perf_counter() - self.started
+
+    def record(self, name: str) -> StageStats:
+        record = self.stages.get(name)
+        if record is None:
+            record = self.stages[name] = StageStats()
+        return record
+
+    def to_json(self) -> dict[str, Any]:
+        return {
+            "seconds": self.seconds,
+            "peak_rss_bytes": peak_rss(),
+            "stages": {name: asdict(record) for name, record in self.stages.items()},
+        }
+
+    def summary(self) -> str:
+        peak = peak_rss()
+        total = f"{self.seconds:.3f}s total"
+        if peak is not None:
+            total += f", peak RSS {peak / KIB**2:.1f} MiB"
+        lines = [
+            f"[invoicegen] stats: {total}",
+            f"  {'stage':<16}{'calls':>7}{'seconds':>10}{'items':>10}{'errors':>8}"
+            f"{'cache hit/miss':>16}{'RSS growth':>12}",
+        ]
+        for name, record in self.stages.items():
+            cache = ""
+            if record.cache_hits or record.cache_misses:
+                cache = f"{record.cache_hits}/{record.cache_misses}"
+            growth = record.peak_rss_growth_bytes
+            rss = "" if growth is None else f"{growth / KIB**2:.1f} MiB"
+            lines.append(
+                f"  {name:<16}{record.calls:>7}{record.seconds:>10.3f}{record.items:>10}"
+                f"{record.errors:>8}{cache:>16}{rss:>12}"
+            )
+        return "\n".join(lines)
+
+
+# The collector of this process, set by enable
+_collector: Stats | None = None
+
+
+def enable() -> Stats:
+    """Start collecting into a new Stats and return it."""
+    global _collector  # noqa: PLW0603
+    _collector = Stats()
+    return _collector
+
+
+def active() -> Stats | None:
+    return _collector
+
+
+def disable() -> Stats | None:
+    """Stop collecting and return what was collected."""
+    global _collector  # noqa: PLW0603
+    collected, _collector = _collector, None
+    return collected
+
+
+def stage(name: str) -> Stage:
+    if _collector is None:
+        return NULL_STAGE
+    return Stage(_collector.record(name), _collector.listener)
+
+
+def timed(name: str) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """Decorator counting every call of a function as a pass through stage name."""
+
+    def decorate(func: Callable[P, R]) -> Callable[P, R]:
+        @wraps(func)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            if _collector is None:
+                return func(*args, **kwargs)
+            with Stage(_collector.record(name), _collector.listener):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
@@ -0,0 +1,113 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from invoicegen.models import JobLine, JobLineBatch
+
+
+@pytest.fixture()
+def lines() -> list[JobLine]:
+    return [
+        JobLine.model_validate(
+            {
+                "dates": "11/1/2024",
+                "address": "Elderwood",
+                "unit": "A",
+                "description": "Repair leaking toilet.",
+                "rate": "80.00",
+                "qty": "1.5",
+                "paid": "TRUE",
+                "source_row": 2,
+            }
+        ),
+        JobLine.model_validate(
+            {
+                "dates": "2/29/2024",
+                "address": "Hill",
+                "unit": "Front",
+                "description": "Repair leak.",
+                "rate": "65",
+                "qty": "0.333",
+                "source_row": 4,
+            }
+        ),
+        JobLine.model_validate(
+            {
+                "dates": "11/10/2024",
+                "address": "Elderwood",
+                "unit": "A",
+                "description": "Repair leaking toilet.",
+                "rate": "1,000",
+                "qty": "2",
+                "paid": True,
+                "source_row": 5,
+            }
+        ),
+    ]
+
+
+# Test packing and unpacking gives back equal lines
+def test_round_trip(lines: list[JobLine]) -> None:
+    batch = JobLineBatch.from_joblines(lines)
+
+    assert len(batch) == len(lines)
+    assert batch.to_joblines() == lines
+
+
+# Test the text columns store each distinct value once
+def test_strings_interned(lines: list[JobLine]) -> None:
+    batch = JobLineBatch.from_joblines(lines)
+
+    assert batch.addresses.strings == ["Elderwood", "Hill"]
+    assert batch.descriptions.strings == ["Repair leaking toilet.", "Repair leak."]
+
+
+# Test a column rescales when a value has more decimal places than the ones before it
+def test_scale_grows(lines: list[JobLine]) -> None:
+    batch = JobLineBatch.from_joblines(lines)
+
+    assert batch.qty.scale == len("333")
+    assert list(batch.qty.values) == [1500, 333, 2000]
+    # Each value keeps its own exponent, so it prints as it did before packing
+    assert [str(view.qty) for view in batch] == ["1.5", "0.333", "2"]
+    assert [str(line.qty) for line in batch.to_joblines()] == ["1.5", "0.333", "2"]
+    assert str(batch[2].rate) == str(lines[2].rate)
+
+
+# Test row views read the same values as the JobLines
+def test_row_views(lines: list[JobLine]) -> None:
+    batch = JobLineBatch.from_joblines(lines)
+    views = list(batch)
+
+    assert [view.paid for view in views] == [True, False, True]
+    assert [view.source_row for view in views] == [2, 4, 5]
+    assert views[1].dates == date(2024, 2, 29)
+    assert views[1].line_total == Decimal("21.65")
+    assert batch[-1].to_jobline() == lines[-1]
+
+
+def test_paid_bits_past_first_byte(lines: list[JobLine]) -> None:
+    batch = JobLineBatch.from_joblines(lines * 4)
+
+    assert [view.paid for view in batch] == [line.paid for line in lines * 4]
+
+
+def test_index_out_of_range(lines: list[JobLine]) -> None:
+    batch = JobLineBatch.from_joblines(lines)
+
+    with pytest.raises(IndexError):
+        batch[len(lines)]
+
+
+# Test a value that would overflow the 64-bit column is refused without changing the batch
+def test_overflow_leaves_batch_unchanged(lines: list[JobLine]) -> None:
+    large = lines[0].model_copy(update={"qty": Decimal("100000000000")})
+    tiny = lines[1].model_copy(update={"qty": Decimal("0.000000001")})
+    batch = JobLineBatch.from_joblines([large])
+
+    with pytest.raises(ValueError, match="Quantity must be at most"):
+        batch.append(tiny)
+
+    assert len(batch) == len(batch.address_codes) == len(batch.qty.values) == 1
+    assert batch.to_joblines() == [large]
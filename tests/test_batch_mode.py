@@ -0,0 +1,190 @@
+import shutil
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from invoicegen.cli import main
+from invoicegen.config import load_config
+from invoicegen.core import batch
+from invoicegen.core.batch import Batch, find_inputs
+from invoicegen.io.columnar import SUMMARY_COLUMNS
+from invoicegen.models import Invoice
+from invoicegen.render.cache import RenderCache
+
+SAMPLES = Path(__file__).parents[1] / "samples"
+SAMPLE = SAMPLES / "october.csv"
+CLIENT = SAMPLES / "client.yaml"
+PROJECTS = ["Elderwood", "Elizabeth", "Hill"]
+
+
+def add_client(directory: Path, name: str, client_suffix: str = ".yaml") -> None:
+    directory.mkdir(parents=True, exist_ok=True)
+    shutil.copy(SAMPLE, directory / f"{name}.csv")
+    shutil.copy(CLIENT, directory / f"{name}{client_suffix}")
+
+
+class FakePool:
+    # Stands in for PDFPool: writes a small file per invoice and counts the pools opened
+    opened = 0
+    # Invoices of this project fail to render
+    failing: str | None = None
+
+    def __init__(self, jobs: int = 0, logo: Path | None = None) -> None:
+        FakePool.opened += 1
+
+    def __enter__(self) -> "FakePool":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        pass
+
+    def render_tasks(
+        self,
+        tasks: Iterable[tuple[Invoice, Path]],
+        finished: Callable[[Path, float], None],
+        failed: Callable[[Path, Exception], None] | None = None,
+    ) -> None:
+        for invoice, path in tasks:
+            path.write_text(f"{invoice.header.meta.number} {invoice.total}")
+            if invoice.header.client.project_name == FakePool.failing:
+                assert failed is not None
+                failed(path, ValueError("layout failed"))
+            else:
+                finished(path, 0.0)
+
+
+def test_directory_inputs(tmp_path: Path) -> None:
+    add_client(tmp_path, "oak")
+    add_client(tmp_path, "elm", client_suffix=".yml")
+    shutil.copy(SAMPLE, tmp_path / "pine.csv")
+
+    inputs = find_inputs(tmp_path)
+
+    assert [item.name for item in inputs] == ["elm", "oak", "pine"]
+    assert inputs[0].client_file == tmp_path / "elm.yml"
+    # Reported when the client is run, not when the inputs are listed
+    assert not inputs[2].client_file.exists()
+
+    (tmp_path / "empty").mkdir()
+    with pytest.raises(ValueError, match="No job line CSVs"):
+        find_inputs(tmp_path / "empty")
+
+
+def test_manifest_inputs(tmp_path: Path) -> None:
+    manifest = tmp_path / "batch.yaml"
+    manifest.write_text(
+        "clients:\n"
+        "  - {name: elm, jobs: elm/october.csv, client: elm/client.yaml}\n"
+        "  - {jobs: oak.csv, client: oak.yaml}\n"
+    )
+
+    inputs = find_inputs(manifest)
+
+    assert [item.name for item in inputs] == ["elm", "oak"]
+    assert inputs[0].jobs_file == tmp_path / "elm" / "october.csv"
+    assert inputs[1].client_file == tmp_path / "oak.yaml"
+
+
+@pytest.mark.parametrize(
+    ("text", "message"),
+    [
+        ("clients: []\n", "at least 1 item"),
+        ("clients:\n  - {jobs: a.csv}\n", "client"),
+        ("clients:\n  - {jobs: a.csv, client: a.yaml, tax: 1}\n", "Extra inputs"),
+        (
+            "clients:\n  - {jobs: a.csv, client: a.yaml}\n  - {jobs: a.csv, client: b.yaml}\n",
+            "More than one",
+        ),
+        ("clients:\n  - {name: ../a, jobs: a.csv, client: a.yaml}\n", "not a folder name"),
+    ],
+)
+def test_bad_manifest(tmp_path: Path, text: str, message: str) -> None:
+    manifest = tmp_path / "batch.yaml"
+    manifest.write_text(text)
+
+    with pytest.raises(ValueError, match=message):
+        find_inputs(manifest)
+
+
+def test_cli_batch_html(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    add_client(tmp_path / "in", "oak")
+    add_client(tmp_path / "in", "elm")
+    out = tmp_path / "out"
+
+    assert main(["batch", "--in", str(tmp_path / "in"), "--out", str(out), "--html"]) == 0
+
+    summary = pd.read_csv(out / "summary.csv", dtype=str)
+    assert list(summary.columns) == ["client", *SUMMARY_COLUMNS]
+    assert summary["client"].tolist() == ["elm"] * len(PROJECTS) + ["oak"] * len(PROJECTS)
+    # One config for the whole batch, so invoice numbers continue from client to client
+    assert summary["number"].is_unique
+    for name in ["elm", "oak"]:
+        assert len(list((out / name).glob("*.html"))) == len(PROJECTS)
+    assert "2 of 2 clients, 6 invoices" in capsys.readouterr().out
+
+
+def test_cli_batch_skips_failed_clients(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    inputs = tmp_path / "in"
+    add_client(inputs, "elm")
+    add_client(inputs, "oak")
+    (inputs / "oak.csv").write_text(
+        SAMPLE.read_text().replace("11/15/2024,Hill", "13/15/2024,Hill")
+    )
+    shutil.copy(SAMPLE, inputs / "pine.csv")
+    out = tmp_path / "out"
+    totals = tmp_path / "totals.csv"
+
+    argv = ["batch", "--in", str(inputs), "--out", str(out), "--html", "--summary", str(totals)]
+    assert main(argv) == 1
+
+    printed = capsys.readouterr().out
+    assert "oak: Row " in printed
+    assert "pine: " in printed
+    assert "1 of 3 clients, 3 invoices" in printed
+    assert pd.read_csv(totals, dtype=str)["client"].unique().tolist() == ["elm"]
+    assert not (out / "oak").exists()
+
+
+def test_pdfs_share_one_pool_and_the_cache(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(batch, "PDFPool", FakePool)
+    FakePool.opened = 0
+    add_client(tmp_path / "in", "oak")
+    add_client(tmp_path / "in", "elm")
+    inputs = find_inputs(tmp_path / "in")
+    cache = RenderCache(tmp_path / "cache", "fingerprint")
+
+    first = Batch(load_config(), tmp_path / "out", cache=cache).run(inputs)
+    assert FakePool.opened == 1
+    assert first.cached == 0
+    assert [len(result.paths) for result in first.clients] == [len(PROJECTS)] * 2
+
+    second = Batch(load_config(), tmp_path / "again", cache=cache).run(inputs)
+    assert second.cached == len(PROJECTS) * 2
+    for result in second.clients:
+        for path in result.paths:
+            first_path = tmp_path / "out" / path.relative_to(tmp_path / "again")
+            assert path.read_text() == first_path.read_text()
+
+
+def test_failed_pdf_reported_with_its_client(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(batch, "PDFPool", FakePool)
+    monkeypatch.setattr(FakePool, "failing", PROJECTS[1])
+    add_client(tmp_path / "in", "oak")
+    add_client(tmp_path / "in", "elm")
+    cache = RenderCache(tmp_path / "cache", "fingerprint")
+
+    report = Batch(load_config(), tmp_path / "out", cache=cache).run(find_inputs(tmp_path / "in"))
+
+    assert [result.name for result in report.failed] == ["elm", "oak"]
+    for result in report.clients:
+        assert result.failure is not None
+        assert "layout failed" in result.failure
+        # The other PDFs are still written, and cached
+        assert len(result.paths) == len(PROJECTS) - 1
+        assert all(path.exists() for path in result.paths)
+        assert len(list((tmp_path / "out" / result.name).iterdir())) == len(PROJECTS) - 1
+    assert len(list((tmp_path / "cache").rglob("*.pdf"))) == (len(PROJECTS) - 1) * 2
@@ -0,0 +1,134 @@
+import os
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from invoicegen.config import load_client, load_config
+from invoicegen.models import Invoice, InvoiceHeader, InvoiceMeta, JobLine
+from invoicegen.render import PDFReport
+from invoicegen.render.cache import RenderCache, render_cached, render_fingerprint
+from invoicegen.render.html import TEMPLATE_DIR, output_name
+
+SAMPLES = Path(__file__).parents[1] / "samples"
+
+
+def make_invoice(number: int, rate: str = "100") -> Invoice:
+    header = InvoiceHeader(
+        business=load_config().business_info,
+        client=load_client(SAMPLES / "client.yaml"),
+        meta=InvoiceMeta.model_validate({"number": f"INV-{number:04d}", "start_date": "12/1/2024"}),
+    )
+    line = JobLine.model_validate(
+        {
+            "dates": "11/1/2024",
+            "address": "Elderwood",
+            "unit": "A",
+            "description": "Repair leaking toilet.",
+            "rate": rate,
+            "qty": "1",
+            "source_row": 2,
+        }
+    )
+    return Invoice(header=header, lines=[line], tax_rate=Decimal("0"))
+
+
+class Recorder:
+    # Stands in for render_pdfs: writes a small file per invoice and remembers the calls
+    def __init__(self) -> None:
+        self.rendered: list[str] = []
+
+    def __call__(self, invoices: list[Invoice], out_dir: Path) -> PDFReport:
+        report = PDFReport()
+        for invoice in invoices:
+            path = out_dir / output_name(invoice, ".pdf")
+            path.write_text(f"{invoice.header.meta.number} {invoice.total}")
+            report.paths.append(path)
+            self.rendered.append(invoice.header.meta.number)
+        return report
+
+
+@pytest.fixture()
+def cache(tmp_path: Path) -> RenderCache:
+    return RenderCache(tmp_path / "cache", render_fingerprint())
+
+
+def test_unchanged_invoices_reused(cache: RenderCache, tmp_path: Path) -> None:
+    invoices = [make_invoice(number) for number in range(1, 4)]
+    first = Recorder()
+    render_cached(cache, invoices, tmp_path / "out", first)
+
+    # Fix one row: only that invoice is rendered again
+    invoices[1] = make_invoice(2, rate="120")
+    second = Recorder()
+    report = render_cached(cache, invoices, tmp_path / "out", second)
+
+    assert first.rendered == ["INV-0001", "INV-0002", "INV-0003"]
+    assert second.rendered == ["INV-0002"]
+    assert report.cached == len(invoices) - 1
+    assert [path.read_text() for path in report.paths] == [
+        "INV-0001 100.00",
+        "INV-0002 120.00",
+        "INV-0003 100.00",
+    ]
+
+
+def test_rerender_does_not_touch_cached_entry(cache: RenderCache, tmp_path: Path) -> None:
+    invoice = make_invoice(1)
+    render_cached(cache, [invoice], tmp_path / "out", Recorder())
+    # The output is now linked to the cache entry; a changed invoice must not write through it
+    render_cached(cache, [make_invoice(1, rate="5")], tmp_path / "out", Recorder())
+
+    assert cache.entry(cache.key(invoice)).read_text() == "INV-0001 100.00"
+
+
+def test_key_ignores_what_is_not_printed(cache: RenderCache) -> None:
+    invoice = make_invoice(1)
+    # An inserted CSV row moves the rows after it; 100.00 prints the same as 100
+    moved = invoice.model_copy(deep=True)
+    moved.lines[0].source_row = 3
+    moved.lines[0].rate = Decimal("100.00")
+
+    assert cache.key(moved) == cache.key(invoice)
+    assert cache.key(make_invoice(1, rate="100.01")) != cache.key(invoice)
+
+
+def test_no_cache_renders_everything(tmp_path: Path) -> None:
+    recorder = Recorder()
+    invoices = [make_invoice(1)]
+    render_cached(None, invoices, tmp_path, recorder)
+    render_cached(None, invoices, tmp_path, recorder)
+
+    assert recorder.rendered == ["INV-0001", "INV-0001"]
+
+
+def test_fingerprint_follows_templates(tmp_path: Path) -> None:
+    templates = tmp_path / "templates"
+    templates.mkdir()
+    for path in TEMPLATE_DIR.iterdir():
+        (templates / path.name).write_bytes(path.read_bytes())
+
+    before = render_fingerprint(templates)
+    (templates / "invoice.css").write_text("body { color: red; }")
+
+    assert before == render_fingerprint(TEMPLATE_DIR)
+    assert render_fingerprint(templates) != before
+
+
+def test_evicts_least_recently_used(tmp_path: Path) -> None:
+    cache = RenderCache(tmp_path / "cache", "fingerprint", max_bytes=25)
+    sources = []
+    for number in range(3):
+        source = tmp_path / f"{number}.pdf"
+        source.write_bytes(b"x" * 10)
+        sources.append(source)
+        cache.store(f"{number:02d}key", source)
+        # Distinct, increasing modification times
+        os.utime(cache.entry(f"{number:02d}key"), (number, number))
+
+    # Using the oldest entry makes the middle one least recently used
+    assert cache.restore("00key", tmp_path / "restored.pdf")
+
+    assert cache.evict() == 1
+    assert not cache.entry("01key").exists()
+    assert cache.entry("00key").exists()
@@ -0,0 +1,154 @@
+import shutil
+from decimal import Decimal
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from invoicegen.cli import COLUMNAR_SUFFIXES, main
+from invoicegen.io import read_joblines
+from invoicegen.io.columnar import (
+    EXPONENT_COLUMNS,
+    FORMATS,
+    SUMMARY_COLUMNS,
+    batch_frame,
+    file_format,
+    frame_batch,
+    read_invoice_summaries,
+    read_jobline_batch,
+    write_joblines,
+)
+from invoicegen.io.frames import read_frames
+from invoicegen.models import JobLine, JobLineBatch
+
+SAMPLES = Path(__file__).parents[1] / "samples"
+SAMPLE = SAMPLES / "october.csv"
+CLIENT = SAMPLES / "client.yaml"
+
+
+@pytest.fixture()
+def lines() -> list[JobLine]:
+    return list(read_joblines(SAMPLE))
+
+
+def test_frame_round_trip(lines: list[JobLine]) -> None:
+    frame = batch_frame(JobLineBatch.from_joblines(lines))
+
+    assert frame.index.tolist() == [line.source_row for line in lines]
+    assert frame_batch(frame).to_joblines() == lines
+
+
+def test_frame_matches_validated_frame(lines: list[JobLine]) -> None:
+    # The same typed columns as validating the CSV with pandas
+    expected = pd.concat([result.frame for result in read_frames(SAMPLE)])
+    frame = batch_frame(JobLineBatch.from_joblines(lines))
+
+    pd.testing.assert_frame_equal(frame, expected, check_dtype=False)
+    assert frame_batch(expected).to_joblines() == lines
+
+
+def test_decimal_columns_keep_their_scale(lines: list[JobLine]) -> None:
+    frame = batch_frame(JobLineBatch.from_joblines(lines))
+    frame.loc[frame.index[0], "qty"] = Decimal("0.125")
+
+    batch = frame_batch(frame)
+    assert batch.qty.scale == len("125")
+    assert batch[0].qty == Decimal("0.125")
+    assert str(batch[1].qty) == str(lines[1].qty)
+    assert [str(qty) for qty in batch_frame(batch)["qty"]] == [
+        "0.125",
+        *[str(line.qty) for line in lines[1:]],
+    ]
+
+
+def test_exponent_columns_restore_printed_values(lines: list[JobLine]) -> None:
+    lines[1] = lines[1].model_copy(update={"qty": Decimal("0.5")})
+    batch = JobLineBatch.from_joblines(lines)
+    frame = batch_frame(batch)
+    # As read back from Arrow, where every decimal has its column's scale
+    frame["qty"] = [qty.quantize(Decimal("0.1")) for qty in frame["qty"]]
+    for name, exponent_column in EXPONENT_COLUMNS.items():
+        frame[exponent_column] = list(getattr(batch, name).exponents)
+
+    restored = frame_batch(frame)
+
+    assert [str(view.qty) for view in restored] == [str(line.qty) for line in lines]
+    assert str(restored[0].qty) == "1"
+
+
+def test_values_too_large_rejected(lines: list[JobLine]) -> None:
+    frame = batch_frame(JobLineBatch.from_joblines(lines))
+    frame.loc[frame.index[0], "rate"] = Decimal("1E+30")
+
+    with pytest.raises(ValueError, match="Unit Price must be at most"):
+        frame_batch(frame)
+
+
+def test_missing_values_rejected(lines: list[JobLine]) -> None:
+    frame = batch_frame(JobLineBatch.from_joblines(lines))
+    frame.loc[frame.index[2], "unit"] = None
+
+    with pytest.raises(ValueError, match="unit has missing values"):
+        frame_batch(frame)
+
+
+def test_file_format() -> None:
+    assert file_format("lines.PARQUET") == "parquet"
+    assert file_format(Path("lines.arrow")) == "feather"
+    with pytest.raises(ValueError, match="Cannot tell the format"):
+        file_format("lines.csv")
+    # The CLI recognizes the same inputs without importing pandas
+    assert set(COLUMNAR_SUFFIXES) == set(FORMATS)
+
+
+@pytest.mark.parametrize("suffix", list(FORMATS))
+def test_file_round_trip(tmp_path: Path, lines: list[JobLine], suffix: str) -> None:
+    pytest.importorskip("pyarrow")
+    path = tmp_path / f"lines{suffix}"
+    write_joblines(lines, path)
+
+    assert read_jobline_batch(path).to_joblines() == lines
+
+
+def test_cli_summary_csv(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    out = tmp_path / "totals.csv"
+    argv = ["summary", "--in", str(SAMPLE), "--client", str(CLIENT), "--summary", str(out)]
+    assert main(argv) == 0
+
+    summary = pd.read_csv(out, dtype=str)
+    assert list(summary.columns) == SUMMARY_COLUMNS
+    assert summary["project"].tolist() == ["Elderwood", "Elizabeth", "Hill"]
+    first = summary.iloc[0]
+    assert Decimal(first["total"]) == Decimal(first["subtotal"]) + Decimal(first["tax_total"])
+    assert "3 invoice totals" in capsys.readouterr().out
+
+
+def test_cli_saved_lines(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    pytest.importorskip("pyarrow")
+    jobs = tmp_path / "jobs.csv"
+    shutil.copy(SAMPLE, jobs)
+    saved = tmp_path / "jobs.parquet"
+    assert main(["validate", "--in", str(jobs), "--save-lines", str(saved)]) == 0
+
+    # The saved lines give the same invoices as the CSV
+    totals = {}
+    for source in [jobs, saved]:
+        out = tmp_path / f"{source.suffix[1:]}.parquet"
+        argv = ["summary", "--in", str(source), "--client", str(CLIENT), "--summary", str(out)]
+        assert main(argv) == 0
+        totals[source.suffix] = read_invoice_summaries(out)
+
+    pd.testing.assert_frame_equal(totals[".csv"], totals[".parquet"])
+    assert isinstance(totals[".parquet"]["balance_due"].iloc[0], Decimal)
+
+
+def test_cli_save_lines_skipped_on_errors(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    jobs = tmp_path / "jobs.csv"
+    jobs.write_text(SAMPLE.read_text().replace("11/16/2024,Hill", "13/16/2024,Hill", 1))
+    saved = tmp_path / "jobs.parquet"
+
+    assert main(["validate", "--in", str(jobs), "--save-lines", str(saved)]) == 1
+    assert not saved.exists()
+    assert "nothing saved" in capsys.readouterr().out
@@ -0,0 +1,62 @@
+import os
+import shutil
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from invoicegen.config import load_config, reload_config
+from invoicegen.config.models import CONFIG_DIR, CONFIG_FILES
+
+
+@pytest.fixture()
+def config_dir(tmp_path: Path) -> Path:
+    for name in CONFIG_FILES:
+        shutil.copy(CONFIG_DIR / name, tmp_path / name)
+    return tmp_path
+
+
+def edit(path: Path, old: str, new: str) -> None:
+    # Moves the modification time on, which file systems with coarse timestamps may not do
+    stat = path.stat()
+    path.write_text(path.read_text().replace(old, new))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_config_dir_is_used(config_dir: Path) -> None:
+    edit(config_dir / "invoicegen.yaml", '"INV-"', '"EST-"')
+
+    assert load_config(config_dir).invoice_prefix == "EST-"
+    assert load_config().invoice_prefix == "INV-"
+
+
+def test_copies_are_independent(config_dir: Path) -> None:
+    first = load_config(config_dir)
+    first.sequence_start = Decimal("42")
+    first.business_info.name = "Changed"
+
+    second = load_config(config_dir)
+    assert second.sequence_start == 1
+    assert second.business_info.name == "Forma Construction"
+
+
+def test_edits_are_picked_up(config_dir: Path) -> None:
+    assert load_config(config_dir).tax_rate == Decimal("0.0725")
+
+    edit(config_dir / "invoicegen.yaml", "0.0725", "0.08")
+    assert load_config(config_dir).tax_rate == Decimal("0.08")
+
+    edit(config_dir / "business.yaml", "Forma", "Other")
+    assert load_config(config_dir).business_info.name == "Other Construction"
+
+
+def test_reload(config_dir: Path) -> None:
+    path = config_dir / "invoicegen.yaml"
+    load_config(config_dir)
+    # An edit that leaves the size and modification time as they were
+    stat = path.stat()
+    path.write_text(path.read_text().replace('"INV-"', '"EST-"'))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert load_config(config_dir).invoice_prefix == "INV-"
+    assert reload_config(config_dir).invoice_prefix == "EST-"
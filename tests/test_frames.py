@@ -0,0 +1,75 @@
+import warnings
+from pathlib import Path
+
+import pytest
+
+from invoicegen.io import CSVWarning, RowError, read_joblines
+from invoicegen.io.frames import read_frames
+
+HEADER = "Date,Address,Technician,Unit,Description,Unit Price,Quantity,Total,Paid\n"
+
+ROWS = [
+    "11/1/2024,Elderwood,Bob,A,Fix sink.,100,1,100,TRUE",
+    "",
+    ",,,,,,,,",
+    "13/1/2024,,Bob,A,Fix sink.,$$,1,100,TRUE",
+    '2/29/2023, Hill ,Ann, B ,  Paint.  ,"$1,250.50",0.5,625.25,false',
+    "2/29/2024,Hill,Ann,B,Paint.,80,2,150,False",
+    "2024-01-01,Hill,Ann,,Paint.,.5,abc,,yes",
+    "1/1/0000,Hill,Ann,C," + "x" * 2001 + ",1,1,1,true",
+    ",,Ann,,,,,,",
+    "00/10/2024,Oak,Ann,D,Fix.,  $ 12,3,36,TRUE",
+    "1/5/2024,Oak,Ann,D,Fix.,\t12\t,3,36,TRUE",
+    "1/٣/2024,Oak,Ann,D,Fix.,12,3,36,TRUE",
+]
+
+
+@pytest.fixture()
+def mixed_csv(tmp_path: Path) -> Path:
+    path = tmp_path / "mixed.csv"
+    path.write_text(HEADER + "\n".join(ROWS) + "\n", encoding="utf-8")
+    return path
+
+
+def collect(path: Path, engine: str) -> tuple[list, list[RowError], list[str]]:
+    errors: list[RowError] = []
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        lines = list(read_joblines(path, chunk_size=4, on_error=errors.append, engine=engine))  # type: ignore[arg-type]
+    notices = [str(w.message) for w in caught if issubclass(w.category, CSVWarning)]
+    return lines, errors, notices
+
+
+def test_engines_agree(mixed_csv: Path) -> None:
+    py_lines, py_errors, py_notices = collect(mixed_csv, "python")
+    pd_lines, pd_errors, pd_notices = collect(mixed_csv, "pandas")
+
+    assert pd_lines == py_lines
+    assert pd_errors == py_errors
+    assert pd_notices == py_notices
+
+
+@pytest.mark.filterwarnings("ignore::invoicegen.io.CSVWarning")
+def test_columnar_result(mixed_csv: Path) -> None:
+    results = list(read_frames(mixed_csv, chunk_size=100))
+
+    assert len(results) == 1
+    frame = results[0].frame
+    assert frame.index.tolist() == [2, 7, 12]
+    assert frame["address"].tolist() == ["Elderwood", "Hill", "Oak"]
+    assert frame["paid"].tolist() == [True, False, True]
+    assert {error.source_row for error in results[0].errors} == {5, 6, 8, 9, 10, 11, 13}
+
+
+@pytest.mark.parametrize("engine", ["pandas", "mmap"])
+def test_extra_fields_ignored(tmp_path: Path, engine: str) -> None:
+    path = tmp_path / "extra.csv"
+    rows = [ROWS[0], ROWS[0] + ",extra,fields", ROWS[0]]
+    path.write_text(HEADER + "\n".join(rows) + "\n", encoding="utf-8")
+
+    py_lines, py_errors, _ = collect(path, "python")
+    lines, errors, _ = collect(path, engine)
+
+    assert [line.source_row for line in py_lines] == [2, 3, 4]
+    assert lines == py_lines
+    assert errors == py_errors == []
@@ -4,7 +4,16 @@ import pytest
 
 from invoicegen.config import InvoiceConfig, load_config
 from invoicegen.core import build_invoices
-from invoicegen.models import Address, ClientInfo, Invoice, InvoiceHeader, InvoiceMeta, JobLine
+from invoicegen.core.grouping import group_batch, group_lines
+from invoicegen.models import (
+    Address,
+    ClientInfo,
+    Invoice,
+    InvoiceHeader,
+    InvoiceMeta,
+    JobLine,
+    JobLineBatch,
+)
 
 
 @pytest.fixture()
@@ -147,9 +156,7 @@ def base_header() -> InvoiceHeader:
 
 @pytest.fixture()
 def base_invoice_list(base_header: InvoiceHeader) -> list[Invoice]:
-    header1 = base_header
-    header1.meta.number = "INV-202411-0001"
-    header1.client.project_name = "Elderwood"
+    header1 = base_header.for_invoice("INV-202411-0001", "Elderwood")
     job_list1 = [
         JobLine.model_validate(
             {
@@ -198,9 +205,7 @@ def base_invoice_list(base_header: InvoiceHeader) -> list[Invoice]:
     ]
     invoice1 = Invoice(header=header1, lines=job_list1, currency="$", tax_rate=Decimal("0.0725"))
 
-    header2 = base_header
-    header2.meta.number = "INV-202502-0002"
-    header2.client.project_name = "Elizabeth"
+    header2 = base_header.for_invoice("INV-202502-0002", "Elizabeth")
     job_list2 = [
         JobLine.model_validate(
             {
@@ -238,9 +243,7 @@ def base_invoice_list(base_header: InvoiceHeader) -> list[Invoice]:
     ]
     invoice2 = Invoice(header=header2, lines=job_list2, currency="$", tax_rate=Decimal("0.0725"))
 
-    header3 = base_header
-    header3.meta.number = "INV-202411-0003"
-    header3.client.project_name = "Hill"
+    header3 = base_header.for_invoice("INV-202411-0003", "Hill")
     job_list3 = [
         JobLine.model_validate(
             {
@@ -291,3 +294,69 @@ def test_invoice_generation(
     print(base_invoice_list)
     print(invoice_list)
     assert invoice_list == base_invoice_list
+
+
+def test_invoice_generation_from_batch(
+    base_job_lines: list[JobLine],
+    base_header: InvoiceHeader,
+    base_config: InvoiceConfig,
+) -> None:
+    from_lines = build_invoices(base_job_lines, base_header, base_config.model_copy())
+    from_batch = build_invoices(
+        JobLineBatch.from_joblines(base_job_lines), base_header, base_config.model_copy()
+    )
+
+    assert from_batch == from_lines
+
+
+# Test each group keeps file order for lines on the same date
+def test_group_lines_sorted_by_date(base_job_lines: list[JobLine]) -> None:
+    groups = group_lines(base_job_lines)
+
+    assert list(groups) == ["Elderwood", "Elizabeth", "Hill"]
+    assert [line.source_row for line in groups["Elderwood"]] == [2, 4, 3, 5]
+    for lines in groups.values():
+        assert lines == sorted(lines, key=lambda line: line.dates)
+
+
+def test_group_lines_by_unit(base_job_lines: list[JobLine]) -> None:
+    groups = group_lines(base_job_lines, "unit")
+
+    assert list(groups)[:3] == [("Elderwood", "A"), ("Elderwood", "Single"), ("Elizabeth", "G")]
+    assert [line.source_row for line in groups[("Elderwood", "Single")]] == [4, 3, 5]
+    assert [line.source_row for line in groups[("Hill", "A")]] == [9, 8]
+
+
+def test_group_batch_by_unit(base_job_lines: list[JobLine]) -> None:
+    batch = JobLineBatch.from_joblines(base_job_lines)
+
+    assert group_batch(batch, "unit") == group_lines(base_job_lines, "unit")
+
+
+def test_invoice_per_unit(
+    base_job_lines: list[JobLine],
+    base_header: InvoiceHeader,
+    base_config: InvoiceConfig,
+) -> None:
+    config = base_config.model_copy(update={"group_by": "unit"})
+    invoices = build_invoices(base_job_lines, base_header, config)
+
+    assert len(invoices) == len(group_lines(base_job_lines, "unit"))
+    assert {line.unit for line in invoices[1].lines} == {"Single"}
+
+
+def test_template_header_untouched(
+    base_job_lines: list[JobLine],
+    base_header: InvoiceHeader,
+    base_config: InvoiceConfig,
+) -> None:
+    invoices = build_invoices(base_job_lines, base_header, base_config)
+    headers = [invoice.header for invoice in invoices]
+
+    assert base_header.meta.number == "Placeholder"
+    assert base_header.client.project_name is None
+    assert [header.client.project_name for header in headers] == ["Elderwood", "Elizabeth", "Hill"]
+    assert len({header.meta.number for header in headers}) == len(headers)
+    # Only meta and client are copied
+    assert all(header.business is base_header.business for header in headers)
+    assert all(header.client.address is base_header.client.address for header in headers)
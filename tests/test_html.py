@@ -0,0 +1,102 @@
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from invoicegen.cli import main
+from invoicegen.config import load_client, load_config
+from invoicegen.models import Invoice, InvoiceHeader, InvoiceMeta, JobLine
+from invoicegen.render import HTMLRenderer
+from invoicegen.render.html import money, output_name
+
+SAMPLES = Path(__file__).parents[1] / "samples"
+
+
+@pytest.fixture()
+def invoice() -> Invoice:
+    header = InvoiceHeader(
+        business=load_config().business_info,
+        client=load_client(SAMPLES / "client.yaml"),
+        meta=InvoiceMeta.model_validate({"number": "INV-202411/0001", "start_date": "11/30/2024"}),
+    )
+    line = JobLine.model_validate(
+        {
+            "dates": "11/1/2024",
+            "address": "Elderwood",
+            "unit": "A",
+            "description": "Replace <b>valve</b> & seal.",
+            "rate": "1250.5",
+            "qty": "2",
+            "source_row": 2,
+        }
+    )
+    return Invoice(header=header, lines=[line], currency="$", tax_rate=Decimal("0"))
+
+
+@pytest.fixture()
+def renderer(tmp_path: Path) -> HTMLRenderer:
+    return HTMLRenderer(cache_dir=tmp_path / "cache")
+
+
+def test_render_escapes_and_formats(invoice: Invoice, renderer: HTMLRenderer) -> None:
+    html = renderer.render(invoice)
+
+    assert "Replace &lt;b&gt;valve&lt;/b&gt; &amp; seal." in html
+    assert "$2,501.00" in html
+    assert "11/30/2024" in html
+    assert "Elm Property Management" in html
+
+
+def test_render_to_matches_render(invoice: Invoice, renderer: HTMLRenderer, tmp_path: Path) -> None:
+    path = renderer.render_to(invoice, tmp_path / "out.html")
+
+    assert path.read_text(encoding="utf-8") == renderer.render(invoice)
+    assert renderer.timings.count == 1
+
+
+def test_render_all_names_files_by_number(
+    invoice: Invoice, renderer: HTMLRenderer, tmp_path: Path
+) -> None:
+    paths = renderer.render_all([invoice], tmp_path / "out")
+
+    assert [path.name for path in paths] == ["INV-202411_0001.html"]
+    assert output_name(invoice, ".pdf") == "INV-202411_0001.pdf"
+
+
+def test_bytecode_cache_written(invoice: Invoice, tmp_path: Path) -> None:
+    HTMLRenderer(cache_dir=tmp_path / "cache").render(invoice)
+
+    # One entry each for invoice.html, the base.html it extends and the stylesheet
+    templates = ["invoice.html", "base.html", "invoice.css"]
+    assert len(list((tmp_path / "cache").iterdir())) == len(templates)
+    assert HTMLRenderer(cache_dir=tmp_path / "cache").render(invoice)
+
+
+def test_money() -> None:
+    assert money(Decimal("1234.5"), "USD$") == "USD$1,234.50"
+    assert money(None) == "0.00"
+
+
+def test_cli_preview(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    code = main(
+        [
+            "preview",
+            "--in",
+            str(SAMPLES / "october.csv"),
+            "--client",
+            str(SAMPLES / "client.yaml"),
+            "--out",
+            str(tmp_path / "preview"),
+        ]
+    )
+
+    assert code == 0
+    assert sorted(path.name for path in (tmp_path / "preview").iterdir()) == [
+        "INV-202411-0001.html",
+        "INV-202411-0003.html",
+        "INV-202502-0002.html",
+    ]
+    assert "[invoicegen] preview: 3 invoices" in capsys.readouterr().out
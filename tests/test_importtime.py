@@ -0,0 +1,83 @@
+import subprocess
+import sys
+from importlib.metadata import version
+
+import pytest
+
+# Microseconds the package may spend importing for `invoicegen --version`; it takes about a
+# fifth of that, so only a heavy dependency coming back fails the test
+VERSION_BUDGET_US = 100_000
+HEAVY_MODULES = ["pydantic", "pandas", "numpy", "jinja2", "weasyprint", "yaml"]
+
+
+def import_times(*args: str) -> dict[str, int]:
+    """Run Python with -X importtime and return cumulative microseconds per top-level import."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.rstrip()] = int(cumulative)
+    return times
+
+
+def loaded_modules(code: str) -> set[str]:
+    proc = subprocess.run(
+        [sys.executable, "-c", f"{code}\nimport sys\nprint(' '.join(sys.modules))"],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return set(proc.stdout.split())
+
+
+def test_version_import_budget() -> None:
+    times = import_times("-m", "invoicegen", "--version")
+
+    # Only top-level lines ("| name" with a single space) hold the whole cost of an import
+    package = sum(
+        cumulative
+        for name, cumulative in times.items()
+        if name.startswith(" invoicegen") and not name.startswith("  ")
+    )
+    assert package <= VERSION_BUDGET_US
+
+    imported = {name.strip() for name in times}
+    assert sorted(imported & set(HEAVY_MODULES)) == []
+
+
+@pytest.mark.parametrize(
+    ("code", "heavy"),
+    [
+        ("import invoicegen", [*HEAVY_MODULES, "importlib.metadata"]),
+        (
+            # The version is only read for --version
+            "from invoicegen.cli import build_parser\n"
+            "build_parser().parse_args(['validate', '--in', 'jobs.csv'])",
+            ["importlib.metadata"],
+        ),
+        ("from invoicegen.io.parallel import validate_file", ["pandas", "jinja2", "weasyprint"]),
+        ("from invoicegen.render.cache import render_cached", ["pandas", "weasyprint"]),
+    ],
+)
+def test_heavy_dependencies_stay_unloaded(code: str, heavy: list[str]) -> None:
+    assert sorted(loaded_modules(code) & set(heavy)) == []
+
+
+def test_lazy_exports() -> None:
+    import invoicegen  # noqa: PLC0415
+    from invoicegen.models import JobLine  # noqa: PLC0415
+
+    assert invoicegen.JobLine is JobLine
+    assert invoicegen.__version__ == version("invoicegen")
+    assert "Invoice" in dir(invoicegen)
+    with pytest.raises(AttributeError):
+        _ = invoicegen.Missing
@@ -0,0 +1,195 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from invoicegen.cli import main
+from invoicegen.config import InvoiceConfig, load_client, load_config
+from invoicegen.core.incremental import STATE_VERSION, IncrementalRun, RunState, diff_rows
+from invoicegen.io import RowError
+from invoicegen.models import Invoice, InvoiceHeader, InvoiceMeta
+
+SAMPLES = Path(__file__).parents[1] / "samples"
+SAMPLE = SAMPLES / "october.csv"
+
+
+@pytest.fixture()
+def config() -> InvoiceConfig:
+    return load_config()
+
+
+@pytest.fixture()
+def header(config: InvoiceConfig) -> InvoiceHeader:
+    return InvoiceHeader(
+        business=config.business_info,
+        client=load_client(SAMPLES / "client.yaml"),
+        meta=InvoiceMeta(number="DRAFT"),
+    )
+
+
+@pytest.fixture()
+def jobs_csv(tmp_path: Path) -> Path:
+    path = tmp_path / "jobs.csv"
+    path.write_text(SAMPLE.read_text())
+    return path
+
+
+def edit(path: Path, old: str, new: str) -> None:
+    text = path.read_text()
+    assert old in text
+    path.write_text(text.replace(old, new, 1))
+
+
+def invoice_run(
+    path: Path, state: RunState, header: InvoiceHeader, config: InvoiceConfig
+) -> tuple[IncrementalRun, dict[str, Invoice], RunState]:
+    run = IncrementalRun(path, state, "project")
+    errors: list[RowError] = []
+    invoices = run.build(run.validate(errors.append), header, config)
+    assert errors == []
+
+    state = run.state({key: invoice.header.meta.number for key, invoice in invoices.items()})
+    return run, {str(key): invoice for key, invoice in invoices.items()}, state
+
+
+def test_diff_rows() -> None:
+    diff = diff_rows({2: "a", 3: "b", 4: "c"}, {2: "a", 3: "x", 5: "d"})
+    assert (diff.added, diff.changed, diff.removed) == ([5], [3], [4])
+
+
+def test_first_run_builds_everything(
+    jobs_csv: Path, header: InvoiceHeader, config: InvoiceConfig
+) -> None:
+    run, invoices, _ = invoice_run(jobs_csv, RunState(), header, config)
+
+    assert run.affected == ["Elderwood", "Elizabeth", "Hill"]
+    assert [invoice.header.meta.number for invoice in invoices.values()] == [
+        "INV-202411-0001",
+        "INV-202502-0002",
+        "INV-202411-0003",
+    ]
+
+
+def test_state_round_trip(
+    jobs_csv: Path, header: InvoiceHeader, config: InvoiceConfig, tmp_path: Path
+) -> None:
+    _, _, state = invoice_run(jobs_csv, RunState(), header, config)
+    state.save(tmp_path / "state.json")
+
+    assert RunState.load(tmp_path / "state.json") == state
+    assert RunState.load(tmp_path / "missing.json") == RunState()
+
+
+@pytest.mark.parametrize(
+    ("changes", "message"),
+    [
+        ({"rows": None}, "missing 'rows'"),
+        ({"groups": [{"key": "Hill"}]}, "missing 'digest'"),
+        ({"rows": []}, "has no attribute 'items'"),
+        ({"groups": 5}, "not iterable"),
+        ({"rows": {"two": "x"}}, "invalid literal"),
+    ],
+)
+def test_bad_state(tmp_path: Path, changes: dict[str, object], message: str) -> None:
+    data = {"version": STATE_VERSION, "context": "", "rows": {}, "groups": [], "next_sequence": 1}
+    data.update(changes)
+    path = tmp_path / "state.json"
+    path.write_text(json.dumps({key: value for key, value in data.items() if value is not None}))
+
+    with pytest.raises(ValueError, match=f"Cannot read incremental state .*{message}"):
+        RunState.load(path)
+
+
+def test_unchanged_file_rebuilds_nothing(
+    jobs_csv: Path, header: InvoiceHeader, config: InvoiceConfig
+) -> None:
+    _, _, state = invoice_run(jobs_csv, RunState(), header, config)
+    run, invoices, _ = invoice_run(jobs_csv, state, header, config)
+
+    assert run.affected == []
+    assert invoices == {}
+    assert [len(run.diff.added), len(run.diff.changed), len(run.diff.removed)] == [0, 0, 0]
+
+
+def test_changed_row_rebuilds_its_project_only(
+    jobs_csv: Path, header: InvoiceHeader, config: InvoiceConfig
+) -> None:
+    _, before, state = invoice_run(jobs_csv, RunState(), header, config)
+    edit(jobs_csv, "Unclog sink.,80,1,80", "Unclog sink.,80,2,160")
+    run, after, _ = invoice_run(jobs_csv, state, header, config)
+
+    assert run.diff.changed == [6]
+    assert list(after) == ["Elizabeth"]
+    # Same number, new totals
+    assert after["Elizabeth"].header.meta.number == before["Elizabeth"].header.meta.number
+    assert [after["Elizabeth"].subtotal] == [(before["Elizabeth"].subtotal or 0) + 80]
+
+
+def test_inserted_row_keeps_other_projects(
+    jobs_csv: Path, header: InvoiceHeader, config: InvoiceConfig
+) -> None:
+    _, _, state = invoice_run(jobs_csv, RunState(), header, config)
+    edit(
+        jobs_csv,
+        "11/15/2024,Elizabeth",
+        "11/2/2024,Elderwood,A,Extra.,10,1,10,FALSE\n11/15/2024,Elizabeth",
+    )
+    run, after, _ = invoice_run(jobs_csv, state, header, config)
+
+    # Every row after the insert moved down, but only Elderwood has different content
+    assert run.diff.added == [15]
+    assert list(after) == ["Elderwood"]
+    assert after["Elderwood"].header.meta.number == "INV-202411-0001"
+
+
+def test_new_and_removed_projects(
+    jobs_csv: Path, header: InvoiceHeader, config: InvoiceConfig
+) -> None:
+    _, _, state = invoice_run(jobs_csv, RunState(), header, config)
+    text = jobs_csv.read_text().replace(",Hill,", ",Oak,")
+    jobs_csv.write_text(text)
+    run, after, state = invoice_run(jobs_csv, state, header, config)
+
+    assert list(run.removed) == ["Hill"]
+    # New projects continue the sequence of the previous run
+    assert after["Oak"].header.meta.number == "INV-202411-0004"
+    assert "Hill" not in state.groups
+
+
+def test_invalid_project_is_checked_again(jobs_csv: Path) -> None:
+    edit(jobs_csv, "11/16/2024,Hill", "13/16/2024,Hill")
+    run = IncrementalRun(jobs_csv, RunState(), "project", "validate")
+    errors: list[RowError] = []
+    run.validate(errors.append)
+
+    assert [error.source_row for error in errors] == [11]
+    assert run.valid_groups(errors) == ["Elderwood", "Elizabeth"]
+
+    state = run.state(dict.fromkeys(run.valid_groups(errors)))
+    assert IncrementalRun(jobs_csv, state, "project", "validate").affected == ["Hill"]
+
+
+def test_context_change_rebuilds_with_same_numbers(
+    jobs_csv: Path, header: InvoiceHeader, config: InvoiceConfig
+) -> None:
+    _, before, state = invoice_run(jobs_csv, RunState(), header, config)
+    run = IncrementalRun(jobs_csv, state, "project", "new templates")
+    after = run.build(run.validate(print), header, config)
+
+    assert run.affected == ["Elderwood", "Elizabeth", "Hill"]
+    assert [invoice.header.meta.number for invoice in after.values()] == [
+        invoice.header.meta.number for invoice in before.values()
+    ]
+
+
+def test_cli_validate_incremental(jobs_csv: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    assert main(["validate", "--in", str(jobs_csv), "--incremental"]) == 0
+    edit(jobs_csv, "Repair leak.", "Repair big leak.")
+    assert main(["validate", "--in", str(jobs_csv), "--incremental"]) == 0
+
+    out = capsys.readouterr().out.splitlines()
+    assert out[-2] == f"[invoicegen] validate: 13 valid, 0 invalid ({jobs_csv})"
+    assert out[-1] == (
+        "[invoicegen] incremental: 0 added, 1 changed, 0 removed rows; "
+        "1 of 3 groups rebuilt, 0 removed"
+    )
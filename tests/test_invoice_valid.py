@@ -105,3 +105,73 @@ def test_valid_invoice(base_invoice: dict) -> None:
     assert i.total == Decimal("384.29")
     assert i.amount_paid == Decimal("25")
     assert i.balance_due == Decimal("359.29")
+
+
+def test_from_trusted_invoice(base_invoice: dict) -> None:
+    validated = Invoice(**base_invoice)
+    trusted = Invoice.from_trusted(**base_invoice)
+
+    assert trusted == validated
+    assert trusted.total == Decimal("384.29")
+    assert trusted.balance_due == Decimal("359.29")
+
+
+def test_from_trusted_invoice_needs_lines(base_invoice: dict) -> None:
+    with pytest.raises(ValueError, match="Job Lines are empty"):
+        Invoice.from_trusted(**{**base_invoice, "lines": []})
+
+
+def totals(invoice: Invoice) -> list[Decimal | None]:
+    return [
+        invoice.subtotal,
+        invoice.tax_total,
+        invoice.total,
+        invoice.amount_paid,
+        invoice.balance_due,
+    ]
+
+
+def test_incremental_updates_match_recompute(
+    base_invoice: dict, jobline_list: list, payment_list: list
+) -> None:
+    invoice = Invoice(**{**base_invoice, "lines": jobline_list[:1], "payments": None})
+
+    for line in jobline_list[1:]:
+        invoice.add_line(line)
+    for payment in payment_list:
+        invoice.add_payment(payment)
+    assert totals(invoice) == totals(Invoice(**base_invoice))
+
+    removed = invoice.remove_line(0)
+    assert removed is jobline_list[0]
+    expected = Invoice(**{**base_invoice, "lines": jobline_list[1:]})
+    assert totals(invoice) == totals(expected)
+    assert invoice.lines == expected.lines
+
+
+def test_incremental_tax_rounding(base_invoice: dict) -> None:
+    # Tax is worked out on the whole subtotal, not added up per line
+    line = JobLine.model_validate(
+        {
+            "address": "Oak",
+            "unit": "C",
+            "dates": "10/3/2025",
+            "description": "Odd rate.",
+            "qty": "0.333",
+            "rate": "17.17",
+            "source_row": 5,
+        }
+    )
+    invoice = Invoice(**{**base_invoice, "lines": [line]})
+    for _ in range(6):
+        invoice.add_line(line)
+
+    assert totals(invoice) == totals(Invoice(**{**base_invoice, "lines": [line] * 7}))
+
+
+def test_remove_only_line(base_invoice: dict, jobline_list: list) -> None:
+    invoice = Invoice(**{**base_invoice, "lines": jobline_list[:1]})
+
+    with pytest.raises(ValueError, match="only job line"):
+        invoice.remove_line()
+    assert invoice.lines == jobline_list[:1]
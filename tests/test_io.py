@@ -0,0 +1,104 @@
+from collections.abc import Callable
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from invoicegen.io import CSVWarning, RowError, read_jobline_chunks, read_joblines
+
+HEADER = "Date,Address,Unit,Description,Unit Price,Quantity,Total,Paid\n"
+
+
+@pytest.fixture()
+def write_csv(tmp_path: Path) -> Callable[..., Path]:
+    def _write(body: str, header: str = HEADER) -> Path:
+        path = tmp_path / "jobs.csv"
+        path.write_text(header + body, encoding="utf-8")
+        return path
+
+    return _write
+
+
+def test_reads_sample_file() -> None:
+    path = Path(__file__).parents[1] / "samples" / "october.csv"
+    lines = list(read_joblines(path))
+
+    assert [line.source_row for line in lines] == list(range(2, 15))
+    assert lines[0].dates == date(2024, 11, 1)
+    assert lines[0].paid is True
+    assert lines[0].line_total == Decimal("100.00")
+
+
+def test_blank_lines_skipped_but_counted(write_csv: Callable[..., Path]) -> None:
+    path = write_csv(
+        "11/1/2024,Elderwood,A,Fix sink.,100,1,100,TRUE\n"
+        "\n"
+        ",,,,,,,\n"
+        "11/2/2024,Hill,B,Fix door.,80,2,160,FALSE\n"
+    )
+    lines = list(read_joblines(path))
+
+    assert [line.source_row for line in lines] == [2, 5]
+
+
+def test_unknown_columns_ignored(write_csv: Callable[..., Path]) -> None:
+    header = "Date,Technician,Address,Unit,Description,Unit Price,Quantity,Paid\n"
+    path = write_csv("11/1/2024,Bob,Elderwood,A,Fix sink.,100,1.5,false\n", header)
+
+    with pytest.warns(CSVWarning, match="Unknown column: Technician"):
+        lines = list(read_joblines(path))
+
+    assert lines[0].address == "Elderwood"
+    assert lines[0].qty == Decimal("1.5")
+
+
+def test_total_mismatch_warns(write_csv: Callable[..., Path]) -> None:
+    path = write_csv("11/1/2024,Elderwood,A,Fix sink.,100,2,100,TRUE\n")
+
+    with pytest.warns(CSVWarning, match="Row 2: Total '100' does not match"):
+        lines = list(read_joblines(path))
+
+    assert lines[0].line_total == Decimal("200.00")
+
+
+def test_missing_column_raises(write_csv: Callable[..., Path]) -> None:
+    path = write_csv("11/1/2024,A,Fix sink.\n", "Date,Unit,Description\n")
+
+    with pytest.raises(ValueError, match="Missing required column"):
+        list(read_joblines(path))
+
+
+def test_errors_reported_per_field(write_csv: Callable[..., Path]) -> None:
+    path = write_csv(
+        "11/1/2024,Elderwood,A,Fix sink.,100,1,100,TRUE\n"
+        "13/1/2024,,A,Fix sink.,$$,1,100,TRUE\n"
+        "11/3/2024,Hill,A,Fix sink.,100,1,100,maybe\n"
+    )
+    errors: list[RowError] = []
+    lines = list(read_joblines(path, on_error=errors.append))
+
+    assert [line.source_row for line in lines] == [2]
+    assert errors == [
+        RowError(3, "address", "Address is empty, expected a value"),
+        RowError(3, "dates", "Invalid calendar date '13/1/2024' (MM/DD/YYYY)"),
+        RowError(3, "rate", "Rate is empty after removing symbols; provide a number"),
+        RowError(4, "paid", "Paid must be a string or boolean True or False"),
+    ]
+
+
+def test_first_error_raises_without_handler(write_csv: Callable[..., Path]) -> None:
+    path = write_csv("11/1/2024,Elderwood,A,,100,1,100,TRUE\n")
+
+    with pytest.raises(ValueError, match="Row 2: description: Description is empty"):
+        list(read_joblines(path))
+
+
+def test_chunks_are_bounded(write_csv: Callable[..., Path]) -> None:
+    body = "".join(f"11/{day}/2024,Elderwood,A,Fix sink.,100,1,100,TRUE\n" for day in range(1, 11))
+    path = write_csv(body)
+
+    chunks = list(read_jobline_chunks(path, chunk_size=3))
+
+    assert [len(chunk) for chunk in chunks] == [3, 3, 3, 1]
+    assert [chunk[0].source_row for chunk in chunks] == [2, 5, 8, 11]
@@ -148,3 +148,23 @@ def test_decimal_symbol_parsing(
     j = JobLine(**{**base_jobline, field: raw})
 
     assert getattr(j, field) == expected
+
+
+# Test the trusted path builds the same JobLine as validation
+def test_from_trusted_matches_validation(base_jobline: dict) -> None:
+    validated = JobLine(**base_jobline)
+    trusted = JobLine.from_trusted(
+        {
+            "address": "Elderwood",
+            "unit": "A",
+            "dates": date(2025, 10, 30),
+            "description": "Repaired leaking sink.",
+            "qty": Decimal("1.5"),
+            "rate": Decimal("80"),
+            "source_row": 2,
+        }
+    )
+
+    assert trusted == validated
+    assert trusted.line_total == Decimal("120.00")
+    assert trusted.model_fields_set == validated.model_fields_set | {"line_total", "paid"}
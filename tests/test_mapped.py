@@ -0,0 +1,100 @@
+import warnings
+from pathlib import Path
+
+import pytest
+
+from invoicegen.io import CSVWarning, RowError, mapped, read_joblines
+from invoicegen.io.joblines import iter_row_chunks
+from invoicegen.io.mapped import iter_mapped_chunks
+
+HEADER = "Date,Address,Technician,Unit,Description,Unit Price,Quantity,Total,Paid"
+TECHNICIAN = HEADER.split(",").index("Technician")
+
+ROWS = [
+    "11/1/2024,Elderwood,Bob,A,Fix sink.,100,1,100,TRUE",
+    "",
+    ",,,,,,,,",
+    ',,"Ann",,,,,,',
+    '11/2/2024,"Hill, East",Ann,B,"Paint ""blue"" walls.","$1,250.50",1,1250.50,false',
+    '11/3/2024,Hill,"Ann\nand Bob",B,"Two\nlines.",80,2,150,False',
+    "11/4/2024,Oak,Ann,C,Short row.,12,3",
+    '11/5/2024,Oak,Ann,D,Quote "inside".,12,3,36,TRUE,extra',
+    '11/6/2024,Oak,Ann,D,"Quoted"then,12,3,36,TRUE',
+    "13/1/2024,,Bob,A,Fix sink.,$$,1,100,TRUE",
+    "11/7/2024,Oak,Ann,D,Last row.,12,3,36,TRUE",
+]
+
+
+def collect(path: Path, engine: str) -> tuple[list, list[RowError], list[str]]:
+    errors: list[RowError] = []
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always")
+        lines = list(read_joblines(path, chunk_size=3, on_error=errors.append, engine=engine))  # type: ignore[arg-type]
+    notices = [str(w.message) for w in caught if issubclass(w.category, CSVWarning)]
+    return lines, errors, notices
+
+
+@pytest.mark.parametrize("newline", ["\n", "\r\n"])
+@pytest.mark.parametrize("encoding", ["utf-8", "utf-8-sig"])
+def test_engines_agree(tmp_path: Path, newline: str, encoding: str) -> None:
+    path = tmp_path / "jobs.csv"
+    path.write_bytes(newline.join([HEADER, *ROWS]).encode(encoding))
+
+    mapped = collect(path, "mmap")
+    assert mapped == collect(path, "python")
+    lines, errors, notices = mapped
+    assert [line.source_row for line in lines] == [2, 6, 7, 9, 10, 12]
+    assert [lines[1].address, lines[1].description] == ["Hill, East", 'Paint "blue" walls.']
+    assert lines[2].description == "Two\nlines."
+    # Row 5 is only blank in the columns JobLine uses, row 8 is short of Paid
+    assert sorted({error.source_row for error in errors}) == [5, 8, 11]
+    assert notices[0] == "Unknown column: Technician"
+
+
+@pytest.mark.parametrize("block_bytes", [1, 40, 100])
+def test_records_across_blocks(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, block_bytes: int
+) -> None:
+    # Quoted line breaks and blank lines land on either side of a block boundary
+    monkeypatch.setattr(mapped, "BLOCK_BYTES", block_bytes)
+    path = tmp_path / "jobs.csv"
+    path.write_text("\n".join([HEADER, *ROWS, *ROWS]) + "\n", encoding="utf-8")
+
+    assert collect(path, "mmap") == collect(path, "python")
+
+
+def test_same_chunks_as_csv_reader(tmp_path: Path) -> None:
+    path = tmp_path / "jobs.csv"
+    path.write_text("\n".join([HEADER, *ROWS]) + "\n", encoding="utf-8")
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", CSVWarning)
+        expected = list(iter_row_chunks(path, 4))
+        chunks = list(iter_mapped_chunks(path, 4))
+
+    assert [[number for number, _ in rows] for _, rows in chunks] == [
+        [number for number, _ in rows] for _, rows in expected
+    ]
+    # Technician is left out, the other cells are the same
+    columns, rows = chunks[0]
+    assert columns["unit"] == expected[0][0]["unit"] - 1
+    assert rows[0][1] == [
+        cell for index, cell in enumerate(expected[0][1][0][1]) if index != TECHNICIAN
+    ]
+
+
+@pytest.mark.filterwarnings("ignore::invoicegen.io.CSVWarning")
+def test_unused_columns_are_not_decoded(tmp_path: Path) -> None:
+    path = tmp_path / "jobs.csv"
+    path.write_bytes(f"{HEADER}\n".encode() + b"11/1/2024,Oak,\xff\xfe,D,Fix.,12,3,36,TRUE\n")
+
+    assert [line.address for line in read_joblines(path, engine="mmap")] == ["Oak"]
+    with pytest.raises(UnicodeDecodeError):
+        list(read_joblines(path))
+
+
+def test_empty_file(tmp_path: Path) -> None:
+    path = tmp_path / "jobs.csv"
+    path.write_bytes(b"")
+    with pytest.raises(ValueError, match="empty"):
+        list(read_joblines(path, engine="mmap"))
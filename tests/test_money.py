@@ -0,0 +1,94 @@
+from datetime import date
+from decimal import ROUND_HALF_UP, Decimal
+
+from hypothesis import given
+from hypothesis import strategies as st
+
+from invoicegen.models import JobLineBatch
+from invoicegen.models.invoice import q2
+from invoicegen.models.jobline import JobLine, round_line_total
+from invoicegen.models.money import (
+    apply_rate,
+    from_cents,
+    line_total_cents,
+    round_half_up,
+    sum_cents,
+    to_cents,
+)
+
+# Non-negative amounts with 0 to 6 places, from cents up to the millions
+amounts = st.builds(
+    lambda digits, places: Decimal(digits).scaleb(-places),
+    st.integers(min_value=0, max_value=10**10),
+    st.integers(min_value=0, max_value=6),
+)
+# Quantities and rates small enough for their line totals to fit a 64-bit batch column
+line_amounts = st.builds(
+    lambda digits, places: Decimal(digits).scaleb(-places),
+    st.integers(min_value=0, max_value=10**7),
+    st.integers(min_value=0, max_value=4),
+)
+# Tax rates the way Invoice stores them: the configured percentage divided by 100
+tax_rates = st.builds(
+    lambda digits, places: Decimal(digits).scaleb(-places) / 100,
+    st.integers(min_value=0, max_value=10**5),
+    st.integers(min_value=0, max_value=4),
+)
+
+
+def same(left: Decimal, right: Decimal) -> bool:
+    # Equal value, digits and exponent
+    return left.as_tuple() == right.as_tuple()
+
+
+@given(
+    st.integers(min_value=-(10**20), max_value=10**20), st.integers(min_value=1, max_value=10**6)
+)
+def test_round_half_up_matches_decimal(numerator: int, denominator: int) -> None:
+    expected = (Decimal(numerator) / Decimal(denominator)).quantize(
+        Decimal(1), rounding=ROUND_HALF_UP
+    )
+    assert round_half_up(numerator, denominator) == int(expected)
+
+
+@given(amounts)
+def test_cents_match_q2(value: Decimal) -> None:
+    assert same(from_cents(to_cents(value)), q2(value))
+
+
+@given(amounts, amounts)
+def test_line_total_matches_decimal(qty: Decimal, rate: Decimal) -> None:
+    assert same(from_cents(line_total_cents(qty, rate)), round_line_total(qty, rate))
+
+
+@given(st.integers(min_value=0, max_value=10**12), tax_rates)
+def test_tax_matches_decimal(cents: int, rate: Decimal) -> None:
+    subtotal = from_cents(cents)
+    assert same(from_cents(apply_rate(cents, rate)), q2(subtotal * rate))
+
+
+@given(st.lists(amounts, max_size=50))
+def test_sum_matches_decimal(values: list[Decimal]) -> None:
+    assert same(from_cents(sum_cents(values)), q2(sum(values, Decimal(0))))
+
+
+@given(st.lists(st.tuples(line_amounts, line_amounts), min_size=1, max_size=20))
+def test_batch_totals_match_joblines(pairs: list[tuple[Decimal, Decimal]]) -> None:
+    lines = [
+        JobLine.from_trusted(
+            {
+                "address": "Elderwood",
+                "unit": "A",
+                "dates": date(2024, 11, 1),
+                "description": "Repair.",
+                "qty": qty,
+                "rate": rate,
+                "source_row": row,
+            }
+        )
+        for row, (qty, rate) in enumerate(pairs, start=2)
+    ]
+    batch = JobLineBatch.from_joblines(lines)
+
+    expected = q2(sum((line.line_total or Decimal(0) for line in lines), Decimal(0)))
+    assert same(from_cents(batch.total_cents()), expected)
@@ -0,0 +1,150 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from invoicegen.config import InvoiceConfig, load_config
+from invoicegen.core import build_invoices
+from invoicegen.core.numbering import MemorySequence, SQLiteSequence, format_number
+from invoicegen.models import Address, ClientInfo, InvoiceHeader, InvoiceMeta, JobLine
+
+ALLOCATIONS = 60
+
+
+@pytest.fixture()
+def base_config() -> InvoiceConfig:
+    return load_config()
+
+
+@pytest.fixture()
+def base_header() -> InvoiceHeader:
+    client = ClientInfo(
+        name="John Doe",
+        address=Address(line1="1234 Main St.", city="City", state="CA", postal_code="12345"),
+    )
+    return InvoiceHeader(
+        business=load_config().business_info, meta=InvoiceMeta(number="Placeholder"), client=client
+    )
+
+
+@pytest.fixture()
+def job_lines() -> list[JobLine]:
+    rows = [
+        ("11/1/2024", "Elderwood", "A"),
+        ("11/8/2024", "Elderwood", "Single"),
+        ("12/2/2024", "Hill", "A"),
+        ("11/16/2024", "Elderwood", "A"),
+    ]
+    return [
+        JobLine.model_validate(
+            {
+                "dates": dates,
+                "address": address,
+                "unit": unit,
+                "description": "Repair.",
+                "rate": 80,
+                "qty": 1,
+                "source_row": row,
+            }
+        )
+        for row, (dates, address, unit) in enumerate(rows, start=2)
+    ]
+
+
+@pytest.mark.parametrize(
+    "pattern, expected",
+    [
+        ("ym_seq", "INV-202411-0007"),
+        ("ym_unit_seq", "INV-2024-11-B-0007"),
+        ("simple_seq", "INV-0007"),
+    ],
+)
+def test_format_number(pattern: str, expected: str, base_config: InvoiceConfig) -> None:
+    config = base_config.model_copy(update={"invoice_pattern": pattern})
+
+    assert format_number(config, 7, date(2024, 11, 30), "B") == expected
+
+
+@pytest.mark.parametrize(
+    "pattern, expected",
+    [
+        ("ym_seq", ["INV-202411-0001", "INV-202412-0002"]),
+        ("ym_unit_seq", ["INV-2024-11-A-0001", "INV-2024-11-Single-0002", "INV-2024-12-A-0003"]),
+        ("simple_seq", ["INV-0001", "INV-0002"]),
+    ],
+)
+def test_every_pattern_builds_invoices(
+    pattern: str,
+    expected: list[str],
+    job_lines: list[JobLine],
+    base_header: InvoiceHeader,
+    base_config: InvoiceConfig,
+) -> None:
+    config = base_config.model_copy(update={"invoice_pattern": pattern})
+    invoices = build_invoices(job_lines, base_header, config)
+
+    assert [invoice.header.meta.number for invoice in invoices] == expected
+    assert config.sequence_start == Decimal(len(expected) + 1)
+
+
+def test_memory_sequence_counts() -> None:
+    sequence = MemorySequence(5)
+
+    assert [sequence.next() for _ in range(3)] == [5, 6, 7]
+
+
+def test_sqlite_blocks_do_not_overlap(tmp_path: Path) -> None:
+    first = SQLiteSequence(tmp_path / "seq.db", block_size=10)
+    second = SQLiteSequence(tmp_path / "seq.db", block_size=10)
+
+    assert [first.next() for _ in range(3)] == [1, 2, 3]
+    assert [second.next() for _ in range(12)] == [*range(11, 21), 21, 22]
+    assert [first.next()] == [4]
+
+
+def test_sqlite_release_returns_unused_tail(tmp_path: Path) -> None:
+    first = SQLiteSequence(tmp_path / "seq.db", start=100, block_size=10)
+    first.next()
+    first.release()
+
+    # The tail of a block is only returned while no one reserved after it
+    second = SQLiteSequence(tmp_path / "seq.db", block_size=10)
+    third = SQLiteSequence(tmp_path / "seq.db", block_size=10)
+    assert [second.next(), third.next()] == [101, 111]
+    second.release()
+    assert [SQLiteSequence(tmp_path / "seq.db").next()] == [121]
+
+
+def allocate(path: Path) -> list[int]:
+    sequence = SQLiteSequence(path, block_size=7)
+    numbers = [sequence.next() for _ in range(ALLOCATIONS)]
+    sequence.release()
+    return numbers
+
+
+def test_sqlite_unique_across_processes(tmp_path: Path) -> None:
+    path = tmp_path / "seq.db"
+    with ProcessPoolExecutor(max_workers=3) as pool:
+        results = list(pool.map(allocate, [path] * 6))
+
+    numbers = [number for result in results for number in result]
+    assert len(set(numbers)) == len(numbers)
+
+
+def test_build_invoices_with_shared_sequence(
+    tmp_path: Path,
+    job_lines: list[JobLine],
+    base_header: InvoiceHeader,
+    base_config: InvoiceConfig,
+) -> None:
+    config = base_config.model_copy(
+        update={"sequence_file": tmp_path / "seq.db", "invoice_pattern": "simple_seq"}
+    )
+
+    first = build_invoices(job_lines, base_header, config)
+    second = build_invoices(job_lines, base_header, config)
+
+    numbers = [invoice.header.meta.number for invoice in first + second]
+    assert numbers == ["INV-0001", "INV-0002", "INV-0003", "INV-0004"]
@@ -0,0 +1,123 @@
+import warnings
+from pathlib import Path
+
+import pytest
+
+from invoicegen.cli import main, warning_printer
+from invoicegen.io import RowError, read_joblines
+from invoicegen.io.parallel import plan_ranges, record_boundaries, validate_file
+
+HEADER = "Date,Address,Unit,Description,Unit Price,Quantity,Total,Paid\n"
+STRAY_QUOTE_ROW = 10
+
+
+@pytest.fixture()
+def jobs_csv(tmp_path: Path) -> Path:
+    rows = []
+    for number in range(60):
+        if number % 7 == 0:
+            rows.append("")
+        if number % 11 == 0:
+            # Quoted fields with commas, quotes and newlines must not be split between chunks
+            rows.append(
+                f'11/{number % 28 + 1}/2024,"Oak, ""North""",A,"Line one\nline two",80,1,,TRUE'
+            )
+        elif number % 13 == 0:
+            rows.append(f"13/{number % 28 + 1}/2024,Oak,,Fix.,80,1,,TRUE")
+        else:
+            rows.append(f"11/{number % 28 + 1}/2024,Elm,B,Fix {number}.,65.5,{number},,false")
+
+    path = tmp_path / "jobs.csv"
+    path.write_text(HEADER + "\n".join(rows) + "\n", encoding="utf-8")
+    return path
+
+
+def test_boundaries_skip_quoted_newlines(tmp_path: Path) -> None:
+    path = tmp_path / "quoted.csv"
+    path.write_bytes(b'a,b\n"x\ny",1\nz,2\n')
+
+    assert record_boundaries(path, [0, 5, 12, 100]) == [4, 12, 16, 16]
+
+
+def stray_quote_csv(path: Path, quoted_newlines: bool) -> Path:
+    rows = []
+    for number in range(2000):
+        if number == STRAY_QUOTE_ROW:
+            # A quote inside an unquoted field is kept as it is, and unbalances a quote count
+            rows.append('11/2/2024,Elm,B,Install 3/4" pipe,65.5,1,,false')
+        elif quoted_newlines and number % 50 == 0:
+            rows.append('11/3/2024,Oak,A,"Two\nlines",80,1,,TRUE')
+        else:
+            rows.append(f"11/{number % 28 + 1}/2024,Elm,B,Fix {number}.,65.5,1,,false")
+    path.write_text(HEADER + "\n".join(rows) + "\n", encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("quoted_newlines", [False, True], ids=["stray", "stray-and-quoted"])
+@pytest.mark.parametrize("jobs", [1, 2], ids=["inline", "pool"])
+def test_stray_quote(tmp_path: Path, jobs: int, quoted_newlines: bool) -> None:
+    path = stray_quote_csv(tmp_path / "jobs.csv", quoted_newlines)
+    expected = list(read_joblines(path))
+
+    report = validate_file(path, jobs=jobs, chunk_bytes=4000)
+
+    assert report.lines == expected
+    assert report.errors == []
+    assert report.rows == len(expected)
+    # Still split, rather than left to one range
+    assert len(plan_ranges(path, 4000)[1]) > 1
+
+
+@pytest.mark.parametrize("jobs", [1, 2], ids=["inline", "pool"])
+def test_matches_streaming_reader(jobs: int, jobs_csv: Path) -> None:
+    expected_errors: list[RowError] = []
+    expected = list(read_joblines(jobs_csv, on_error=expected_errors.append))
+
+    report = validate_file(jobs_csv, jobs=jobs, chunk_bytes=64)
+
+    assert report.lines == expected
+    assert report.errors == expected_errors
+    assert report.valid == len(expected)
+    assert report.rows == len(jobs_csv.read_text().splitlines()) - 1 - 6
+
+
+def test_keep_lines_off(jobs_csv: Path) -> None:
+    report = validate_file(jobs_csv, jobs=2, keep_lines=False, chunk_bytes=64)
+
+    assert report.lines == []
+    assert report.valid > 0
+
+
+def test_cli_validate(jobs_csv: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    code = main(["validate", "--in", str(jobs_csv), "--jobs", "2"])
+    out = capsys.readouterr().out
+
+    assert code == 1
+    assert "Invalid calendar date '13/14/2024'" in out
+    assert out.splitlines()[-1].startswith("[invoicegen] validate: ")
+
+
+def test_cli_validate_clean_file(capsys: pytest.CaptureFixture[str]) -> None:
+    sample = Path(__file__).parents[1] / "samples" / "october.csv"
+
+    assert main(["validate", "--in", str(sample)]) == 0
+    assert "13 valid, 0 invalid" in capsys.readouterr().out
+
+
+def test_cli_warnings(jobs_csv: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    jobs_csv.write_text(jobs_csv.read_text().replace("Paid", "Paid,Notes", 1))
+    hook = warnings.showwarning
+
+    main(["validate", "--in", str(jobs_csv)])
+
+    assert "[invoicegen] warning: Unknown column: Notes" in capsys.readouterr().err
+    assert warnings.showwarning is hook
+
+
+def test_other_warnings_passed_on() -> None:
+    shown: list[object] = []
+    show = warning_printer(lambda *args: shown.append(args))
+
+    show("old", DeprecationWarning, "x.py", 1)
+
+    assert shown == [("old", DeprecationWarning, "x.py", 1)]
@@ -0,0 +1,86 @@
+import re
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+import pytest
+
+from invoicegen.models.parsing import parse_date, parse_decimal
+
+
+def strptime_date(value: str) -> date | str:
+    # The rules the validators followed before the shared parser
+    if not re.fullmatch(r"\d{1,2}/\d{1,2}/\d{4}", value):
+        return "format"
+    try:
+        return datetime.strptime(value, "%m/%d/%Y").date()
+    except ValueError:
+        return "calendar"
+
+
+def shared_date(value: str) -> date | str:
+    try:
+        return parse_date(value)
+    except ValueError as e:
+        return "format" if "format" in str(e) else "calendar"
+
+
+# Test the shared date parser agrees with re + strptime
+@pytest.mark.parametrize(
+    "raw",
+    [
+        "10/30/2025",
+        "1/2/2024",
+        "01/02/2024",
+        "2/29/2024",
+        "2/29/2023",
+        "00/10/2024",
+        "10/00/2024",
+        "13/01/2024",
+        "10/31/0000",
+        "10/31/0001",
+        "10/31/24",
+        "100/1/2024",
+        "10-31-2024",
+        "10/31/2024/1",
+        "10//2024",
+        "١٠/٣٠/٢٠٢٤",
+        "1/1/٢٠٢٤",
+        "1/1٢/2024",
+        "1/2٢/2024",
+        "1/3٠/2024",
+        "1/٢/2024",
+        "٢/1/2024",
+        "1٢/1/2024",
+        "+1/2/2024",
+        " 1/2/2024",
+        "",
+    ],
+)
+def test_date_matches_strptime(raw: str) -> None:
+    assert shared_date(raw) == strptime_date(raw)
+
+
+# Test decimals keep their precision and labels show up in errors
+@pytest.mark.parametrize(
+    "raw, expected",
+    [("$1,250.50", Decimal("1250.50")), (" 65 ", Decimal("65")), (3, Decimal("3"))],
+)
+def test_decimal_parsed(raw: Any, expected: Decimal) -> None:
+    assert parse_decimal(raw, "Rate") == expected
+
+
+@pytest.mark.parametrize(
+    "raw, message",
+    [
+        (1.5, "Rate must not be a float"),
+        ("$", "Rate is empty after removing symbols"),
+        ("1e3", "Rate must be digits.decimals"),
+        (Decimal("Infinity"), "Rate must be a finite number"),
+        (-1, "Rate must be at least 0"),
+        ([1], "Rate must be a string, int, or decimal, got list"),
+    ],
+)
+def test_decimal_errors(raw: Any, message: str) -> None:
+    with pytest.raises(ValueError, match=re.escape(message)):
+        parse_decimal(raw, "Rate")
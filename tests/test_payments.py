@@ -0,0 +1,200 @@
+from decimal import Decimal
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from invoicegen import core
+from invoicegen.cli import main
+from invoicegen.config import load_client, load_config
+from invoicegen.core import build_invoices
+from invoicegen.core.payments import PaymentMatcher
+from invoicegen.io import RowError, read_joblines
+from invoicegen.io.payments import PaymentRow, read_payments
+from invoicegen.models import Invoice, InvoiceHeader, InvoiceMeta, Payment
+
+SAMPLES = Path(__file__).parents[1] / "samples"
+SAMPLE = SAMPLES / "october.csv"
+CLIENT = SAMPLES / "client.yaml"
+CLIENT_NAME = "Elm Property Management"
+HEADER = "Date,Amount,Invoice,Client,Project,Note"
+# Exit code of the CLI for errors other than invalid rows
+FAILED = 2
+
+
+@pytest.fixture()
+def invoices() -> list[Invoice]:
+    config = load_config()
+    header = InvoiceHeader(
+        business=config.business_info,
+        client=load_client(CLIENT),
+        meta=InvoiceMeta(number="DRAFT"),
+    )
+    return build_invoices(list(read_joblines(SAMPLE)), header, config)
+
+
+def balance(invoice: Invoice) -> Decimal:
+    assert invoice.balance_due is not None
+    return invoice.balance_due
+
+
+def payment(amount: str, source_row: int = 2, **match: str) -> PaymentRow:
+    paid = Payment.model_validate({"dates": "12/1/2024", "amount": amount})
+    return PaymentRow(source_row, paid, **match)
+
+
+def test_read_payments(tmp_path: Path) -> None:
+    path = tmp_path / "payments.csv"
+    rows = [
+        '12/1/2024,"$1,250.50",INV-1,,,Check 1001',
+        "",
+        "12/2/2024,80,, elm property management ,Hill,",
+        "13/2/2024,80,,,,",
+        "12/3/2024,-5,INV-2,,,",
+    ]
+    path.write_text("\n".join([HEADER, *rows]) + "\n")
+    errors: list[RowError] = []
+
+    payments = read_payments(path, on_error=errors.append)
+
+    assert [row.source_row for row in payments] == [2, 4]
+    assert payments[0].payment.amount == Decimal("1250.50")
+    assert payments[0].payment.note == "Check 1001"
+    assert [payments[0].invoice, payments[0].client] == ["INV-1", None]
+    assert [payments[1].client, payments[1].project] == ["elm property management", "Hill"]
+    assert [(error.source_row, error.field) for error in errors] == [(5, "dates"), (6, "amount")]
+
+
+def test_read_payments_needs_amount(tmp_path: Path) -> None:
+    path = tmp_path / "payments.csv"
+    path.write_text("Date,Invoice\n12/1/2024,INV-1\n")
+
+    with pytest.raises(ValueError, match="Missing required column"):
+        read_payments(path)
+
+
+def test_partial_payment_goes_to_oldest(invoices: list[Invoice]) -> None:
+    first, second = invoices[0], invoices[1]
+    partial = balance(first) - 1
+
+    report = PaymentMatcher(invoices).apply(
+        [payment(str(partial), client=CLIENT_NAME), payment("2", 3, client=CLIENT_NAME.upper())]
+    )
+
+    # The rest of the second payment goes to the next invoice
+    assert [(item.number, item.amount) for item in report.allocations] == [
+        (first.header.meta.number, partial),
+        (first.header.meta.number, Decimal("1.00")),
+        (second.header.meta.number, Decimal("1.00")),
+    ]
+    assert first.balance_due == 0
+    assert first.amount_paid == first.total
+    assert not report.unapplied
+
+
+def test_payment_by_number_and_project(invoices: list[Invoice]) -> None:
+    hill = invoices[2]
+    report = PaymentMatcher(invoices).apply(
+        [payment("10", invoice=hill.header.meta.number.lower()), payment("5", 3, project="hill")]
+    )
+
+    assert [item.number for item in report.allocations] == [hill.header.meta.number] * 2
+    assert hill.amount_paid == Decimal("15.00")
+    assert invoices[0].amount_paid == 0
+
+
+def test_overpayment_spills_to_client_then_unapplied(invoices: list[Invoice]) -> None:
+    hill = invoices[2]
+    owed = sum(balance(invoice) for invoice in invoices)
+
+    report = PaymentMatcher(invoices).apply(
+        [payment(str(owed + 7), invoice=hill.header.meta.number)]
+    )
+
+    # The named invoice first, then the client's others oldest first
+    assert [item.number for item in report.allocations] == [
+        invoice.header.meta.number for invoice in [hill, invoices[0], invoices[1]]
+    ]
+    assert all(invoice.balance_due == 0 for invoice in invoices)
+    assert [(item.amount, item.reason) for item in report.unapplied] == [
+        (Decimal("7.00"), "overpayment, the matched invoices are paid")
+    ]
+
+
+def test_unmatched_payments(invoices: list[Invoice]) -> None:
+    report = PaymentMatcher(invoices).apply(
+        [
+            payment("10", invoice="INV-404"),
+            payment("10", 3, client="Someone Else"),
+            payment("10", 4),
+        ]
+    )
+
+    assert not report.allocations
+    assert [item.reason for item in report.unapplied] == [
+        "unknown invoice INV-404",
+        "no open invoice",
+        "no invoice, client or project to match on",
+    ]
+    assert str(report.unapplied[0]) == "Row 2: 10.00 not applied: unknown invoice INV-404"
+
+
+def test_matches_recompute(invoices: list[Invoice]) -> None:
+    PaymentMatcher(invoices).apply(
+        [payment("33.33", row, client=CLIENT_NAME) for row in range(2, 40)]
+    )
+
+    for invoice in invoices:
+        rebuilt = Invoice.from_trusted(
+            invoice.header,
+            invoice.lines,
+            tax_rate=load_config().tax_rate,
+            payments=invoice.payments,
+        )
+        assert (invoice.amount_paid, invoice.balance_due) == (
+            rebuilt.amount_paid,
+            rebuilt.balance_due,
+        )
+
+
+def test_duplicate_numbers(invoices: list[Invoice]) -> None:
+    with pytest.raises(ValueError, match="appears twice"):
+        PaymentMatcher([*invoices, invoices[0]])
+
+
+def test_cli_summary_with_payments(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    payments = tmp_path / "payments.csv"
+    payments.write_text(f"{HEADER}\n12/1/2024,100,,,Hill,\n12/1/2024,5,INV-404,,,\n")
+    out = tmp_path / "totals.csv"
+
+    argv = ["summary", "--in", str(SAMPLE), "--client", str(CLIENT), "--summary", str(out)]
+    assert main([*argv, "--payments", str(payments)]) == 0
+
+    summary = pd.read_csv(out, dtype=str).set_index("project")
+    assert Decimal(summary.loc["Hill", "amount_paid"]) == Decimal("100")
+    assert Decimal(summary.loc["Elderwood", "amount_paid"]) == 0
+    printed = capsys.readouterr().out
+    assert "Row 3: 5.00 not applied: unknown invoice INV-404" in printed
+    assert "2 payments, 1 allocations" in printed
+
+
+@pytest.mark.parametrize(
+    "contents", [f"{HEADER}\n12/1/2024,lots,,,Hill,\n", None], ids=["invalid", "missing"]
+)
+def test_cli_payments_read_before_numbering(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, contents: str | None
+) -> None:
+    payments = tmp_path / "payments.csv"
+    if contents is not None:
+        payments.write_text(contents)
+
+    def no_numbers(*args: object) -> None:
+        raise AssertionError("invoice numbers drawn")
+
+    monkeypatch.setattr(core, "build_invoices", no_numbers)
+    argv = ["summary", "--in", str(SAMPLE), "--client", str(CLIENT)]
+    argv += ["--summary", str(tmp_path / "totals.csv"), "--payments", str(payments)]
+
+    # Invalid rows, or a file that cannot be read
+    assert main(argv) == (1 if contents is not None else FAILED)
+    assert not (tmp_path / "totals.csv").exists()
@@ -0,0 +1,116 @@
+from concurrent.futures import BrokenExecutor
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from invoicegen.config import load_client, load_config
+from invoicegen.models import Invoice, InvoiceHeader, InvoiceMeta, JobLine
+from invoicegen.render import HTMLRenderer, render_pdfs
+from invoicegen.render.pdf import logo_path, require_weasyprint, settle
+
+SAMPLES = Path(__file__).parents[1] / "samples"
+
+try:
+    require_weasyprint()
+    HAS_WEASYPRINT = True
+except RuntimeError:
+    HAS_WEASYPRINT = False
+
+needs_weasyprint = pytest.mark.skipif(not HAS_WEASYPRINT, reason="WeasyPrint is not available")
+
+
+@pytest.fixture()
+def invoices() -> list[Invoice]:
+    business = load_config().business_info
+    client = load_client(SAMPLES / "client.yaml")
+    line = JobLine.model_validate(
+        {
+            "dates": "11/1/2024",
+            "address": "Elderwood",
+            "unit": "A",
+            "description": "Repair leaking toilet.",
+            "rate": "100",
+            "qty": "1",
+            "source_row": 2,
+        }
+    )
+    return [
+        Invoice(
+            header=InvoiceHeader(
+                business=business, client=client, meta=InvoiceMeta(number=f"INV-{number:04d}")
+            ),
+            lines=[line],
+            tax_rate=Decimal("0"),
+        )
+        for number in range(1, 4)
+    ]
+
+
+def test_logo_path(tmp_path: Path) -> None:
+    business = load_config().business_info
+    assert logo_path(business, tmp_path) is None
+
+    (tmp_path / "logo.jpg").write_bytes(b"")
+    assert logo_path(business, tmp_path) == tmp_path / "logo.jpg"
+
+
+def test_stylesheet_left_out_for_pdf(invoices: list[Invoice], tmp_path: Path) -> None:
+    embedded = HTMLRenderer(cache_dir=tmp_path).render(invoices[0])
+    linked = HTMLRenderer(
+        cache_dir=tmp_path, context={"embed_css": False, "logo_url": "file:///logo.png"}
+    ).render(invoices[0])
+
+    assert "<style>" in embedded
+    assert "<style>" not in linked
+    assert '<img class="logo" src="file:///logo.png"' in linked
+
+
+@needs_weasyprint
+@pytest.mark.parametrize("jobs", [1, 2], ids=["inline", "pool"])
+def test_render_pdfs(jobs: int, invoices: list[Invoice], tmp_path: Path) -> None:
+    progress: list[tuple[int, int]] = []
+    report = render_pdfs(
+        invoices,
+        tmp_path / "pdf",
+        jobs=jobs,
+        progress=lambda done, total: progress.append((done, total)),
+    )
+
+    assert [path.name for path in report.paths] == ["INV-0001.pdf", "INV-0002.pdf", "INV-0003.pdf"]
+    assert all(path.read_bytes().startswith(b"%PDF") for path in report.paths)
+    assert progress == [(1, 3), (2, 3), (3, 3)]
+
+
+def test_negative_jobs(invoices: list[Invoice], tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="at least 0"):
+        render_pdfs(invoices, tmp_path, jobs=-1)
+
+
+def test_settle_reports_failures(tmp_path: Path) -> None:
+    path = tmp_path / "INV-0001.pdf"
+    finished: list[tuple[Path, float]] = []
+    failed: list[tuple[Path, str]] = []
+
+    def on_finished(path: Path, seconds: float) -> None:
+        finished.append((path, seconds))
+
+    def on_failed(path: Path, exc: Exception) -> None:
+        failed.append((path, str(exc)))
+
+    def broken() -> float:
+        raise ValueError("layout failed")
+
+    def workers_gone() -> float:
+        raise BrokenExecutor("a worker died")
+
+    settle(path, lambda: 0.5, on_finished, on_failed)
+    settle(path, broken, on_finished, on_failed)
+
+    assert finished == [(path, 0.5)]
+    assert failed == [(path, "layout failed")]
+    with pytest.raises(ValueError, match="layout failed"):
+        settle(path, broken, on_finished, None)
+    # Not one PDF's failure, so it stops the run
+    with pytest.raises(BrokenExecutor):
+        settle(path, workers_gone, on_finished, on_failed)
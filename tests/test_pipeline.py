@@ -0,0 +1,170 @@
+import threading
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from invoicegen.cli import main
+from invoicegen.config import InvoiceConfig, load_client, load_config
+from invoicegen.core import build_invoices, pipeline
+from invoicegen.core.pipeline import Pipeline, PipelineReport, group_ends
+from invoicegen.io import read_joblines
+from invoicegen.models import InvoiceHeader, InvoiceMeta
+from invoicegen.render import HTMLRenderer
+
+SAMPLES = Path(__file__).parents[1] / "samples"
+SAMPLE = SAMPLES / "october.csv"
+CLIENT = SAMPLES / "client.yaml"
+HEADER = "Date,Address,Unit,Description,Unit Price,Quantity,Total,Paid"
+# Exit code of the CLI for errors other than invalid rows
+FAILED = 2
+
+
+def make_header(config: InvoiceConfig) -> InvoiceHeader:
+    return InvoiceHeader(
+        business=config.business_info,
+        client=load_client(CLIENT),
+        meta=InvoiceMeta(number="DRAFT"),
+    )
+
+
+def run_html(path: Path, out_dir: Path, jobs: int = 1, chunk_size: int = 2) -> PipelineReport:
+    config = load_config()
+    return Pipeline(
+        make_header(config), config, out_dir, kind="html", jobs=jobs, chunk_size=chunk_size
+    ).run(path)
+
+
+def test_group_ends(tmp_path: Path) -> None:
+    path = tmp_path / "jobs.csv"
+    rows = ["1/1/2024,Oak,A,x,1,1,1,TRUE", "", "1/2/2024, Elm ,B,x,1,1,1,TRUE"]
+    path.write_text("\n".join([HEADER, *rows, "1/3/2024,Oak,B,x,1,1,1,TRUE"]) + "\n")
+
+    assert group_ends(path, by_unit=False) == {"Oak": 5, "": 3, "Elm": 4}
+    assert list(group_ends(path, by_unit=True).items())[0] == (("Oak", "A"), 2)
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_same_files_as_preview(tmp_path: Path, jobs: int) -> None:
+    config = load_config()
+    invoices = build_invoices(list(read_joblines(SAMPLE)), make_header(config), config)
+    expected = HTMLRenderer().render_all(invoices, tmp_path / "preview")
+
+    report = run_html(SAMPLE, tmp_path / "pipeline", jobs=jobs)
+    assert [path.name for path in report.paths] == [path.name for path in expected]
+    for path, preview in zip(report.paths, expected, strict=True):
+        assert path.read_text() == preview.read_text()
+    assert report.lines == len(SAMPLE.read_text().splitlines()) - 1
+
+
+def test_interleaved_projects(tmp_path: Path) -> None:
+    # Projects end in another order than they start, and Hill has a late entry
+    lines = SAMPLE.read_text().splitlines()
+    path = tmp_path / "jobs.csv"
+    path.write_text("\n".join([lines[0], lines[10], *lines[1:10], *lines[11:]]) + "\n")
+
+    config = load_config()
+    invoices = build_invoices(list(read_joblines(path)), make_header(config), config)
+    expected = HTMLRenderer().render_all(invoices, tmp_path / "preview")
+    report = run_html(path, tmp_path / "out")
+
+    # Hill was seen first, but Elderwood ends first and is numbered first
+    assert [path.stem[-4:] for path in report.paths] == [path.stem[-4:] for path in expected]
+    assert "Elderwood" in report.paths[0].read_text()
+    assert "Elderwood" in expected[1].read_text()
+
+
+def test_invalid_project_skipped(tmp_path: Path) -> None:
+    path = tmp_path / "jobs.csv"
+    text = SAMPLE.read_text()
+    path.write_text(text.replace("11/15/2024,Hill", "13/15/2024,Hill"))
+    bad_row = text.splitlines().index("11/15/2024,Hill,A,Change sink faucet.,150,1,150,TRUE") + 1
+
+    config = load_config()
+    start = config.sequence_start
+    report = Pipeline(make_header(config), config, tmp_path / "out", kind="html", jobs=1).run(path)
+
+    assert [error.source_row for error in report.errors] == [bad_row]
+    assert report.skipped == ["Hill"]
+    assert len(report.paths) == len(["Elderwood", "Elizabeth"])
+    # Hill is seen first, and draws no number
+    assert config.sequence_start == start + len(report.paths)
+
+
+def test_rendering_overlaps_reading(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    events: list[str] = []
+
+    def logged(name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        def wrapper(*args: Any) -> Any:
+            events.append(name)
+            return func(*args)
+
+        return wrapper
+
+    monkeypatch.setattr(pipeline, "next_chunk", logged("read", pipeline.next_chunk))
+    monkeypatch.setattr(pipeline, "render_in_worker", logged("render", pipeline.render_in_worker))
+    run_html(SAMPLE, tmp_path, chunk_size=1)
+
+    # Elderwood is rendered while the rows of the other projects are still being read
+    assert events.index("render") < len(events) - 1 - events[::-1].index("read")
+
+
+def test_reading_goes_on_during_the_scan(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    read_all = threading.Event()
+
+    def last_chunk(chunks: Any) -> Any:
+        chunk = next_chunk(chunks)
+        if chunk is None:
+            read_all.set()
+        return chunk
+
+    def slow_ends(path: Path, by_unit: bool) -> dict[Any, int]:
+        # The scan is only done once every chunk has been read
+        assert read_all.wait(timeout=10)
+        return group_ends(path, by_unit)
+
+    next_chunk = pipeline.next_chunk
+    monkeypatch.setattr(pipeline, "next_chunk", last_chunk)
+    monkeypatch.setattr(pipeline, "group_ends", slow_ends)
+    report = run_html(SAMPLE, tmp_path, chunk_size=1)
+
+    assert len(report.paths) == len(["Elderwood", "Elizabeth", "Hill"])
+    assert [path.stem[-4:] for path in report.paths] == sorted(
+        path.stem[-4:] for path in report.paths
+    )
+
+
+def test_cli_preview_pipeline(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    argv = ["preview", "--in", str(SAMPLE), "--client", str(CLIENT), "--out", str(tmp_path)]
+    assert main([*argv, "--pipeline"]) == 0
+
+    assert len(list(tmp_path.glob("*.html"))) == len(["Elderwood", "Elizabeth", "Hill"])
+    assert "3 invoices from 13 lines" in capsys.readouterr().out
+
+
+def test_cli_preview_pipeline_jobs(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    workers: list[int] = []
+    pool = Pipeline.workers
+
+    def counted(self: Pipeline, jobs: int) -> Any:
+        workers.append(jobs)
+        return pool(self, jobs)
+
+    monkeypatch.setattr(Pipeline, "workers", counted)
+    argv = ["preview", "--in", str(SAMPLE), "--client", str(CLIENT), "--out", str(tmp_path)]
+
+    assert main([*argv, "--pipeline", "--jobs", "2"]) == 0
+    assert workers == [2]
+    assert main([*argv, "--jobs", "2"]) == FAILED
+    assert "--jobs only works with --pipeline" in capsys.readouterr().err
+
+
+def test_cli_pipeline_rejects_incremental(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    argv = ["render", "--in", str(SAMPLE), "--client", str(CLIENT), "--out", str(tmp_path)]
+    assert main([*argv, "--pipeline", "--incremental"]) == FAILED
+    assert "--incremental" in capsys.readouterr().err
@@ -0,0 +1,52 @@
+import cProfile
+import pstats
+import shutil
+from pathlib import Path
+
+import pytest
+
+from invoicegen.cli import main
+from invoicegen.models.parsing import parse_decimal
+from invoicegen.profiling import PACKAGE_DIR, cpu_breakdown, package_module
+
+SAMPLES = Path(__file__).parents[1] / "samples"
+
+
+def test_package_module() -> None:
+    assert package_module(str(PACKAGE_DIR / "models" / "jobline.py")) == "models.jobline"
+    assert package_module(str(PACKAGE_DIR / "core" / "__init__.py")) == "core"
+    assert package_module(pytest.__file__) is None
+
+
+def test_cpu_time_charged_to_calling_module() -> None:
+    profiler = cProfile.Profile()
+    # Decimal and str methods run on behalf of models.parsing
+    profiler.runcall(lambda: [parse_decimal(f"{value}.5", "Rate") for value in range(2000)])
+    report = cpu_breakdown(pstats.Stats(profiler), top=3)
+
+    modules = report.splitlines()[1].split()
+    assert modules[0] == "models.parsing"
+    assert "models.parsing:" in report.split("package functions by cumulative time")[1]
+
+
+def test_cli_profile_cpu(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    jobs = tmp_path / "jobs.csv"
+    shutil.copy(SAMPLES / "october.csv", jobs)
+    assert main(["validate", "--in", str(jobs), "--profile", "cpu"]) == 0
+
+    # Written next to the input, since validate has no output directory
+    profile = tmp_path / "invoicegen-validate.prof"
+    assert pstats.Stats(str(profile)).total_calls > 0  # type: ignore[attr-defined]
+    assert "models.jobline" in capsys.readouterr().err
+
+
+def test_cli_profile_mem(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    out = tmp_path / "preview"
+    argv = ["preview", "--in", str(SAMPLES / "october.csv"), "--client"]
+    argv += [str(SAMPLES / "client.yaml"), "--out", str(out), "--profile", "mem"]
+    assert main(argv) == 0
+
+    report = (out / "invoicegen-preview-mem.txt").read_text()
+    assert "Memory by module" in report
+    assert "Top" in report
+    assert "profile: mem" in capsys.readouterr().err
@@ -0,0 +1,101 @@
+import json
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from invoicegen import stats
+from invoicegen.cli import main
+from invoicegen.io import RowError, read_joblines
+
+SAMPLE = Path(__file__).parents[1] / "samples" / "october.csv"
+
+
+@pytest.fixture()
+def collected() -> Iterator[stats.Stats]:
+    yield stats.enable()
+    stats.disable()
+
+
+def test_disabled_collects_nothing() -> None:
+    assert stats.stage("ingest") is stats.NULL_STAGE
+    with stats.stage("ingest") as stage:
+        stage.add(items=1)
+    assert stats.disable() is None
+
+
+def test_stage_records_time_and_counts(collected: stats.Stats) -> None:
+    for _ in range(2):
+        with stats.stage("render_pdf") as stage:
+            stage.add(items=3, cache_hits=2, cache_misses=1)
+
+    record = collected.stages["render_pdf"]
+    assert [record.calls, record.items, record.cache_hits, record.cache_misses] == [2, 6, 4, 2]
+    assert record.seconds > 0
+
+
+def test_stage_records_its_own_memory_growth(
+    collected: stats.Stats, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Peak RSS before and after each pass: ingest raises it, group runs below it
+    peaks = iter([100, 150, 150, 150, 150, 170])
+    monkeypatch.setattr(stats, "peak_rss", lambda: next(peaks))
+
+    with stats.stage("ingest"):
+        pass
+    for _ in range(2):
+        with stats.stage("group"):
+            pass
+
+    growth = [collected.stages[name].peak_rss_growth_bytes for name in ["ingest", "group"]]
+    assert growth == [150 - 100, 170 - 150]
+
+
+def test_timed_decorator(collected: stats.Stats) -> None:
+    @stats.timed("group")
+    def double(value: int) -> int:
+        return value * 2
+
+    assert [double(2), double(3)] == [4, 6]
+    assert collected.stages["group"].calls == len([2, 3])
+
+
+def test_reader_counts_rows_and_errors(collected: stats.Stats, tmp_path: Path) -> None:
+    path = tmp_path / "jobs.csv"
+    path.write_text(SAMPLE.read_text().replace("11/16/2024,Hill", "13/16/2024,Hill", 1))
+    errors: list[RowError] = []
+    list(read_joblines(path, on_error=errors.append))
+
+    counted = [collected.stages["ingest"].items, collected.stages["validate"].items]
+    assert counted == [13, 13]
+    assert collected.stages["validate"].errors == len(errors)
+
+
+def test_cli_stats(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    out = tmp_path / "stats.json"
+    assert main(["validate", "--in", str(SAMPLE), "--stats", "--stats-json", str(out)]) == 0
+
+    assert "validate" in capsys.readouterr().err
+    data = json.loads(out.read_text())
+    assert data["stages"]["validate"]["items"] == len(SAMPLE.read_text().splitlines()) - 1
+    # Collection stops with the command
+    assert stats.disable() is None
+
+
+def test_cli_preview_stats_json(tmp_path: Path, capsys: pytest.CaptureFixture[str]) -> None:
+    argv = ["preview", "--in", str(SAMPLE), "--client", str(SAMPLE.parent / "client.yaml")]
+    assert main([*argv, "--out", str(tmp_path), "--stats-json", "-"]) == 0
+
+    captured = capsys.readouterr()
+    data = json.loads(captured.out)
+    assert "[invoicegen] preview: " in captured.err
+    assert list(data["stages"]) == [
+        "ingest",
+        "validate",
+        "group",
+        "build_invoices",
+        "numbering",
+        "render_html",
+    ]
+    assert data["stages"]["numbering"]["items"] == data["stages"]["render_html"]["items"]
+    assert data["stages"]["group"]["items"] == data["stages"]["validate"]["items"]